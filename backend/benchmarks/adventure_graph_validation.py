@@ -0,0 +1,67 @@
+"""Time adventure graph validation on large generated graphs, against the old per-node edge scan.
+
+Run from the backend directory:
+
+    python -m benchmarks.adventure_graph_validation --sizes 1000 10000 50000
+"""
+
+import argparse
+import random
+import time
+
+from services.adventure_graph import validate_graph
+
+# the old scan is O(N * E), past this many nodes it takes minutes
+LEGACY_MAX_NODES = 10000
+
+
+def generate(size: int, seed: int = 0):
+    """A chain of problems with extra forward "correct" edges and "incorrect" edges back to earlier ones."""
+
+    rng = random.Random(seed)
+    nodes = [{"id": f"n{i}"} for i in range(size)]
+    edges = []
+    for i in range(size - 1):
+        edges.append({"id": f"c{i}", "source": f"n{i}", "target": f"n{i + 1}", "data": {"condition": "correct"}})
+        if i > 0 and rng.random() < 0.5:
+            back = rng.randrange(1, i + 1)
+            edges.append({"id": f"i{i}", "source": f"n{i}", "target": f"n{back}", "data": {"condition": "incorrect"}})
+        if i + 2 < size and rng.random() < 0.3:
+            ahead = rng.randrange(i + 2, min(size, i + 50))
+            edges.append({"id": f"s{i}", "source": f"n{i}", "target": f"n{ahead}", "data": {"condition": "correct"}})
+    return {"nodes": nodes, "edges": edges}
+
+
+def legacy_start_and_end(nodes, edges):
+    start = next(node for node in nodes if not any(edge["target"] == node["id"] for edge in edges))
+    end = next(node for node in nodes if not any(edge["source"] == node["id"] for edge in edges))
+    return start["id"], end["id"]
+
+
+def best_of(repeats: int, run) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def main(sizes, repeats: int) -> None:
+    for size in sizes:
+        graph_data = generate(size)
+        assert validate_graph(graph_data) == ("n0", f"n{size - 1}")
+        validated = best_of(repeats, lambda: validate_graph(graph_data))
+        line = f"{size:>7} nodes {len(graph_data['edges']):>7} edges   validate {validated:9.2f} ms"
+        if size <= LEGACY_MAX_NODES:
+            legacy = best_of(1, lambda: legacy_start_and_end(graph_data["nodes"], graph_data["edges"]))
+            line += f"   old scan {legacy:10.2f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    main(args.sizes, args.repeats)
@@ -0,0 +1,58 @@
+"""Compare judge latency for tiny Python programs on the per-call path and the warm worker pool.
+
+Run from the backend directory:
+
+    python -m benchmarks.python_worker_pool --runs 200 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import time
+
+from config import Settings
+from services.executors import LocalExecutor
+from utils.latency import LatencyRecorder
+
+PROGRAM = "total = sum(range(100))\nprint(total)\n"
+
+
+async def measure(run, runs: int, concurrency: int) -> LatencyRecorder:
+    recorder = LatencyRecorder(window=runs)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.monotonic()
+            result = await run()
+            recorder.record((time.monotonic() - started) * 1000)
+            assert result["stdout"] == "4950\n", result
+
+    await asyncio.gather(*(one() for _ in range(runs)))
+    return recorder
+
+
+async def main(runs: int, concurrency: int, pool_size: int) -> None:
+    per_call = LocalExecutor(Settings(PYTHON_WORKER_POOL_ENABLED=False))
+    pooled = LocalExecutor(Settings(PYTHON_WORKER_POOL_SIZE=pool_size))
+    await pooled.start()
+
+    try:
+        results = {
+            "per-call": await measure(lambda: per_call.run("python", "", "py", PROGRAM), runs, concurrency),
+            "worker pool": await measure(lambda: pooled.run("python", "", "py", PROGRAM), runs, concurrency),
+        }
+    finally:
+        await pooled.close()
+
+    print(f"{runs} runs, concurrency {concurrency}, pool size {pool_size}")
+    for name, recorder in results.items():
+        print(f"{name:>12}: p50 {recorder.percentile(50):7.2f} ms   p99 {recorder.percentile(99):7.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--pool-size", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.concurrency, args.pool_size))
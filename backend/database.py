@@ -7,7 +7,12 @@ from config import get_settings
 
 settings = get_settings()
 
-engine = create_engine(settings.DATABASE_URL)
+connect_args = {}
+if settings.DATABASE_URL.startswith("postgresql") and settings.DB_STATEMENT_TIMEOUT_MS > 0:
+    # a stuck query fails instead of holding a worker past the request deadline
+    connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+
+engine = create_engine(settings.DATABASE_URL, connect_args=connect_args)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -1,4 +1,6 @@
-from fastapi import Depends, HTTPException
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Form, Header, Request
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from jose import JWTError
@@ -6,9 +8,12 @@ from jose import JWTError
 from database import get_db
 from models.user import User
 from utils.auth import decode_access_token
+from services.rate_limiter import get_client_address, get_rate_limiter, execution_cost
+from services.idempotency import get_idempotency_store, idempotency_scope
 from exceptions import AuthenticationError, NotFoundError, AuthorisationError
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login", auto_error=False)
 
 async def get_current_user(
         token: str = Depends(oauth2_scheme),
@@ -28,9 +33,54 @@ async def get_current_user(
         raise AuthenticationError("Token Validation Failed")
     
 
+async def get_optional_user(
+        token: Optional[str] = Depends(optional_oauth2_scheme),
+        db: Session = Depends(get_db)
+) -> Optional[User]:
+    # requests without a bearer token are anonymous, a token that is sent must still be valid
+    if token is None:
+        return None
+    return await get_current_user(token, db)
+
+
 async def get_admin_user(
         current_user: User = Depends(get_current_user)
 ) -> User:
     if not current_user.is_admin:
         raise AuthorisationError("Admin privileges required")
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+def is_idempotent_replay(request: Request, user: Optional[User], idempotency_key: Optional[str]) -> bool:
+    # a retry answered from the idempotency store runs nothing, so it is not charged again
+    handler = getattr(request.scope.get("endpoint"), "idempotent_handler", None)
+    if not idempotency_key or handler is None:
+        return False
+    client = get_client_address(request) if user is None else None
+    return get_idempotency_store().will_replay(idempotency_scope(handler, user, idempotency_key, client))
+
+
+async def limit_user_execution(
+        request: Request,
+        code: str = Form(...),
+        language: str = Form(...),
+        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+        current_user: User = Depends(get_current_user)
+) -> None:
+    if is_idempotent_replay(request, current_user, idempotency_key):
+        return
+    limiter = get_rate_limiter()
+    # one execution is never refused for its size alone, preflight already bounds that
+    limiter.check("user", str(current_user.id), min(execution_cost(language, code), limiter.burst("user")))
+
+
+async def limit_guest_execution(
+        request: Request,
+        code: str = Form(...),
+        language: str = Form(...),
+        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+) -> None:
+    if is_idempotent_replay(request, None, idempotency_key):
+        return
+    limiter = get_rate_limiter()
+    limiter.check("guest", get_client_address(request), min(execution_cost(language, code), limiter.burst("guest")))
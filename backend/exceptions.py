@@ -16,13 +16,56 @@ class AuthorisationError(AppException):
         super().__init__(message=message, status_code=403)
     
 class NotFoundError(AppException):
-    def __init__(self, resource: str = "Resource"):
-        super().__init__(status_code=404, message=f"{resource} not found")
+    def __init__(self, resource: str = "Resource", message: str = None):
+        super().__init__(status_code=404, message=message or f"{resource} not found")
 
 class ValidationError(AppException):
     def __init__(self, message: str, detail: str = None):
         super().__init__(status_code=400, message=message, detail=detail)
 
+class PreflightError(ValidationError):
+    def __init__(self, check: str, message: str, line: int = None, column: int = None, text: str = None):
+        super().__init__(message=message, detail=f"Pre-flight {check} check failed")
+        self.check = check
+        self.line = line
+        self.column = column
+        self.text = text
 
+    def to_dict(self) -> dict:
+        return {"check": self.check, "message": self.message, "line": self.line, "column": self.column, "text": self.text}
 
+class GraphValidationError(ValidationError):
+    def __init__(self, problems: list):
+        # problems are dicts with at least "check" and "message", the first one leads the error
+        super().__init__(message=problems[0]["message"], detail=f"Adventure graph has {len(problems)} problem(s)")
+        self.problems = problems
 
+    def to_dict(self) -> dict:
+        return {"problems": self.problems}
+
+class IdempotencyKeyMismatchError(AppException):
+    def __init__(self, message: str = "Idempotency-Key was already used for a different request"):
+        super().__init__(status_code=422, message=message)
+
+class RunCancelledError(AppException):
+    def __init__(self, reason: str = "cancelled"):
+        messages = {
+            "superseded": "Run cancelled, a newer run was started",
+            "disconnected": "Run cancelled, the client disconnected",
+        }
+        super().__init__(status_code=409, message=messages.get(reason, "Run cancelled"))
+        self.reason = reason
+
+class ServiceUnavailableError(AppException):
+    def __init__(self, message: str = "Service temporarily unavailable"):
+        super().__init__(status_code=503, message=message)
+
+class RateLimitError(AppException):
+    def __init__(self, message: str = "Too many requests", retry_after: int = 1):
+        super().__init__(status_code=429, message=message)
+        self.headers = {"Retry-After": str(retry_after)}
+
+class DeadlineExceededError(AppException):
+    def __init__(self, stage: str = "the request"):
+        super().__init__(status_code=504, message="Deadline exceeded", detail=f"Ran out of time during {stage}")
+        self.stage = stage
@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -8,19 +9,47 @@ from config import get_settings
 from exceptions import AppException
 from database import engine
 from models import Base
-from routes import auth, problems, adventures, submissions
+from routes import auth, problems, adventures, submissions, executor, judge_jobs, metrics, runs
+from services.http_client import get_executor_http_client
+from services.execution_cache import get_execution_cache
+from services.code_execution_service import CodeExecutionService
+from services.judge_queue import get_judge_queue
 
 Base.metadata.create_all(bind=engine)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    executor_http_client = get_executor_http_client()
+    await executor_http_client.start()
+
+    code_execution_service = CodeExecutionService(executor_http_client)
+    await code_execution_service.backend.start()
+
+    judge_queue = get_judge_queue()
+    await judge_queue.start()
+
+    removed = get_execution_cache().sync_runtime_versions(code_execution_service.runtime_versions())
+    if removed:
+        logger.info(f"Dropped {removed} cached execution results from outdated runtimes")
+    try:
+        yield
+    finally:
+        await judge_queue.close()
+        await code_execution_service.backend.close()
+        await executor_http_client.close()
+
+
 def create_app() -> FastAPI:
     settings = get_settings()
 
     app = FastAPI(
         title="AdventureCode API",
-        description="API for coding adventures and problems (MSc Project)" 
+        description="API for coding adventures and problems (MSc Project)",
+        lifespan=lifespan
     )
 
     app.add_middleware(
@@ -35,7 +64,8 @@ def create_app() -> FastAPI:
     async def app_exception_handler(request, exc: AppException):
         return JSONResponse(
             status_code=exc.status_code,
-            content={"error": exc.message, "detail": exc.detail}
+            content={"error": exc.message, "detail": exc.detail},
+            headers=exc.headers
         )
 
     @app.exception_handler(Exception)
@@ -50,6 +80,11 @@ def create_app() -> FastAPI:
     app.include_router(problems.router, prefix="/api", tags=["problems"])
     app.include_router(adventures.router, prefix="/api", tags=["adventures"])
     app.include_router(submissions.router, prefix="/api", tags=["submissions"])
+    app.include_router(executor.router, prefix="/api", tags=["executor"])
+    app.include_router(judge_jobs.router, prefix="/api", tags=["jobs"])
+    app.include_router(runs.router, prefix="/api", tags=["runs"])
+    # scraped at the conventional Prometheus path rather than under /api
+    app.include_router(metrics.router)
 
     @app.get("/")
     async def root():
@@ -4,6 +4,7 @@ from .problem import Problem
 from .adventure import Adventure, AdventureAttempt
 from .leaderboard import Leaderboard
 from .submission import AdventureProblemSubmission
+from .execution_cache import ExecutionResultCache
 
 __all__ = [
     "Base",
@@ -12,5 +13,6 @@ __all__ = [
     "Adventure", 
     "AdventureAttempt",
     "AdventureProblemSubmission",
-    "Leaderboard"
+    "Leaderboard",
+    "ExecutionResultCache"
 ]
\ No newline at end of file
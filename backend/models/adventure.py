@@ -11,6 +11,8 @@ class Adventure(Base):
     name = Column(String, index=True, nullable=False)
     description = Column(Text, nullable=True)
     graph_data = Column(JSONB, nullable=False)
+    # bumped on every graph edit, keys the compiled graph cache
+    graph_revision = Column(Integer, nullable=False, default=1, server_default="1")
     creator_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     total_attempts = Column(Integer, default=0)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from sqlalchemy.sql import func
+from database import Base
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+class ExecutionResultCache(Base):
+    __tablename__ = "execution_result_cache"
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), unique=True, nullable=False, index=True)
+    language = Column(String, nullable=False)
+    version = Column(String, nullable=False)
+    result = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index('ix_execution_cache_language_version', 'language', 'version'),
+    )
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Float
 from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -25,6 +26,13 @@ class Problem(Base):
     approved_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     language = Column(String, nullable=False)
+    judge_mode = Column(String(20), nullable=False, default="strip", server_default="strip")
+    float_tolerance = Column(Float, nullable=True)
+    # [{"stdin": ..., "expected_output": ...}], judged after expected_output
+    test_cases = Column(JSONB, nullable=True)
+    # checked against each run's reported CPU time and peak memory, no limit when null
+    time_limit_ms = Column(Integer, nullable=True)
+    memory_limit_mb = Column(Integer, nullable=True)
 
     creator = relationship(
         "User",
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, ForeignKey, Text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -12,6 +12,11 @@ class AdventureProblemSubmission(Base):
     code_submitted = Column(Text, nullable=False)
     output = Column(Text, nullable=False)
     is_correct = Column(Boolean, nullable=False)
+    # correct, incorrect, time_limit_exceeded or memory_limit_exceeded
+    verdict = Column(String(30), nullable=True)
+    cpu_time_ms = Column(Integer, nullable=True)
+    wall_time_ms = Column(Integer, nullable=True)
+    memory_bytes = Column(BigInteger, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     attempt = relationship(
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Form, status
+from fastapi import APIRouter, Depends, Form, Header, Response, status
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from typing import Optional, List
@@ -20,8 +20,13 @@ from schemas.adventure import (
      )
 from services.adventure_service import AdventureService
 from services.code_execution_service import CodeExecutionService
-from dependencies import get_current_user
-from exceptions import NotFoundError, ValidationError, AuthorisationError
+from services.http_client import get_executor_http_client
+from services.execution_metrics import instrument_submission
+from services.deadlines import with_deadline
+from services.idempotency import idempotent
+from services.submission_pipeline import SubmissionContext, attempt_pipeline, submission_error_response
+from dependencies import get_current_user, limit_user_execution
+from exceptions import NotFoundError, ValidationError, GraphValidationError, AuthorisationError
 
 router = APIRouter(prefix="/adventures", tags=["adventures"])
 logger = logging.getLogger("uvicorn.error")
@@ -32,7 +37,7 @@ def get_adventure_service(db: Session = Depends(get_db)) -> AdventureService:
 
 
 def get_code_execution_service() -> CodeExecutionService:
-    return CodeExecutionService()
+    return CodeExecutionService(get_executor_http_client())
 
 
 @router.post("/", response_model=AdventureSchema, status_code=status.HTTP_201_CREATED)
@@ -44,6 +49,11 @@ async def create_adventure(
     
     try:
         return adventure_service.create_adventure(adventure, current_user)
+    except GraphValidationError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Validation failed", "detail": e.message, "graph": e.to_dict()}
+        )
     except ValidationError as e:
         return JSONResponse(
             status_code=400,
@@ -162,6 +172,11 @@ async def update_adventure(
             status_code=404,
             content={"error": "Adventure not found"}
         )
+    except GraphValidationError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Validation failed", "detail": e.message, "graph": e.to_dict()}
+        )
     except AuthorisationError as e:
         return JSONResponse(
             status_code=403,
@@ -175,6 +190,34 @@ async def update_adventure(
         )
 
 
+@router.get("/{adventure_id}/nodes/{node_id}/runtime_distribution")
+async def get_runtime_distribution(
+    adventure_id: int,
+    node_id: str,
+    current_user: UserModel = Depends(get_current_user),
+    adventure_service: AdventureService = Depends(get_adventure_service)
+):
+
+    try:
+        return adventure_service.get_runtime_distribution(adventure_id, node_id, current_user)
+    except NotFoundError as e:
+        return JSONResponse(
+            status_code=404,
+            content={"error": str(e)}
+        )
+    except AuthorisationError as e:
+        return JSONResponse(
+            status_code=403,
+            content={"error": "Forbidden", "detail": str(e)}
+        )
+    except Exception as e:
+        logger.error(f"Error fetching runtime distribution: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Internal server error", "detail": str(e)}
+        )
+
+
 @router.delete("/{adventure_id}")
 async def delete_adventure(
     adventure_id: int,
@@ -250,85 +293,34 @@ async def update_attempt_progress(
         )
 
 
-@router.post("/submissions")
+@router.post("/submissions", dependencies=[Depends(limit_user_execution)])
+@instrument_submission("adventures_submit")
+@idempotent("adventures_submit")
+@with_deadline("adventures_submit")
 async def submit_adventure_problem(
+    response: Response,
     attempt_id: int = Form(...),
     node_id: str = Form(...),
     code: str = Form(...),
     language: str = Form(...),
+    fail_fast: Optional[bool] = Form(None),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_user: UserModel = Depends(get_current_user),
     adventure_service: AdventureService = Depends(get_adventure_service),
     code_execution_service: CodeExecutionService = Depends(get_code_execution_service)
 ):
     
+    context = SubmissionContext(
+        code, language, node_id, fail_fast, priority="attempt", user=current_user, attempt_id=attempt_id
+    )
     try:
-        
-        attempt = adventure_service.get_user_attempts(current_user, None)
-        attempt = next((a for a in attempt if a.id == attempt_id), None)
-        
-        if not attempt:
-            return JSONResponse(
-                status_code=404,
-                content={"error": "Adventure attempt not found"}
-            )
-        
-        
-        adventure = adventure_service.get_adventure_by_id(attempt.adventure_id)
-        node_entry = next(
-            (n for n in adventure.graph_data["nodes"] if n["id"] == node_id),
-            None
-        )
-        
-        if not node_entry:
-            return JSONResponse(
-                status_code=404,
-                content={"error": "Node not found in this adventure"}
-            )
-        
-        expected_output = node_entry["data"]["expected_output"].strip()
-        
-       
-        run_result = await code_execution_service.execute_code(code, language)
-        user_output = run_result.get("output", "").strip()
-        
-        
-        is_correct = (user_output == expected_output)
-        message = (
-            "Correct! Well done."
-            if is_correct
-            else f"Incorrect. Expected:\n{expected_output}\n\nYour output:\n{user_output}"
-        )
-        
-        
-        adventure_service.submit_adventure_problem(
-            attempt_id, node_id, code, user_output, is_correct, current_user
-        )
-        
-        return {
-            "message": message,
-            "output": user_output,
-            "stdout": run_result.get("stdout"),
-            "stderr": run_result.get("stderr"),
-            "is_correct": is_correct,
-        }
-        
-    except NotFoundError as e:
-        return JSONResponse(
-            status_code=404,
-            content={"error": str(e)}
-        )
-    except ValidationError as e:
-        return JSONResponse(
-            status_code=400,
-            content={"error": "Validation failed", "detail": str(e)}
-        )
+        await attempt_pipeline(adventure_service, code_execution_service).run(context)
     except Exception as e:
-        logger.error(f"Error in adventure submission: {e}")
-        return JSONResponse(
-            status_code=500,
-            content={"error": "Internal server error", "detail": str(e)}
-        )
-    
+        return submission_error_response(e, context, "adventure submission")
+
+    response.headers["Server-Timing"] = context.server_timing()
+    return context.response
+
 
 @router.get("/users/{user_id}/completed_public_adventures", response_model=List[AdventureSchema])
 def get_completed_public_adventures(user_id: int, db: Session = Depends(get_db)):
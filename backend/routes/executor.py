@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends
+from typing import Optional
+
+from models.user import User
+from services.http_client import get_executor_http_client
+from services.bulkheads import get_language_bulkheads
+from services.execution_cache import get_execution_cache
+from services.execution_scheduler import get_execution_scheduler
+from services.executors import get_executor_backend
+from services.idempotency import get_idempotency_store
+from services.judge import get_output_judge
+from services.judge_queue import get_judge_queue
+from services.preflight import get_preflight
+from services.adventure_graph import get_adventure_graph_cache
+from services.rate_limiter import get_rate_limiter
+from services.run_sessions import get_run_sessions
+from services.single_flight import get_single_flight
+from dependencies import get_admin_user
+
+router = APIRouter(prefix="/executor", tags=["executor"])
+
+
+@router.get("/stats")
+async def get_executor_stats(admin_user: User = Depends(get_admin_user)):
+
+    return {
+        "backend": get_executor_backend().stats(),
+        "http_pool": get_executor_http_client().stats(),
+        "result_cache": get_execution_cache().stats(),
+        "preflight": get_preflight().stats(),
+        "single_flight": get_single_flight().stats(),
+        "scheduler": get_execution_scheduler().stats(),
+        "language_pools": get_language_bulkheads().stats(),
+        "expected_outputs": get_output_judge().stats(),
+        "judge_queue": get_judge_queue().stats(),
+        "rate_limiter": get_rate_limiter().stats(),
+        "idempotency": get_idempotency_store().stats(),
+        "run_sessions": get_run_sessions().stats(),
+        "adventure_graphs": get_adventure_graph_cache().stats(),
+    }
+
+
+@router.delete("/cache")
+async def invalidate_execution_cache(
+    language: Optional[str] = None,
+    admin_user: User = Depends(get_admin_user)
+):
+
+    removed = get_execution_cache().invalidate(language.lower() if language else None)
+    return {"message": "Execution cache invalidated", "removed": removed}
@@ -0,0 +1,312 @@
+from fastapi import APIRouter, Depends, Form, Header, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.orm import Session
+import asyncio
+import json
+import logging
+from typing import List, Optional
+
+from database import get_db, SessionLocal
+from models.user import User
+from services.adventure_service import AdventureService
+from services.adventure_graph import get_adventure_graph_cache
+from services.code_execution_service import CodeExecutionService
+from services.http_client import get_executor_http_client
+from services.deadlines import with_deadline
+from services.idempotency import idempotent
+from services.judge import JudgeCase, get_output_judge
+from services.judge_queue import JudgeJob, get_judge_queue
+from services.problem_service import ProblemService
+from dependencies import get_current_user, get_optional_user, limit_user_execution, limit_guest_execution
+from exceptions import NotFoundError, ValidationError, AuthorisationError, ServiceUnavailableError
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+logger = logging.getLogger("uvicorn.error")
+
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def get_adventure_service(db: Session = Depends(get_db)) -> AdventureService:
+    return AdventureService(db)
+
+
+def get_problem_service(db: Session = Depends(get_db)) -> ProblemService:
+    return ProblemService(db)
+
+
+def job_accepted(job: JudgeJob) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={
+            "job_id": job.id,
+            "status": job.status,
+            "queue_depth": get_judge_queue().stats()["queue_depth"],
+            "poll_url": f"/api/jobs/{job.id}",
+            "events_url": f"/api/jobs/{job.id}/events",
+        }
+    )
+
+
+async def run_cases(cases: List[JudgeCase], code: str, language: str, fail_fast: Optional[bool], priority: str):
+    code_execution_service = CodeExecutionService(get_executor_http_client())
+    return await get_output_judge().run_cases(
+        cases,
+        lambda stdin: code_execution_service.execute_code(code, language, stdin, priority=priority),
+        fail_fast
+    )
+
+
+@with_deadline("judge_problem_job")
+async def judge_problem(
+    problem_id: int,
+    cases: List[JudgeCase],
+    code: str,
+    language: str,
+    fail_fast: Optional[bool] = None
+) -> dict:
+    judge = get_output_judge()
+    report = await run_cases(cases, code, language, fail_fast, "problem")
+    run_result = report.run
+    user_output = run_result.get("output", "")
+    is_correct = report.is_correct
+
+    if is_correct:
+        # the request's session is long gone, so persist through a fresh one
+        db = SessionLocal()
+        try:
+            problem_service = ProblemService(db)
+            problem = problem_service.get_problem_by_id(problem_id)
+            problem_service.increment_completions(problem)
+        finally:
+            db.close()
+
+    return {
+        "message": report.message(),
+        "output": judge.clip(user_output.strip()),
+        "stdout": judge.clip(run_result.get("stdout")),
+        "stderr": judge.clip(run_result.get("stderr")),
+        "ran": bool(run_result),
+        "language": language.lower(),
+        "is_correct": is_correct,
+        "diff": report.verdict.diff,
+        "verdict": report.status,
+        "runtime": report.runtime(),
+        "test_cases": report.cases()
+    }
+
+
+@with_deadline("judge_adventure_job")
+async def judge_adventure_problem(
+    attempt_id: int,
+    node_id: str,
+    cases: List[JudgeCase],
+    code: str,
+    language: str,
+    user_id: int,
+    fail_fast: Optional[bool] = None
+) -> dict:
+    judge = get_output_judge()
+    report = await run_cases(cases, code, language, fail_fast, "attempt")
+    run_result = report.run
+    user_output = judge.clip(run_result.get("output", "").strip())
+    is_correct = report.is_correct
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise NotFoundError("User")
+        AdventureService(db).submit_adventure_problem(
+            attempt_id, node_id, code, user_output, is_correct, user,
+            verdict=report.status, runtime=report.runtime()
+        )
+    finally:
+        db.close()
+
+    return {
+        "message": report.message(),
+        "output": user_output,
+        "stdout": judge.clip(run_result.get("stdout")),
+        "stderr": judge.clip(run_result.get("stderr")),
+        "is_correct": is_correct,
+        "diff": report.verdict.diff,
+        "verdict": report.status,
+        "runtime": report.runtime(),
+        "test_cases": report.cases()
+    }
+
+
+@router.post("/submissions", dependencies=[Depends(limit_guest_execution)])
+@idempotent("enqueue_solution")
+async def enqueue_solution(
+    request: Request,
+    access_code: str = Form(...),
+    code: str = Form(...),
+    language: str = Form(...),
+    fail_fast: Optional[bool] = Form(None),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    problem_service: ProblemService = Depends(get_problem_service)
+):
+    """
+    Queued variant of POST /submissions. Returns a job ID straight away; the verdict
+    is available from GET /jobs/{job_id} or streamed from GET /jobs/{job_id}/events.
+    """
+
+    try:
+        problem = problem_service.get_problem_by_access_code(access_code.lower())
+        problem_id = problem.id
+        cases = get_output_judge().cases_for_problem(problem)
+
+        job = await get_judge_queue().submit(
+            "problem",
+            lambda: judge_problem(problem_id, cases, code, language, fail_fast)
+        )
+        return job_accepted(job)
+
+    except NotFoundError:
+        return JSONResponse(
+            status_code=404,
+            content={"error": "Problem not found"}
+        )
+    except ServiceUnavailableError as e:
+        return JSONResponse(
+            status_code=503,
+            content={"error": e.message}
+        )
+    except Exception as e:
+        logger.error(f"Error in /jobs/submissions: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Internal server error", "detail": str(e)}
+        )
+
+
+@router.post("/adventure_submissions", dependencies=[Depends(limit_user_execution)])
+@idempotent("enqueue_adventure_problem")
+async def enqueue_adventure_problem(
+    attempt_id: int = Form(...),
+    node_id: str = Form(...),
+    code: str = Form(...),
+    language: str = Form(...),
+    fail_fast: Optional[bool] = Form(None),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: User = Depends(get_current_user),
+    adventure_service: AdventureService = Depends(get_adventure_service)
+):
+    """
+    Queued variant of POST /adventure_submissions. The submission is persisted through
+    AdventureService.submit_adventure_problem once the verdict is known.
+    """
+
+    try:
+        attempt = adventure_service.get_attempt_by_id(attempt_id, current_user)
+        adventure = adventure_service.get_adventure_by_id(attempt.adventure_id)
+        node = get_adventure_graph_cache().get(adventure).get(node_id)
+
+        if node is None:
+            return JSONResponse(
+                status_code=404,
+                content={"error": "Node not found in this adventure"}
+            )
+        node_entry = node.entry
+
+        cases = get_output_judge().cases_for_node(adventure.id, node_entry)
+        user_id = current_user.id
+
+        job = await get_judge_queue().submit(
+            "adventure",
+            lambda: judge_adventure_problem(attempt_id, node_id, cases, code, language, user_id, fail_fast),
+            owner_id=user_id
+        )
+        return job_accepted(job)
+
+    except NotFoundError as e:
+        return JSONResponse(
+            status_code=404,
+            content={"error": str(e)}
+        )
+    except AuthorisationError as e:
+        return JSONResponse(
+            status_code=403,
+            content={"error": "Forbidden", "detail": str(e)}
+        )
+    except ValidationError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Validation failed", "detail": str(e)}
+        )
+    except ServiceUnavailableError as e:
+        return JSONResponse(
+            status_code=503,
+            content={"error": e.message}
+        )
+    except Exception as e:
+        logger.error(f"Error in /jobs/adventure_submissions: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Internal server error", "detail": str(e)}
+        )
+
+
+def job_lookup_error(job: Optional[JudgeJob], user: Optional[User]) -> Optional[JSONResponse]:
+    """The error for a job that does not exist, or that belongs to someone other than the signed-in user."""
+
+    if not job:
+        return JSONResponse(
+            status_code=404,
+            content={"error": "Job not found"}
+        )
+    if user is not None and job.owner_id is not None and job.owner_id != user.id:
+        return JSONResponse(
+            status_code=403,
+            content={"error": "Forbidden", "detail": "This job belongs to another user"}
+        )
+    return None
+
+
+# job IDs are random 128-bit tokens and act as the credential for requests without a bearer
+# token, since a browser EventSource cannot send one; requests that do send one only see their
+# own jobs. Jobs live in the process that accepted them, see JUDGE_QUEUE_* in config.py
+@router.get("/{job_id}")
+async def get_job(job_id: str, user: Optional[User] = Depends(get_optional_user)):
+    job = get_judge_queue().get_job(job_id)
+    error = job_lookup_error(job, user)
+    if error is not None:
+        return error
+    return job.to_dict()
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str, user: Optional[User] = Depends(get_optional_user)):
+    """Server-Sent Events stream of status changes, ending with the verdict."""
+
+    job = get_judge_queue().get_job(job_id)
+    error = job_lookup_error(job, user)
+    if error is not None:
+        return error
+
+    async def events():
+        queue = job.subscribe()
+        try:
+            snapshot = job.to_dict()
+            while True:
+                finished = snapshot["status"] in ("completed", "failed")
+                yield f"event: {'verdict' if finished else 'status'}\ndata: {json.dumps(snapshot)}\n\n"
+                if finished:
+                    return
+
+                while True:
+                    try:
+                        snapshot = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                        break
+                    except asyncio.TimeoutError:
+                        # comment line keeps proxies from closing an idle stream
+                        yield ": keep-alive\n\n"
+        finally:
+            job.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from services.execution_metrics import get_execution_metrics, get_metrics_registry
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+
+    # registers the metric families so a scrape before the first submission still lists them
+    get_execution_metrics()
+    return PlainTextResponse(
+        get_metrics_registry().render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
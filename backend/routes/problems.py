@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, Form
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Literal
+import json
 
 from database import get_db
 from services.problem_service import ProblemService
@@ -18,18 +20,35 @@ async def create_problem(
     expected_output: str = Form(...),
     language: str = Form(...),
     is_public: bool = Form(...),
+    judge_mode: Literal["strip", "exact", "trim_lines", "float"] = Form("strip"),
+    float_tolerance: Optional[float] = Form(None),
+    # a JSON list of {"stdin": ..., "expected_output": ...}
+    test_cases: Optional[str] = Form(None),
+    time_limit_ms: Optional[int] = Form(None),
+    memory_limit_mb: Optional[int] = Form(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     problem_service = ProblemService(db)
-    problem_data = ProblemCreate(
-        title=title,
-        description=description,
-        code_snippet=code_snippet,
-        expected_output=expected_output,
-        language=language,
-        is_public=is_public
-    )
+    try:
+        problem_data = ProblemCreate(
+            title=title,
+            description=description,
+            code_snippet=code_snippet,
+            expected_output=expected_output,
+            language=language,
+            is_public=is_public,
+            judge_mode=judge_mode,
+            float_tolerance=float_tolerance,
+            test_cases=json.loads(test_cases) if test_cases else None,
+            time_limit_ms=time_limit_ms,
+            memory_limit_mb=memory_limit_mb
+        )
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Validation failed", "detail": f"Invalid problem: {e}"}
+        )
     
     problem = problem_service.create_problem(problem_data, current_user)
     
@@ -0,0 +1,107 @@
+from fastapi import APIRouter, Depends, Form, Request
+from fastapi.responses import JSONResponse
+from typing import Optional
+import logging
+
+from models.user import User
+from services.code_execution_service import CodeExecutionService
+from services.http_client import get_executor_http_client
+from services.deadlines import with_deadline
+from services.judge import get_output_judge, run_metrics
+from services.run_sessions import get_run_sessions
+from dependencies import get_current_user, limit_user_execution
+from exceptions import (
+    ValidationError,
+    PreflightError,
+    RunCancelledError,
+    ServiceUnavailableError,
+    DeadlineExceededError
+)
+
+router = APIRouter(prefix="/runs", tags=["runs"])
+logger = logging.getLogger("uvicorn.error")
+
+
+def get_code_execution_service() -> CodeExecutionService:
+    return CodeExecutionService(get_executor_http_client())
+
+
+def run_session(user: User, access_code: Optional[str], adventure_id: Optional[int], node_id: Optional[str]) -> str:
+    if adventure_id is not None and node_id:
+        return f"{user.id}:node:{adventure_id}:{node_id}"
+    if access_code:
+        return f"{user.id}:problem:{access_code.lower()}"
+    return f"{user.id}:scratch"
+
+
+@router.post("", dependencies=[Depends(limit_user_execution)])
+@with_deadline("dry_run")
+async def dry_run(
+    request: Request,
+    code: str = Form(...),
+    language: str = Form(...),
+    stdin: str = Form(""),
+    access_code: Optional[str] = Form(None),
+    adventure_id: Optional[int] = Form(None),
+    node_id: Optional[str] = Form(None),
+    current_user: User = Depends(get_current_user),
+    code_execution_service: CodeExecutionService = Depends(get_code_execution_service)
+):
+    """
+    Run code without judging or saving anything, for the editor's "Run" button.
+    access_code, or adventure_id and node_id, name what the user is editing: a
+    new run for the same target cancels the previous one if it is still running,
+    and a run is cancelled when its client disconnects.
+    """
+
+    try:
+        session = run_session(current_user, access_code, adventure_id, node_id)
+        # ungraded, so it waits behind graded submissions for an executor slot
+        run_result = await get_run_sessions().run(
+            session,
+            lambda: code_execution_service.execute_code(code, language, stdin, priority="guest"),
+            request.is_disconnected
+        )
+        judge = get_output_judge()
+        return {
+            "output": judge.clip(run_result.get("output", "")),
+            "stdout": judge.clip(run_result.get("stdout")),
+            "stderr": judge.clip(run_result.get("stderr")),
+            "code": run_result.get("code"),
+            "signal": run_result.get("signal"),
+            "truncated": bool(run_result.get("truncated")),
+            "language": language.lower(),
+            "runtime": run_metrics(run_result),
+        }
+
+    except RunCancelledError as e:
+        return JSONResponse(
+            status_code=409,
+            content={"error": e.message, "reason": e.reason}
+        )
+    except PreflightError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": e.message, "detail": e.detail, "preflight": e.to_dict()}
+        )
+    except ValidationError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Validation failed", "detail": str(e)}
+        )
+    except DeadlineExceededError as e:
+        return JSONResponse(
+            status_code=504,
+            content={"error": e.message, "stage": e.stage}
+        )
+    except ServiceUnavailableError as e:
+        return JSONResponse(
+            status_code=503,
+            content={"error": e.message}
+        )
+    except Exception as e:
+        logger.error(f"Error in /runs: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Internal server error", "detail": str(e)}
+        )
@@ -1,16 +1,34 @@
-from fastapi import APIRouter, Depends, Form
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, Form, Header, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from typing import Dict, Any, List, Optional
+import asyncio
+import json
 import logging
+import time
 import traceback
 
-from database import get_db
+from config import get_settings
+from database import get_db, SessionLocal
 from models.user import User
+from schemas.submission import BatchSubmissionRequest, BatchSubmissionItem
 from services.code_execution_service import CodeExecutionService
+from services.http_client import get_executor_http_client
 from services.problem_service import ProblemService
 from services.adventure_service import AdventureService
-from dependencies import get_current_user
-from exceptions import NotFoundError, ValidationError
+from services.rate_limiter import get_rate_limiter, execution_cost
+from services.judge import CaseResult, JudgeCase, get_output_judge
+from services.execution_metrics import instrument_submission
+from services.deadlines import check_deadline, deadline_for, with_deadline
+from services.idempotency import idempotent
+from services.submission_pipeline import (
+    SubmissionContext,
+    attempt_pipeline,
+    guest_pipeline,
+    submission_error_response
+)
+from dependencies import get_current_user, limit_user_execution, limit_guest_execution
+from exceptions import NotFoundError, ValidationError, PreflightError, ServiceUnavailableError, DeadlineExceededError, AppException
 
 router = APIRouter(tags=["submissions"])
 logger = logging.getLogger("uvicorn.error")
@@ -18,7 +36,7 @@ logger = logging.getLogger("uvicorn.error")
 
 def get_code_execution_service() -> CodeExecutionService:
     
-    return CodeExecutionService()
+    return CodeExecutionService(get_executor_http_client())
 
 
 def get_problem_service(db: Session = Depends(get_db)) -> ProblemService:
@@ -31,11 +49,17 @@ def get_adventure_service(db: Session = Depends(get_db)) -> AdventureService:
     return AdventureService(db)
 
 
-@router.post("/submissions")
+@router.post("/submissions", dependencies=[Depends(limit_guest_execution)])
+@instrument_submission("submit_solution")
+@idempotent("submit_solution")
+@with_deadline("submit_solution")
 async def submit_solution(
+    request: Request,
     access_code: str = Form(...),
     code: str = Form(...),
     language: str = Form(...),
+    fail_fast: Optional[bool] = Form(None),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     problem_service: ProblemService = Depends(get_problem_service),
     code_execution_service: CodeExecutionService = Depends(get_code_execution_service)
 ):
@@ -45,27 +69,33 @@ async def submit_solution(
         problem = problem_service.get_problem_by_access_code(access_code.lower())
         
         
-        run_result = await code_execution_service.execute_code(code, language)
-        user_output = run_result.get("output", "").strip()
-        expected_output = problem.expected_output.strip()
-
-        
-        is_correct = (user_output == expected_output)
+        judge = get_output_judge()
+        cases = judge.cases_for_problem(problem)
+        check_deadline("lookup")
+        report = await judge.run_cases(
+            cases,
+            lambda stdin: code_execution_service.execute_code(code, language, stdin, priority="problem"),
+            fail_fast
+        )
+        run_result = report.run
+        user_output = run_result.get("output", "")
+        is_correct = report.is_correct
         
         if is_correct:
-            message = "Correct! Well done."
             problem_service.increment_completions(problem)
-        else:
-            message = f"Incorrect. Expected output:\n{expected_output}\n\nYour output:\n{user_output}"
 
         return {
-            "message": message,
-            "output": user_output,
-            "stdout": run_result.get("stdout"),
-            "stderr": run_result.get("stderr"),
+            "message": report.message(),
+            "output": judge.clip(user_output.strip()),
+            "stdout": judge.clip(run_result.get("stdout")),
+            "stderr": judge.clip(run_result.get("stderr")),
             "ran": bool(run_result),
             "language": language.lower(),
-            "is_correct": is_correct
+            "is_correct": is_correct,
+            "diff": report.verdict.diff,
+            "verdict": report.status,
+            "runtime": report.runtime(),
+            "test_cases": report.cases()
         }
 
     except NotFoundError:
@@ -73,11 +103,26 @@ async def submit_solution(
             status_code=404,
             content={"error": "Problem not found"}
         )
+    except PreflightError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": e.message, "detail": e.detail, "preflight": e.to_dict()}
+        )
     except ValidationError as e:
         return JSONResponse(
             status_code=400,
             content={"error": "Validation failed", "detail": str(e)}
         )
+    except DeadlineExceededError as e:
+        return JSONResponse(
+            status_code=504,
+            content={"error": e.message, "stage": e.stage}
+        )
+    except ServiceUnavailableError as e:
+        return JSONResponse(
+            status_code=503,
+            content={"error": e.message}
+        )
     except Exception as e:
         logger.error(f"Error in /submissions: {e}")
         logger.error(traceback.format_exc())
@@ -87,87 +132,157 @@ async def submit_solution(
         )
 
 
-@router.post("/adventure_submissions")
-async def submit_adventure_problem(
-    attempt_id: int = Form(...),
-    node_id: str = Form(...),
+@router.post("/submissions/stream", dependencies=[Depends(limit_guest_execution)])
+async def stream_solution(
+    access_code: str = Form(...),
     code: str = Form(...),
     language: str = Form(...),
-    current_user: User = Depends(get_current_user),
-    adventure_service: AdventureService = Depends(get_adventure_service),
+    fail_fast: Optional[bool] = Form(None),
+    problem_service: ProblemService = Depends(get_problem_service),
     code_execution_service: CodeExecutionService = Depends(get_code_execution_service)
 ):
+    """
+    Streaming variant of POST /submissions. Sends stdout and stderr chunks as Server-Sent
+    Events while the program runs and finishes with a "verdict" event. Only the first
+    test case is streamed, the others are judged once it finishes.
+    """
 
     try:
-       
-        attempt = adventure_service.get_attempt_by_id(attempt_id, current_user)
-        
-        
-        adventure = adventure_service.get_adventure_by_id(attempt.adventure_id)
-        node_entry = next(
-            (n for n in adventure.graph_data["nodes"] if n["id"] == node_id),
-            None
-        )
-        
-        if not node_entry:
-            return JSONResponse(
-                status_code=404,
-                content={"error": "Node not found in this adventure"}
-            )
-        
-        expected_output = node_entry["data"]["expected_output"].strip()
-        
-        
-        run_result = await code_execution_service.execute_code(code, language)
-        user_output = run_result.get("output", "").strip()
-        
-        
-        is_correct = (user_output == expected_output)
-        message = (
-            "Correct! Well done."
-            if is_correct
-            else f"Incorrect. Expected:\n{expected_output}\n\nYour output:\n{user_output}"
-        )
-        
-     
-        adventure_service.submit_adventure_problem(
-            attempt_id, node_id, code, user_output, is_correct, current_user
-        )
-        
-        return {
-            "message": message,
-            "output": user_output,
-            "stdout": run_result.get("stdout"),
-            "stderr": run_result.get("stderr"),
-            "is_correct": is_correct,
-        }
-        
-    except NotFoundError as e:
+        problem = problem_service.get_problem_by_access_code(access_code.lower())
+        problem_id = problem.id
+        judge = get_output_judge()
+        cases = judge.cases_for_problem(problem)
+        code_execution_service.get_version(language)
+        code_execution_service.get_extension(language)
+
+    except NotFoundError:
         return JSONResponse(
             status_code=404,
-            content={"error": str(e)}
+            content={"error": "Problem not found"}
         )
     except ValidationError as e:
         return JSONResponse(
             status_code=400,
             content={"error": "Validation failed", "detail": str(e)}
         )
+
+    def sse(event: str, data: Dict[str, Any]) -> str:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    # the body streams after this handler returns, so the deadline is passed along rather than set for the handler
+    deadline = deadline_for("stream_solution")
+
+    async def events():
+        try:
+            started = time.monotonic()
+            run_result: Dict[str, Any] = {}
+            comparator = judge.comparator(cases[0].expected)
+            async for event in code_execution_service.stream_code(
+                code, language, priority="problem", deadline=deadline, comparator=comparator
+            ):
+                if "result" in event:
+                    run_result = event["result"]
+                else:
+                    yield sse(event["stream"], {"data": event["data"]})
+
+            if run_result.get("stopped_early"):
+                # stopped at the first difference (or the output cap), the comparator has the verdict
+                verdict = judge.judge_run(cases[0], run_result, comparator.finish())
+            else:
+                # the events stop at STREAM_OUTPUT_MAX_BYTES, the run's own output does not
+                verdict = judge.judge_run(cases[0], run_result)
+            streamed = CaseResult(0, verdict, run_result, round((time.monotonic() - started) * 1000, 2))
+            report = await judge.run_cases(
+                cases,
+                lambda stdin: code_execution_service.execute_code(
+                    code, language, stdin, priority="problem", deadline=deadline
+                ),
+                fail_fast,
+                completed=[streamed]
+            )
+            is_correct = report.is_correct
+            if is_correct:
+                # the request's session is closed once streaming starts, so persist through a fresh one
+                db = SessionLocal()
+                try:
+                    problem_service = ProblemService(db)
+                    problem_service.increment_completions(problem_service.get_problem_by_id(problem_id))
+                finally:
+                    db.close()
+
+            yield sse("verdict", {
+                "message": report.message(),
+                "ran": bool(run_result),
+                "language": language.lower(),
+                "code": run_result.get("code"),
+                "signal": run_result.get("signal"),
+                "truncated": bool(run_result.get("truncated")),
+                "is_correct": is_correct,
+                "diff": report.verdict.diff,
+                "verdict": report.status,
+                "runtime": report.runtime(),
+                "test_cases": report.cases()
+            })
+
+        except PreflightError as e:
+            yield sse("error", {"error": e.message, "detail": e.detail, "preflight": e.to_dict()})
+        except AppException as e:
+            yield sse("error", {"error": e.message, "detail": e.detail})
+        except Exception as e:
+            logger.error(f"Error in /submissions/stream: {e}")
+            logger.error(traceback.format_exc())
+            yield sse("error", {"error": "Internal server error"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/adventure_submissions", dependencies=[Depends(limit_user_execution)])
+@instrument_submission("submit_adventure_problem")
+@idempotent("submit_adventure_problem")
+@with_deadline("submit_adventure_problem")
+async def submit_adventure_problem(
+    response: Response,
+    attempt_id: int = Form(...),
+    node_id: str = Form(...),
+    code: str = Form(...),
+    language: str = Form(...),
+    fail_fast: Optional[bool] = Form(None),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: User = Depends(get_current_user),
+    adventure_service: AdventureService = Depends(get_adventure_service),
+    code_execution_service: CodeExecutionService = Depends(get_code_execution_service)
+):
+
+    context = SubmissionContext(
+        code, language, node_id, fail_fast, priority="attempt", user=current_user, attempt_id=attempt_id
+    )
+    try:
+        await attempt_pipeline(adventure_service, code_execution_service).run(context)
     except Exception as e:
-        logger.error(f"Error in adventure submission: {e}")
-        logger.error(traceback.format_exc())
-        return JSONResponse(
-            status_code=500,
-            content={"error": "Internal server error", "detail": str(e)}
-        )
+        return submission_error_response(e, context, "adventure submission")
+
+    response.headers["Server-Timing"] = context.server_timing()
+    return context.response
 
 
-@router.post("/adventure_submissions/guest_by_id")
+@router.post("/adventure_submissions/guest_by_id", dependencies=[Depends(limit_guest_execution)])
+@instrument_submission("submit_guest_adventure_problem")
+@idempotent("submit_guest_adventure_problem")
+@with_deadline("submit_guest_adventure_problem")
 async def submit_guest_adventure_problem_by_id(
+    request: Request,
+    response: Response,
     adventure_id: int = Form(...),
     node_id: str = Form(...),
     code: str = Form(...),
     language: str = Form(...),
     guest_mode: str = Form(...),
+    fail_fast: Optional[bool] = Form(None),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     adventure_service: AdventureService = Depends(get_adventure_service),
     code_execution_service: CodeExecutionService = Depends(get_code_execution_service)
 ):
@@ -176,63 +291,139 @@ async def submit_guest_adventure_problem_by_id(
     Validates code against expected output but does NOT save any data to the database.
     """
     
-    try:
-        logger.info(f"Guest submission received for adventure_id: {adventure_id}, node_id: {node_id}")
-        
-        if guest_mode != "true":
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Invalid guest submission"}
-            )
- 
-        adventure = adventure_service.get_adventure_by_id(adventure_id)
-        node_entry = next(
-            (n for n in adventure.graph_data["nodes"] if n["id"] == node_id),
-            None
-        )
-        
-        if not node_entry:
-            return JSONResponse(
-                status_code=404,
-                content={"error": "Node not found in this adventure"}
-            )
-   
-        expected_output = node_entry["data"]["expected_output"].strip()
-        run_result = await code_execution_service.execute_code(code, language)
-        user_output = run_result.get("output", "").strip()
-        is_correct = (user_output == expected_output)
-        
-        if is_correct:
-            message = "Correct! Well done. (Guest mode - progress not saved)"
-        else:
-            message = f"Incorrect. Expected:\n{expected_output}\n\nYour output:\n{user_output}\n\n(Guest mode - progress not saved)"
-        
-        
-        return {
-            "message": message,
-            "output": user_output,
-            "stdout": run_result.get("stdout"),
-            "stderr": run_result.get("stderr"),
-            "is_correct": is_correct,
-            "guest_mode": True
-        }
-        
-    except NotFoundError as e:
-        logger.error(f"NotFoundError in guest submission: {e}")
+    logger.info(f"Guest submission received for adventure_id: {adventure_id}, node_id: {node_id}")
+
+    if guest_mode != "true":
         return JSONResponse(
-            status_code=404,
-            content={"error": str(e)}
+            status_code=400,
+            content={"error": "Invalid guest submission"}
         )
-    except ValidationError as e:
-        logger.error(f"ValidationError in guest submission: {e}")
+
+    context = SubmissionContext(
+        code, language, node_id, fail_fast, priority="guest", adventure_id=adventure_id
+    )
+    try:
+        await guest_pipeline(adventure_service, code_execution_service).run(context)
+    except Exception as e:
+        return submission_error_response(e, context, "guest adventure submission by ID")
+
+    response.headers["Server-Timing"] = context.server_timing()
+    return {
+        **context.response,
+        "message": f"{context.response['message']}\n\n(Guest mode - progress not saved)",
+        "guest_mode": True
+    }
+
+
+@router.post("/submissions/batch")
+@idempotent("submit_batch")
+@with_deadline("submit_batch")
+async def submit_batch(
+    batch: BatchSubmissionRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: User = Depends(get_current_user),
+    problem_service: ProblemService = Depends(get_problem_service),
+    adventure_service: AdventureService = Depends(get_adventure_service),
+    code_execution_service: CodeExecutionService = Depends(get_code_execution_service)
+):
+    """
+    Judges many (code, language, problem or node) items concurrently and returns one
+    verdict per item in input order. Nothing is persisted, so this is safe for re-judging.
+    """
+
+    settings = get_settings()
+    if not batch.items:
         return JSONResponse(
             status_code=400,
-            content={"error": "Validation failed", "detail": str(e)}
+            content={"error": "Validation failed", "detail": "Batch is empty"}
         )
-    except Exception as e:
-        logger.error(f"Error in guest adventure submission by ID: {e}")
-        logger.error(traceback.format_exc())
+    if len(batch.items) > settings.BATCH_MAX_ITEMS:
         return JSONResponse(
-            status_code=500,
-            content={"error": "Internal server error", "detail": str(e)}
-        )
\ No newline at end of file
+            status_code=400,
+            content={"error": "Validation failed", "detail": f"At most {settings.BATCH_MAX_ITEMS} items per batch"}
+        )
+
+    get_rate_limiter().check(
+        "user",
+        str(current_user.id),
+        sum(execution_cost(item.language, item.code) for item in batch.items)
+    )
+
+    started = time.monotonic()
+    output_judge = get_output_judge()
+    problems: Dict[str, Any] = {}
+    adventures: Dict[int, Any] = {}
+
+    def resolve_cases(item: BatchSubmissionItem) -> List[JudgeCase]:
+        if item.access_code is not None:
+            access_code = item.access_code.lower()
+            if access_code not in problems:
+                problems[access_code] = problem_service.get_problem_by_access_code(access_code)
+            return output_judge.cases_for_problem(problems[access_code])
+
+        if item.adventure_id not in adventures:
+            adventures[item.adventure_id] = adventure_service.get_adventure_by_id(item.adventure_id)
+        node_entry = adventure_service.find_node(adventures[item.adventure_id], item.node_id)
+        return output_judge.cases_for_node(item.adventure_id, node_entry)
+
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+    async def judge(index: int, item: BatchSubmissionItem, cases: List[JudgeCase]) -> Dict[str, Any]:
+        async with semaphore:
+            item_started = time.monotonic()
+            try:
+                report = await output_judge.run_cases(
+                    cases,
+                    lambda stdin: code_execution_service.execute_code(item.code, item.language, stdin, priority="problem"),
+                    batch.fail_fast
+                )
+                run_result = report.run
+                user_output = run_result.get("output", "")
+                return {
+                    "index": index,
+                    "status": "ok",
+                    "is_correct": report.is_correct,
+                    "diff": report.verdict.diff,
+                    "verdict": report.status,
+                    "runtime": report.runtime(),
+                    "test_cases": report.cases(),
+                    "output": output_judge.clip(user_output.strip()),
+                    "stdout": output_judge.clip(run_result.get("stdout")),
+                    "stderr": output_judge.clip(run_result.get("stderr")),
+                    "duration_ms": round((time.monotonic() - item_started) * 1000, 2),
+                }
+            except Exception as e:
+                if not isinstance(e, AppException):
+                    logger.error(f"Error judging batch item {index}: {e}")
+                result = {
+                    "index": index,
+                    "status": "error",
+                    "error": e.message if isinstance(e, AppException) else "Internal server error",
+                    "duration_ms": round((time.monotonic() - item_started) * 1000, 2),
+                }
+                if isinstance(e, PreflightError):
+                    result["preflight"] = e.to_dict()
+                return result
+
+    tasks = []
+    results = [None] * len(batch.items)
+    for index, item in enumerate(batch.items):
+        try:
+            cases = resolve_cases(item)
+        except NotFoundError as e:
+            results[index] = {"index": index, "status": "error", "error": e.message, "duration_ms": 0.0}
+            continue
+        tasks.append(judge(index, item, cases))
+
+    for result in await asyncio.gather(*tasks):
+        results[result["index"]] = result
+
+    succeeded = [r for r in results if r["status"] == "ok"]
+    return {
+        "results": results,
+        "total": len(results),
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "correct": sum(1 for r in succeeded if r["is_correct"]),
+        "duration_ms": round((time.monotonic() - started) * 1000, 2),
+    }
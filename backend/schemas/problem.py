@@ -1,7 +1,11 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional, Literal
 from datetime import datetime
 
+class TestCase(BaseModel):
+    stdin: str = ""
+    expected_output: str
+
 class ProblemBase(BaseModel):
     title: str
     description: str
@@ -9,6 +13,12 @@ class ProblemBase(BaseModel):
     expected_output: str
     language: str
     is_public: bool = False
+    judge_mode: Literal["strip", "exact", "trim_lines", "float"] = "strip"
+    float_tolerance: Optional[float] = None
+    # extra cases judged alongside expected_output, which is always case 0 with no stdin
+    test_cases: Optional[List[TestCase]] = None
+    time_limit_ms: Optional[int] = Field(None, gt=0)
+    memory_limit_mb: Optional[int] = Field(None, gt=0)
 
 class ProblemCreate(ProblemBase):
     pass
@@ -20,6 +30,11 @@ class ProblemUpdate(BaseModel):
     expected_output: Optional[str] = None
     language: Optional[str] = None
     is_public: Optional[bool] = None
+    judge_mode: Optional[Literal["strip", "exact", "trim_lines", "float"]] = None
+    float_tolerance: Optional[float] = None
+    test_cases: Optional[List[TestCase]] = None
+    time_limit_ms: Optional[int] = Field(None, gt=0)
+    memory_limit_mb: Optional[int] = Field(None, gt=0)
 
 class ProblemResponse(ProblemBase):
     id: int
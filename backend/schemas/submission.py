@@ -0,0 +1,22 @@
+from pydantic import BaseModel, model_validator
+from typing import List, Optional
+
+
+class BatchSubmissionItem(BaseModel):
+    code: str
+    language: str
+    access_code: Optional[str] = None
+    adventure_id: Optional[int] = None
+    node_id: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if self.access_code is None and (self.adventure_id is None or self.node_id is None):
+            raise ValueError("each item needs an access_code or an adventure_id and node_id")
+        return self
+
+
+class BatchSubmissionRequest(BaseModel):
+    items: List[BatchSubmissionItem]
+    # None means the JUDGE_FAIL_FAST setting
+    fail_fast: Optional[bool] = None
@@ -0,0 +1,292 @@
+import threading
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import get_settings
+from exceptions import GraphValidationError
+
+# node or edge IDs listed per problem in a validation error, the count is always exact
+MAX_REPORTED_IDS = 20
+
+
+class GraphNode:
+    """One node of a compiled adventure graph.
+
+    `entry` is the node's dict as stored in graph_data, for code that
+    still reads it (e.g. the judge's test cases).
+    """
+
+    __slots__ = ("id", "index", "type", "entry", "successors", "predecessors")
+
+    def __init__(self, node_id: str, index: int, node_type: Optional[str], entry: Dict[str, Any]):
+        self.id = node_id
+        self.index = index
+        self.type = node_type
+        self.entry = entry
+        self.successors: Tuple[str, ...] = ()
+        self.predecessors: Tuple[str, ...] = ()
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        return self.entry.get("data") or {}
+
+
+class AdventureGraph:
+    """An adventure's graph_data compiled for lookups: nodes by ID plus successor and predecessor adjacency.
+
+    Built once per (adventure, graph revision) and shared between requests,
+    so it must not be modified after compile_graph returns.
+    """
+
+    __slots__ = ("adventure_id", "revision", "nodes", "edge_count")
+
+    def __init__(self, adventure_id: Optional[int], revision: Optional[int], nodes: Dict[str, GraphNode], edge_count: int):
+        self.adventure_id = adventure_id
+        self.revision = revision
+        self.nodes = nodes
+        self.edge_count = edge_count
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self.nodes
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __iter__(self) -> Iterator[GraphNode]:
+        return iter(self.nodes.values())
+
+    def get(self, node_id: str) -> Optional[GraphNode]:
+        return self.nodes.get(node_id)
+
+    def successors(self, node_id: str) -> Tuple[str, ...]:
+        return self.nodes[node_id].successors
+
+    def predecessors(self, node_id: str) -> Tuple[str, ...]:
+        return self.nodes[node_id].predecessors
+
+
+def compile_graph(
+    graph_data: Dict[str, Any],
+    adventure_id: Optional[int] = None,
+    revision: Optional[int] = None
+) -> AdventureGraph:
+    """Index graph_data's nodes by ID and build adjacency from its edges in one pass over each.
+
+    Edges whose ends are not nodes of the graph are left out of the adjacency.
+    """
+
+    nodes: Dict[str, GraphNode] = {}
+    for index, entry in enumerate(graph_data.get("nodes") or []):
+        nodes[entry["id"]] = GraphNode(entry["id"], index, entry.get("type"), entry)
+
+    successors: Dict[str, List[str]] = {}
+    predecessors: Dict[str, List[str]] = {}
+    edge_count = 0
+    for edge in graph_data.get("edges") or []:
+        source, target = edge.get("source"), edge.get("target")
+        if source not in nodes or target not in nodes:
+            continue
+        successors.setdefault(source, []).append(target)
+        predecessors.setdefault(target, []).append(source)
+        edge_count += 1
+
+    for node_id, node in nodes.items():
+        node.successors = tuple(successors.get(node_id, ()))
+        node.predecessors = tuple(predecessors.get(node_id, ()))
+    return AdventureGraph(adventure_id, revision, nodes, edge_count)
+
+
+def _problem(check: str, message: str, ids: List[str]) -> Dict[str, Any]:
+    shown = ids[:MAX_REPORTED_IDS]
+    more = f" and {len(ids) - len(shown)} more" if len(ids) > len(shown) else ""
+    return {
+        "check": check,
+        "message": f"{message}: {', '.join(map(str, shown))}{more}" if ids else message,
+        "ids": shown,
+        "count": len(ids),
+    }
+
+
+def validate_graph(graph_data: Dict[str, Any]) -> Tuple[str, str]:
+    """Check an adventure graph and return its (start node ID, end node ID).
+
+    One pass over the edges counts degrees and catches edges whose ends are
+    not nodes. The graph then needs exactly one start (no incoming edges
+    other than "incorrect" ones) and one end (no outgoing edges), every node reachable from the start,
+    and no cycle a solver could follow forever: a topological sort over
+    every edge except "incorrect" ones, which may lead back to an earlier
+    problem for another try. Everything found is raised together as a
+    GraphValidationError. O(N + E) throughout.
+    """
+
+    nodes = graph_data.get("nodes") or []
+    edges = graph_data.get("edges") or []
+    if not nodes:
+        raise GraphValidationError([_problem("empty", "Adventure has no problems", [])])
+
+    problems: List[Dict[str, Any]] = []
+    out_degree: Dict[str, int] = {}
+    duplicates: List[str] = []
+    for node in nodes:
+        if node["id"] in out_degree:
+            duplicates.append(node["id"])
+        out_degree[node["id"]] = 0
+    if duplicates:
+        problems.append(_problem("duplicate_node", "Problems share an ID", duplicates))
+
+    successors: Dict[str, List[str]] = {}
+    # edges a correct answer (or an unconditional move) follows, these must not form a cycle
+    forward: Dict[str, List[str]] = {}
+    forward_in_degree = dict.fromkeys(out_degree, 0)
+    dangling: List[str] = []
+    for edge in edges:
+        source, target = edge["source"], edge["target"]
+        if source not in out_degree or target not in out_degree:
+            dangling.append(edge.get("id"))
+            continue
+        out_degree[source] += 1
+        successors.setdefault(source, []).append(target)
+        if (edge.get("data") or {}).get("condition") != "incorrect":
+            forward.setdefault(source, []).append(target)
+            forward_in_degree[target] += 1
+    if dangling:
+        problems.append(_problem("dangling_edge", "Connections point at problems that do not exist", dangling))
+
+    # an "incorrect" edge back to the first problem does not stop it being the start
+    starts = [node_id for node_id, degree in forward_in_degree.items() if degree == 0]
+    ends = [node_id for node_id, degree in out_degree.items() if degree == 0]
+    if not starts:
+        problems.append(_problem("no_start", "Adventure must have a starting problem with no incoming connections", []))
+    elif len(starts) > 1:
+        problems.append(_problem("multiple_starts", "Adventure can only have one starting problem", starts))
+    if not ends:
+        problems.append(_problem("no_end", "Adventure must have an ending problem with no outgoing connections", []))
+    elif len(ends) > 1:
+        problems.append(_problem("multiple_ends", "Adventure can only have one ending problem", ends))
+
+    if starts:
+        # from every start, so a second start's own branch is not reported twice
+        reached = set(starts)
+        queue = deque(starts)
+        while queue:
+            for target in successors.get(queue.popleft(), ()):
+                if target not in reached:
+                    reached.add(target)
+                    queue.append(target)
+        unreachable = [node_id for node_id in out_degree if node_id not in reached]
+        if unreachable:
+            problems.append(_problem("unreachable", "These problems cannot be reached from the start", unreachable))
+
+    # Kahn's algorithm, whatever it cannot order is on a cycle or after one
+    queue = deque(node_id for node_id, degree in forward_in_degree.items() if degree == 0)
+    ordered = 0
+    while queue:
+        node_id = queue.popleft()
+        ordered += 1
+        for target in forward.get(node_id, ()):
+            forward_in_degree[target] -= 1
+            if forward_in_degree[target] == 0:
+                queue.append(target)
+    if ordered < len(forward_in_degree):
+        problems.append(_problem(
+            "cycle",
+            "Correct answers lead round in a loop through these problems",
+            _cycle_nodes(forward, forward_in_degree)
+        ))
+
+    if problems:
+        raise GraphValidationError(problems)
+    return starts[0], ends[0]
+
+
+def _cycle_nodes(forward: Dict[str, List[str]], remaining_in_degree: Dict[str, int]) -> List[str]:
+    """Narrow what Kahn's algorithm left over to the nodes on a cycle.
+
+    The leftovers include nodes that only come after a cycle. Peeling off
+    leftovers with no outgoing edge inside the leftover set, repeatedly,
+    removes those and keeps the cycles themselves.
+    """
+
+    left = {node_id for node_id, degree in remaining_in_degree.items() if degree > 0}
+    out_degree = {node_id: 0 for node_id in left}
+    predecessors: Dict[str, List[str]] = {}
+    for source in left:
+        for target in forward.get(source, ()):
+            if target in left:
+                out_degree[source] += 1
+                predecessors.setdefault(target, []).append(source)
+
+    queue = deque(node_id for node_id, degree in out_degree.items() if degree == 0)
+    while queue:
+        node_id = queue.popleft()
+        left.discard(node_id)
+        for source in predecessors.get(node_id, ()):
+            out_degree[source] -= 1
+            if out_degree[source] == 0:
+                queue.append(source)
+    return [node_id for node_id in remaining_in_degree if node_id in left]
+
+
+class AdventureGraphCache:
+    """Compiled graphs keyed by (adventure ID, graph revision), least recently used evicted first.
+
+    An adventure's graph_revision goes up whenever its graph is edited, so
+    a stale graph is never served; the entry for the old revision is
+    dropped as soon as the new one is compiled.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._graphs: "OrderedDict[Tuple[int, int], AdventureGraph]" = OrderedDict()
+        self._revisions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, adventure) -> AdventureGraph:
+        adventure_id, revision = adventure.id, adventure.graph_revision
+        if adventure_id is None or revision is None or self.max_entries <= 0:
+            # not saved yet (or caching off), nothing to key it by
+            return compile_graph(adventure.graph_data, adventure_id, revision)
+
+        key = (adventure_id, revision)
+        with self._lock:
+            graph = self._graphs.get(key)
+            if graph is not None:
+                self._graphs.move_to_end(key)
+                self.hits += 1
+                return graph
+            self.misses += 1
+
+        graph = compile_graph(adventure.graph_data, adventure_id, revision)
+
+        with self._lock:
+            previous = self._revisions.get(adventure_id)
+            if previous is not None and previous != revision:
+                self._graphs.pop((adventure_id, previous), None)
+            self._revisions[adventure_id] = revision
+            self._graphs[key] = graph
+            while len(self._graphs) > self.max_entries:
+                (evicted_id, evicted_revision), _ = self._graphs.popitem(last=False)
+                if self._revisions.get(evicted_id) == evicted_revision:
+                    del self._revisions[evicted_id]
+                self.evictions += 1
+        return graph
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._graphs),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+@lru_cache()
+def get_adventure_graph_cache() -> AdventureGraphCache:
+    return AdventureGraphCache(get_settings().ADVENTURE_GRAPH_CACHE_ENTRIES)
@@ -9,6 +9,39 @@ from models.submission import AdventureProblemSubmission
 from models.user import User
 from schemas.adventure import AdventureCreate, AdventureUpdate, AdventureProgress, NodeStatus
 from exceptions import NotFoundError, ValidationError, AuthorisationError
+from services.adventure_graph import get_adventure_graph_cache, validate_graph
+
+
+def _distribution(values: List[int], buckets: int = 10) -> Dict[str, Any]:
+    """Nearest-rank percentiles and an equal-width histogram of `values`."""
+
+    if not values:
+        return {"count": 0, "min": None, "max": None, "p50": None, "p90": None, "p99": None, "histogram": []}
+
+    ordered = sorted(values)
+
+    def percentile(pct: float) -> int:
+        return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+    low, high = ordered[0], ordered[-1]
+    width = max(1, -(-(high - low + 1) // buckets))
+    counts = [0] * buckets
+    for value in ordered:
+        counts[min(buckets - 1, (value - low) // width)] += 1
+    histogram = [
+        {"from": low + i * width, "to": low + (i + 1) * width, "count": count}
+        for i, count in enumerate(counts)
+        if low + i * width <= high
+    ]
+    return {
+        "count": len(ordered),
+        "min": low,
+        "max": high,
+        "p50": percentile(50),
+        "p90": percentile(90),
+        "p99": percentile(99),
+        "histogram": histogram,
+    }
 
 
 class AdventureService:
@@ -49,33 +82,10 @@ class AdventureService:
         
         return {"nodes": nodes, "edges": edges}
 
-    def _find_start_and_end_nodes(self, nodes: List[Dict], edges: List[Dict]) -> tuple[Dict, Dict]:
-       
-        start_node = None
-        for node in nodes:
-            if not any(edge["target"] == node["id"] for edge in edges):
-                start_node = node
-                break
-        
-        end_node = None
-        for node in nodes:
-            if not any(edge["source"] == node["id"] for edge in edges):
-                end_node = node
-                break
-        
-        if not start_node or not end_node:
-            raise ValidationError("Adventure must have a clear start and end node")
-        
-        return start_node, end_node
-
     def create_adventure(self, adventure_data: AdventureCreate, creator: User) -> Adventure:
  
         graph_data = self._process_graph_data(adventure_data.graph_data)
-        nodes = graph_data["nodes"]
-        edges = graph_data["edges"]
-        
-      
-        start_node, end_node = self._find_start_and_end_nodes(nodes, edges)
+        start_node_id, end_node_id = validate_graph(graph_data)
         
 
         approval_status = "draft"
@@ -94,8 +104,8 @@ class AdventureService:
             is_public=False,
             approval_status=approval_status,
             approval_requested_at=approval_requested_at,
-            start_node_id=start_node["id"],
-            end_node_id=end_node["id"],
+            start_node_id=start_node_id,
+            end_node_id=end_node_id,
             total_attempts=0,
             total_completions=0,
             access_code=access_code
@@ -191,7 +201,11 @@ class AdventureService:
         
         if adventure_update.graph_data is not None:
             graph_data = self._process_graph_data(adventure_update.graph_data)
+            adventure.start_node_id, adventure.end_node_id = validate_graph(graph_data)
             adventure.graph_data = graph_data
+            # cached compiled graphs are keyed by revision, so the old one stops being served; incremented
+            # in SQL so concurrent edits in different workers never share a revision
+            adventure.graph_revision = Adventure.graph_revision + 1
         
         self.db.commit()
         self.db.refresh(adventure)
@@ -385,30 +399,55 @@ class AdventureService:
         code: str, 
         output: str, 
         is_correct: bool, 
-        user: User
+        user: User,
+        verdict: Optional[str] = None,
+        runtime: Optional[Dict[str, Optional[int]]] = None
     ) -> AdventureProblemSubmission:
         
-      
-        attempt = self.db.query(AdventureAttempt).filter_by(id=attempt_id).first()
-        if not attempt or attempt.user_id != user.id:
-            raise NotFoundError("Adventure attempt")
-        
-        
-        adventure = attempt.adventure
-        node_entry = next(
-            (n for n in adventure.graph_data["nodes"] if n["id"] == node_id),
-            None
+        attempt = self.get_owned_attempt(attempt_id, user)
+        self.find_node(attempt.adventure, node_id)
+        return self.record_submission(attempt, node_id, code, output, is_correct, verdict, runtime)
+
+    def get_owned_attempt(self, attempt_id: int, user: User) -> AdventureAttempt:
+        # one lookup; someone else's attempt is reported as missing rather than forbidden
+        attempt = (
+            self.db.query(AdventureAttempt)
+            .filter(AdventureAttempt.id == attempt_id, AdventureAttempt.user_id == user.id)
+            .first()
         )
-        if not node_entry:
-            raise NotFoundError("Node not found in this adventure")
-        
-        
+        if not attempt:
+            raise NotFoundError("Adventure attempt")
+        return attempt
+
+    def find_node(self, adventure: Adventure, node_id: str) -> Dict[str, Any]:
+        node = get_adventure_graph_cache().get(adventure).get(node_id)
+        if node is None:
+            raise NotFoundError("Node", "Node not found in this adventure")
+        return node.entry
+
+    def record_submission(
+        self,
+        attempt: AdventureAttempt,
+        node_id: str,
+        code: str,
+        output: str,
+        is_correct: bool,
+        verdict: Optional[str] = None,
+        runtime: Optional[Dict[str, Optional[int]]] = None
+    ) -> AdventureProblemSubmission:
+        """Save a judged submission against an attempt the caller has already loaded and checked."""
+
+        runtime = runtime or {}
         submission = AdventureProblemSubmission(
-            attempt_id=attempt_id,
+            attempt_id=attempt.id,
             node_id=node_id,
             code_submitted=code,
             output=output,
             is_correct=is_correct,
+            verdict=verdict or ("correct" if is_correct else "incorrect"),
+            cpu_time_ms=runtime.get("cpu_time_ms"),
+            wall_time_ms=runtime.get("wall_time_ms"),
+            memory_bytes=runtime.get("memory_bytes"),
             created_at=datetime.now(timezone.utc),
         )
         self.db.add(submission)
@@ -419,15 +458,50 @@ class AdventureService:
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "outcome": "correct" if is_correct else "incorrect",
         }
-        if not attempt.path_taken:
-            attempt.path_taken = []
+        attempt.path_taken = attempt.path_taken or []
         attempt.path_taken.append(entry)
+        flag_modified(attempt, "path_taken")
         attempt.current_node_id = node_id
         
         self.db.commit()
         self.db.refresh(submission)
         return submission
 
+    def get_runtime_distribution(self, adventure_id: int, node_id: str, user: User) -> Dict[str, Any]:
+        """Time and memory used by the accepted submissions for a node, for the adventure's creator."""
+
+        adventure = self.get_adventure_by_id(adventure_id)
+        if adventure.creator_id != user.id:
+            raise AuthorisationError("Only the creator can view runtime statistics for this adventure")
+        if node_id not in get_adventure_graph_cache().get(adventure):
+            raise NotFoundError("Node")
+
+        rows = (
+            self.db.query(
+                AdventureProblemSubmission.cpu_time_ms,
+                AdventureProblemSubmission.wall_time_ms,
+                AdventureProblemSubmission.memory_bytes
+            )
+            .join(AdventureAttempt, AdventureAttempt.id == AdventureProblemSubmission.attempt_id)
+            .filter(
+                AdventureAttempt.adventure_id == adventure_id,
+                AdventureProblemSubmission.node_id == node_id,
+                AdventureProblemSubmission.is_correct.is_(True)
+            )
+            .all()
+        )
+
+        # CPU time where the executor reported it, as that is what time limits are checked against
+        times = [cpu if cpu is not None else wall for cpu, wall, _ in rows if cpu is not None or wall is not None]
+        memory = [memory_bytes for _, _, memory_bytes in rows if memory_bytes is not None]
+        return {
+            "adventure_id": adventure_id,
+            "node_id": node_id,
+            "accepted": len(rows),
+            "time_ms": _distribution(times),
+            "memory_bytes": _distribution(memory),
+        }
+
     def get_attempt_by_id(self, attempt_id: int, current_user: User) -> AdventureAttempt:
 
         attempt = (
@@ -0,0 +1,259 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METADATA_FILE = ".artifact.json"
+
+
+def make_artifact_key(language: str, compiler_version: str, code: str) -> str:
+    digest = hashlib.sha256()
+    for part in (language, compiler_version, code):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _tree_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(directory, name))
+            except OSError:
+                pass
+    return total
+
+
+def _digest(base: str, names: List[str]) -> str:
+    """Hash of the artifacts' relative paths and contents under `base`."""
+    digest = hashlib.sha256()
+    for name in sorted(names):
+        top = os.path.join(base, name)
+        files = [top] if os.path.isfile(top) else sorted(
+            os.path.join(directory, file) for directory, _, listed in os.walk(top) for file in listed
+        )
+        for path in files:
+            digest.update(os.path.relpath(path, base).encode("utf-8") + b"\0")
+            with open(path, "rb") as artifact:
+                for block in iter(lambda: artifact.read(1024 * 1024), b""):
+                    digest.update(block)
+            digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _copy(source: str, destination: str) -> None:
+    if os.path.isdir(source):
+        shutil.copytree(source, destination)
+    else:
+        # copy2 keeps the executable bit on compiled binaries
+        shutil.copy2(source, destination)
+
+
+def ensure_private_dir(path: str) -> None:
+    """Create `path` as 0700, or check an existing one is ours and nobody else can write to it.
+
+    The executor runs whatever binaries it finds in the cache, so a
+    directory another local user could plant files in is refused.
+    """
+
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if stat.S_ISLNK(info.st_mode) or not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{path} is not a directory")
+    if hasattr(os, "geteuid") and info.st_uid != os.geteuid():
+        raise PermissionError(f"{path} is owned by another user (uid {info.st_uid})")
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(f"{path} is writable by other users (mode {stat.S_IMODE(info.st_mode):o})")
+
+
+class CompiledArtifactCache:
+    """Content-addressed store of compiler output on local disk.
+
+    Each entry is a directory named after the hash of (language, compiler
+    version, source) holding the files a compile step produced. Entries are
+    evicted least recently used first once the store grows past `max_bytes`.
+    The methods do blocking file I/O and are meant to be called through
+    `asyncio.to_thread`, so the index is guarded by a lock.
+
+    Every restore is checked against the digest taken when the entry was
+    stored, and a mismatch is dropped and compiled again, so a program
+    that rewrites a cached binary cannot have it run for someone else's
+    source. Entries left on disk by an earlier process carry their digest
+    in the metadata file, which is only as trustworthy as the directory:
+    pass `load_existing=False` when runs can write to it.
+    """
+
+    def __init__(self, root: str, max_bytes: int, load_existing: bool = True):
+        self.root = root
+        self.max_bytes = max_bytes
+        # key -> (bytes on disk, compile time in ms, artifact digest), oldest use first
+        self._entries: "OrderedDict[str, Tuple[int, float, str]]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.compile_ms_saved = 0.0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        ensure_private_dir(root)
+        if load_existing:
+            self._load()
+
+    def _load(self) -> None:
+        # pick up entries left by an earlier process, oldest first so they are evicted first
+        entries = []
+        for key in os.listdir(self.root):
+            path = os.path.join(self.root, key)
+            metadata_path = os.path.join(path, METADATA_FILE)
+            if not os.path.isfile(metadata_path):
+                continue
+            try:
+                with open(metadata_path, encoding="utf-8") as metadata_file:
+                    metadata = json.load(metadata_file)
+                entries.append((
+                    os.path.getmtime(metadata_path), key, metadata["size"], metadata["compile_ms"], metadata["digest"]
+                ))
+            except (OSError, ValueError, KeyError):
+                continue
+        for _, key, size, compile_ms, digest in sorted(entries):
+            self._entries[key] = (size, compile_ms, digest)
+            self.total_bytes += size
+
+    def restore(self, key: str, workdir: str, artifacts: List[str]) -> bool:
+        """Copy a cached entry's artifacts into `workdir`; False on a miss."""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False
+            self._entries.move_to_end(key)
+
+        path = os.path.join(self.root, key)
+        try:
+            for name in artifacts:
+                _copy(os.path.join(path, name), os.path.join(workdir, name))
+            # the copy is checked, not the entry, so nothing can change it between check and run
+            intact = _digest(workdir, artifacts) == entry[2]
+            if intact:
+                os.utime(os.path.join(path, METADATA_FILE))
+        except OSError:
+            # evicted or removed underneath us (e.g. by another worker process), compile again
+            with self._lock:
+                self._forget(key)
+                self.misses += 1
+            return False
+
+        if not intact:
+            logger.warning(f"Compiled artifact {key} does not match its digest, dropping it")
+            for name in artifacts:
+                target = os.path.join(workdir, name)
+                if os.path.isdir(target):
+                    shutil.rmtree(target, ignore_errors=True)
+                elif os.path.lexists(target):
+                    os.remove(target)
+            with self._lock:
+                self._forget(key)
+                self.rejected += 1
+                self.misses += 1
+            shutil.rmtree(path, ignore_errors=True)
+            return False
+
+        with self._lock:
+            self.hits += 1
+            self.compile_ms_saved += entry[1]
+        return True
+
+    def store(self, key: str, workdir: str, artifacts: List[str], compile_ms: float) -> None:
+        with self._lock:
+            if key in self._entries:
+                return
+
+        staging = os.path.join(self.root, f".staging-{uuid.uuid4().hex}")
+        try:
+            os.makedirs(staging)
+            for name in artifacts:
+                _copy(os.path.join(workdir, name), os.path.join(staging, name))
+            size = _tree_size(staging)
+            if size > self.max_bytes:
+                shutil.rmtree(staging, ignore_errors=True)
+                return
+            digest = _digest(staging, artifacts)
+            with open(os.path.join(staging, METADATA_FILE), "w", encoding="utf-8") as metadata_file:
+                json.dump(
+                    {"size": size, "compile_ms": compile_ms, "digest": digest, "stored_at": time.time()},
+                    metadata_file
+                )
+            # the rename publishes the entry in one step, readers never see a half-copied directory
+            os.rename(staging, os.path.join(self.root, key))
+        except OSError as e:
+            # also the outcome when a concurrent compile of the same source published first
+            logger.debug(f"Could not store compiled artifact {key}: {e}")
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+
+        with self._lock:
+            self._entries[key] = (size, compile_ms, digest)
+            self.total_bytes += size
+            self.stores += 1
+            self._evict()
+
+    def _forget(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[0]
+
+    def _evict(self) -> None:
+        while self.total_bytes > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            self._forget(key)
+            shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "root": self.root,
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "rejected": self.rejected,
+            "compile_ms_saved": round(self.compile_ms_saved, 1),
+        }
+
+
+def default_artifact_cache_dir() -> str:
+    # per user, so another account on the machine cannot claim the name first and lock us out
+    suffix = f"-{os.geteuid()}" if hasattr(os, "geteuid") else ""
+    return os.path.join(tempfile.gettempdir(), f"adventurecode-compile-cache{suffix}")
+
+
+def create_artifact_cache(
+    root: Optional[str],
+    max_bytes: int,
+    load_existing: bool = True
+) -> Optional[CompiledArtifactCache]:
+    try:
+        return CompiledArtifactCache(root or default_artifact_cache_dir(), max_bytes, load_existing)
+    except OSError as e:
+        logger.warning(f"Compiled artifact cache disabled: {e}")
+        return None
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator, Deque, Dict
+
+from config import get_settings
+from exceptions import ServiceUnavailableError
+from services.execution_metrics import get_execution_metrics
+from utils.latency import LatencyRecorder
+
+
+class Bulkhead:
+    """A concurrency pool with its own bounded FIFO queue and queue timeout.
+
+    Callers past `limit` wait in line; once `max_queue` are waiting, or a
+    caller has waited `queue_timeout` seconds, ServiceUnavailableError is
+    raised instead, so a backlog in one pool fails fast rather than
+    piling up requests.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_latency = LatencyRecorder()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def _acquire(self) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+
+        metrics = get_execution_metrics()
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            metrics.executor_pool_rejections.inc(language=self.name, reason="queue_full")
+            raise ServiceUnavailableError(f"Too many {self.name} runs waiting, please try again shortly")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # the slot was handed over just as the caller gave up, pass it on
+                self._release()
+            elif future in self._waiters:
+                self._waiters.remove(future)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                metrics.executor_pool_rejections.inc(language=self.name, reason="timeout")
+                raise ServiceUnavailableError(f"Timed out waiting for a {self.name} executor slot")
+            raise
+
+    def _release(self) -> None:
+        self.active -= 1
+        while self._waiters:
+            future = self._waiters.popleft()
+            if future.done():
+                continue
+            self.active += 1
+            future.set_result(None)
+            return
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        started = time.monotonic()
+        await self._acquire()
+        self.admitted += 1
+        self.wait_latency.record((time.monotonic() - started) * 1000)
+        metrics = get_execution_metrics()
+        metrics.executor_pool_active.inc(language=self.name)
+        try:
+            yield
+        finally:
+            metrics.executor_pool_active.dec(language=self.name)
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "saturation": round(self.active / self.limit, 4) if self.limit else 1.0,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "queue_wait": self.wait_latency.summary(),
+        }
+
+
+class LanguageBulkheads:
+    """One Bulkhead per language, so a slow language can only use its own share of the executor.
+
+    Pools are created on a language's first run, with the limit and queue
+    timeout configured for it or the defaults.
+    """
+
+    def __init__(
+        self,
+        default_limit: int,
+        limits: Dict[str, int],
+        max_queue: int,
+        default_queue_timeout: float,
+        queue_timeouts: Dict[str, float]
+    ):
+        self.default_limit = default_limit
+        self.limits = limits
+        self.max_queue = max_queue
+        self.default_queue_timeout = default_queue_timeout
+        self.queue_timeouts = queue_timeouts
+        self.pools: Dict[str, Bulkhead] = {}
+
+    def pool(self, language: str) -> Bulkhead:
+        pool = self.pools.get(language)
+        if pool is None:
+            pool = Bulkhead(
+                language,
+                self.limits.get(language, self.default_limit),
+                self.max_queue,
+                self.queue_timeouts.get(language, self.default_queue_timeout)
+            )
+            self.pools[language] = pool
+        return pool
+
+    def slot(self, language: str):
+        return self.pool(language).slot()
+
+    def stats(self) -> Dict[str, Any]:
+        return {language: pool.stats() for language, pool in sorted(self.pools.items())}
+
+
+@lru_cache()
+def get_language_bulkheads() -> LanguageBulkheads:
+    settings = get_settings()
+    return LanguageBulkheads(
+        default_limit=settings.EXECUTION_LANGUAGE_DEFAULT_LIMIT,
+        limits=settings.EXECUTION_LANGUAGE_LIMITS,
+        max_queue=settings.EXECUTION_LANGUAGE_MAX_QUEUE,
+        default_queue_timeout=settings.EXECUTION_LANGUAGE_QUEUE_TIMEOUT_SECONDS,
+        queue_timeouts=settings.EXECUTION_LANGUAGE_QUEUE_TIMEOUTS
+    )
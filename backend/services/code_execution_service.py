@@ -1,40 +1,72 @@
-import httpx
-from typing import Dict, Any
+import asyncio
+import time
+from typing import AsyncIterator, Dict, Any, Optional
 from config import get_settings
-from exceptions import ValidationError
+from exceptions import DeadlineExceededError, ValidationError
+from services.http_client import ExecutorHttpClient, get_executor_http_client
+from services.execution_cache import ExecutionCache, get_execution_cache, make_cache_key
+from services.deadlines import Deadline, current_deadline
+from services.bulkheads import LanguageBulkheads, get_language_bulkheads
+from services.execution_metrics import get_execution_metrics, run_outcome
+from services.execution_scheduler import DEFAULT_PRIORITY, ExecutionScheduler, get_execution_scheduler
+from services.executors import ExecutorBackend, create_executor_backend, get_executor_backend, replay_output
+from services.judge import OutputComparator
+from services.preflight import Preflight, get_preflight
+from services.single_flight import SingleFlight, get_single_flight
 
 
 class CodeExecutionService:
-    def __init__(self):
-        self.settings = get_settings()
-        self.version_map = {
-            "python": "3.10.0",
-            "javascript": "18.15.0",
-            "typescript": "1.32.3",
-            "java": "15.0.2",
-            "c": "10.2.0",
-            "cpp": "10.2.0",
-            "ruby": "3.0.1",
-            "go": "1.16.2",
-            "php": "8.2.3",
-            "rust": "1.68.2",
-            "bash": "5.2.0",
-            
-        }
+    version_map = {
+        "python": "3.10.0",
+        "javascript": "18.15.0",
+        "typescript": "1.32.3",
+        "java": "15.0.2",
+        "c": "10.2.0",
+        "cpp": "10.2.0",
+        "ruby": "3.0.1",
+        "go": "1.16.2",
+        "php": "8.2.3",
+        "rust": "1.68.2",
+        "bash": "5.2.0",
         
-        self.extension_map = {
-            "python": "py",
-            "javascript": "js",
-            "typescript": "ts",
-            "java": "java",
-            "c": "c",
-            "cpp": "cpp",
-            "ruby": "rb",
-            "go": "go",
-            "php": "php",
-            "rust": "rs",
-            "bash": "sh",
-        }
+    }
+    
+    extension_map = {
+        "python": "py",
+        "javascript": "js",
+        "typescript": "ts",
+        "java": "java",
+        "c": "c",
+        "cpp": "cpp",
+        "ruby": "rb",
+        "go": "go",
+        "php": "php",
+        "rust": "rs",
+        "bash": "sh",
+    }
+
+    def __init__(
+        self,
+        http_client: Optional[ExecutorHttpClient] = None,
+        result_cache: Optional[ExecutionCache] = None,
+        backend: Optional[ExecutorBackend] = None,
+        single_flight: Optional[SingleFlight] = None,
+        scheduler: Optional[ExecutionScheduler] = None,
+        bulkheads: Optional[LanguageBulkheads] = None,
+        preflight: Optional[Preflight] = None
+    ):
+        self.settings = get_settings()
+        self.http_client = http_client or get_executor_http_client()
+        self.result_cache = result_cache or get_execution_cache()
+        if backend is None:
+            # a client other than the shared one (e.g. in tests) gets a backend of its own
+            shared = self.http_client is get_executor_http_client()
+            backend = get_executor_backend() if shared else create_executor_backend(self.settings, self.http_client)
+        self.backend = backend
+        self.single_flight = single_flight or get_single_flight()
+        self.scheduler = scheduler or get_execution_scheduler()
+        self.bulkheads = bulkheads or get_language_bulkheads()
+        self.preflight = preflight or get_preflight()
     
     def get_version(self, language: str) -> str:
         lang = language.lower()
@@ -50,22 +82,194 @@ class CodeExecutionService:
             raise ValidationError(f"Unsupported language extension: {language}")
         return extension
     
-    async def execute_code(self, code: str, language: str) -> Dict[str, Any]:
+    def runtime_versions(self) -> Dict[str, str]:
+        return {
+            lang: self.backend.runtime_version(lang, version)
+            for lang, version in self.version_map.items()
+        }
+
+    async def execute_code(
+        self,
+        code: str,
+        language: str,
+        stdin: str = "",
+        priority: str = DEFAULT_PRIORITY,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
+        """Run `code` once, under `deadline` or else the deadline of the request being handled."""
+
         lang = language.lower()
         version = self.get_version(lang)
         extension = self.get_extension(lang)
-        
-        payload = {
-            "language": lang,
-            "version": version,
-            "files": [{"name": f"Main.{extension}", "content": code}]
-        }
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(self.settings.PISTON_URL, json=payload)
-        
-        if response.status_code != 200:
-            raise ValidationError("Code execution failed", response.text)
-        
-        result = response.json()
-        return result.get("run", {})
\ No newline at end of file
+        runtime_version = self.backend.runtime_version(lang, version)
+        self.preflight.check(code, lang)
+        metrics = get_execution_metrics()
+        started = time.monotonic()
+
+        deadline = deadline or current_deadline()
+        budget = deadline.execution_budget() if deadline is not None else None
+
+        cached = await self.result_cache.get(lang, runtime_version, code, stdin)
+        if cached is not None:
+            metrics.execution_duration.observe(time.monotonic() - started, language=lang, outcome="cached")
+            return cached
+
+        async def run() -> Dict[str, Any]:
+            # cache hits and coalesced callers never take a slot, only real runs are scheduled.
+            # The language pool comes first so runs queued behind a slow language hold no shared slot.
+            async with self.bulkheads.slot(lang), self.scheduler.slot(priority):
+                # time spent queueing for a slot comes out of the run's share of the deadline
+                timeout = deadline.execution_budget() if deadline is not None else None
+                run_result = await self.backend.run(lang, version, extension, code, stdin, timeout=timeout)
+            if timeout is None or run_result.get("status") != "TO":
+                # a time-out under a caller's deadline says nothing about the program, so it is not cached
+                await self.result_cache.set(lang, runtime_version, code, run_result, stdin)
+            return run_result
+
+        outcome = "error"
+        metrics.executions_in_flight.inc(language=lang)
+        try:
+            # identical submissions arriving together (e.g. a class running the starter code) share one run.
+            # Only callers of the same priority share, so an attempt never waits in the guest queue, and
+            # a caller with more time left than the run's deadline starts its own run.
+            shared_run = self.single_flight.do(
+                f"{priority}:{make_cache_key(lang, runtime_version, code, stdin)}",
+                run,
+                expires_at=deadline.expires_at - deadline.persist_reserve if deadline is not None else None
+            )
+            if budget is None:
+                run_result = await shared_run
+            else:
+                try:
+                    run_result = await asyncio.wait_for(shared_run, budget)
+                except asyncio.TimeoutError:
+                    raise DeadlineExceededError("execution")
+            outcome = run_outcome(run_result)
+            return run_result
+        except DeadlineExceededError:
+            outcome = "deadline_exceeded"
+            raise
+        finally:
+            metrics.executions_in_flight.dec(language=lang)
+            metrics.execution_duration.observe(time.monotonic() - started, language=lang, outcome=outcome)
+
+    async def stream_code(
+        self,
+        code: str,
+        language: str,
+        stdin: str = "",
+        priority: str = DEFAULT_PRIORITY,
+        deadline: Optional[Deadline] = None,
+        comparator: Optional[OutputComparator] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Like execute_code, but yields output events as they are produced and the run last.
+
+        At most STREAM_OUTPUT_MAX_BYTES of output is forwarded, cached runs
+        included; the final run is marked `truncated` when anything was held
+        back, but its `output` is complete, so judge that rather than the
+        events. A streaming response outlives its handler, so the route
+        passes its deadline in explicitly.
+
+        With a `comparator`, all output (not just what is forwarded) is fed
+        to it as it arrives, and the run is stopped as soon as its verdict
+        is settled (first mismatch or output cap). The final run is then
+        marked `stopped_early`, holds only the output seen so far and is not
+        cached; take the verdict from `comparator.finish()`.
+        """
+
+        lang = language.lower()
+        version = self.get_version(lang)
+        extension = self.get_extension(lang)
+        runtime_version = self.backend.runtime_version(lang, version)
+        self.preflight.check(code, lang)
+        deadline = deadline or current_deadline()
+        if deadline is not None:
+            deadline.execution_budget()
+
+        limit = self.settings.STREAM_OUTPUT_MAX_BYTES
+        sent = 0
+        truncated = False
+        run_result: Dict[str, Any] = {}
+        seen: Dict[str, list] = {"stdout": [], "stderr": [], "output": []}
+        events = self._stream_events(lang, version, extension, runtime_version, code, stdin, priority, deadline)
+        try:
+            async for event in events:
+                if "result" in event:
+                    run_result = event["result"]
+                    continue
+
+                settled = False
+                if comparator is not None:
+                    seen[event["stream"]].append(event["data"])
+                    seen["output"].append(event["data"])
+                    settled = not comparator.feed(event["data"])
+
+                data = event["data"].encode("utf-8")
+                if sent + len(data) > limit:
+                    truncated = True
+                    data = data[:max(limit - sent, 0)]
+                if data:
+                    sent += len(data)
+                    yield {"stream": event["stream"], "data": data.decode("utf-8", errors="ignore")}
+
+                if settled:
+                    # the rest of the output cannot change the verdict, so stop the program
+                    run_result = {
+                        **{name: "".join(parts) for name, parts in seen.items()},
+                        "code": None,
+                        "signal": None,
+                        "stopped_early": True,
+                    }
+                    break
+        finally:
+            # closing the events cancels the run behind them, and a stopped run is never cached
+            await events.aclose()
+
+        if truncated:
+            run_result = {**run_result, "truncated": True}
+        yield {"result": run_result}
+
+    async def _stream_events(
+        self,
+        lang: str,
+        version: str,
+        extension: str,
+        runtime_version: str,
+        code: str,
+        stdin: str,
+        priority: str,
+        deadline: Optional[Deadline]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        cached = await self.result_cache.get(lang, runtime_version, code, stdin)
+        if cached is not None:
+            for event in replay_output(cached):
+                yield event
+            yield {"result": cached}
+            return
+
+        run_result: Dict[str, Any] = {}
+        async with self.bulkheads.slot(lang), self.scheduler.slot(priority):
+            timeout = deadline.execution_budget() if deadline is not None else None
+            events = self.backend.stream(lang, version, extension, code, stdin, timeout=timeout)
+            try:
+                while True:
+                    try:
+                        if deadline is None:
+                            event = await events.__anext__()
+                        else:
+                            # cancelling the pending event stops the run behind it
+                            event = await asyncio.wait_for(
+                                events.__anext__(),
+                                deadline.remaining() - deadline.persist_reserve
+                            )
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        raise DeadlineExceededError("execution")
+                    if "result" in event:
+                        run_result = event["result"]
+                    yield event
+            finally:
+                await events.aclose()
+
+        await self.result_cache.set(lang, runtime_version, code, run_result, stdin)
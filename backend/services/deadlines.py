@@ -0,0 +1,75 @@
+import functools
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from config import get_settings
+from exceptions import DeadlineExceededError
+
+
+class Deadline:
+    """Time budget for one request, shared by its lookup, execution and persistence stages.
+
+    Execution gets what is left minus `persist_reserve`, so a slow run
+    cannot use up the time needed to save its verdict.
+    """
+
+    def __init__(self, seconds: float, persist_reserve: float = 0.0):
+        self.seconds = seconds
+        self.persist_reserve = persist_reserve
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def check(self, stage: str) -> None:
+        if self.remaining() <= 0:
+            raise DeadlineExceededError(stage)
+
+    def execution_budget(self) -> float:
+        budget = self.remaining() - self.persist_reserve
+        if budget <= 0:
+            raise DeadlineExceededError("execution")
+        return budget
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def check_deadline(stage: str) -> None:
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def deadline_for(handler: str) -> Deadline:
+    settings = get_settings()
+    return Deadline(
+        settings.REQUEST_DEADLINES.get(handler, settings.REQUEST_DEADLINE_SECONDS),
+        settings.DEADLINE_PERSIST_RESERVE_SECONDS
+    )
+
+
+def with_deadline(handler: str):
+    """Run a route handler (or judge job) under the deadline configured for `handler`.
+
+    The deadline is visible to everything the handler awaits, including
+    CodeExecutionService.execute_code, through a context variable.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = _current_deadline.set(deadline_for(handler))
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _current_deadline.reset(token)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,262 @@
+import asyncio
+import copy
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
+
+from sqlalchemy import and_, not_, or_
+from sqlalchemy.exc import SQLAlchemyError
+
+from config import get_settings
+from database import SessionLocal
+from models.execution_cache import ExecutionResultCache
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(language: str, version: str, code: str, stdin: str = "") -> str:
+    digest = hashlib.sha256()
+    # runs without stdin keep the keys they had before stdin was part of a run
+    parts = (language, version, code, stdin) if stdin else (language, version, code)
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def is_cacheable(run_result: Dict[str, Any]) -> bool:
+    # runs killed by a signal (usually the executor's timeout) depend on load, not on the code
+    return bool(run_result) and run_result.get("signal") is None
+
+
+class MemoryCacheTier:
+    """Bounded LRU with a per-entry TTL, local to this worker process."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, str, str, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, _, _, result = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return result
+
+    def set(self, key: str, language: str, version: str, result: Dict[str, Any]) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, language, version, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, language: Optional[str] = None) -> int:
+        stale = [
+            key for key, (_, lang, _, _) in self._entries.items()
+            if language is None or lang == language
+        ]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def invalidate_unknown_runtimes(self, version_map: Dict[str, str]) -> int:
+        stale = [
+            key for key, (_, lang, version, _) in self._entries.items()
+            if version_map.get(lang) != version
+        ]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DatabaseCacheTier:
+    """Persistent tier shared by every worker and surviving restarts."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            row = db.query(ExecutionResultCache).filter(
+                ExecutionResultCache.cache_key == key,
+                ExecutionResultCache.expires_at > datetime.now(timezone.utc)
+            ).first()
+            return row.result if row else None
+        finally:
+            db.close()
+
+    def set(self, key: str, language: str, version: str, result: Dict[str, Any]) -> None:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)
+        db = SessionLocal()
+        try:
+            row = db.query(ExecutionResultCache).filter(ExecutionResultCache.cache_key == key).first()
+            if row:
+                row.result = result
+                row.expires_at = expires_at
+            else:
+                db.add(ExecutionResultCache(
+                    cache_key=key,
+                    language=language,
+                    version=version,
+                    result=result,
+                    expires_at=expires_at
+                ))
+            db.commit()
+        except SQLAlchemyError:
+            # another worker may have stored the same key first, which is fine
+            db.rollback()
+        finally:
+            db.close()
+
+    def invalidate(self, language: Optional[str] = None) -> int:
+        db = SessionLocal()
+        try:
+            query = db.query(ExecutionResultCache)
+            if language is not None:
+                query = query.filter(ExecutionResultCache.language == language)
+            deleted = query.delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+    def invalidate_unknown_runtimes(self, version_map: Dict[str, str]) -> int:
+        db = SessionLocal()
+        try:
+            current = or_(*[
+                and_(ExecutionResultCache.language == language, ExecutionResultCache.version == version)
+                for language, version in version_map.items()
+            ])
+            deleted = db.query(ExecutionResultCache).filter(
+                or_(not_(current), ExecutionResultCache.expires_at <= datetime.now(timezone.utc))
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+
+class ExecutionCache:
+    """Two-tier cache of executor `run` results keyed by (language, version, code hash)."""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_entries: int = 1024,
+        ttl_seconds: float = 600,
+        db_enabled: bool = True,
+        db_ttl_seconds: float = 86400
+    ):
+        self.enabled = enabled
+        self.memory = MemoryCacheTier(max_entries, ttl_seconds)
+        self.database = DatabaseCacheTier(db_ttl_seconds) if db_enabled else None
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+        self.db_errors = 0
+
+    async def get(self, language: str, version: str, code: str, stdin: str = "") -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+
+        key = make_cache_key(language, version, code, stdin)
+        result = self.memory.get(key)
+        if result is not None:
+            self.memory_hits += 1
+            return copy.deepcopy(result)
+
+        if self.database is not None:
+            try:
+                result = await asyncio.to_thread(self.database.get, key)
+            except SQLAlchemyError as e:
+                self.db_errors += 1
+                logger.warning(f"Execution cache lookup failed: {e}")
+                result = None
+
+            if result is not None:
+                self.db_hits += 1
+                self.memory.set(key, language, version, result)
+                return copy.deepcopy(result)
+
+        self.misses += 1
+        return None
+
+    async def set(self, language: str, version: str, code: str, result: Dict[str, Any], stdin: str = "") -> None:
+        if not self.enabled or not is_cacheable(result):
+            return
+
+        key = make_cache_key(language, version, code, stdin)
+        stored = copy.deepcopy(result)
+        self.memory.set(key, language, version, stored)
+        self.stores += 1
+
+        if self.database is not None:
+            try:
+                await asyncio.to_thread(self.database.set, key, language, version, stored)
+            except SQLAlchemyError as e:
+                self.db_errors += 1
+                logger.warning(f"Execution cache store failed: {e}")
+
+    def invalidate(self, language: Optional[str] = None) -> int:
+        removed = self.memory.invalidate(language)
+        if self.database is not None:
+            removed += self.database.invalidate(language)
+        self.invalidations += removed
+        return removed
+
+    def sync_runtime_versions(self, version_map: Dict[str, str]) -> int:
+        """Drop every entry produced by a runtime version that is no longer in version_map."""
+
+        removed = self.memory.invalidate_unknown_runtimes(version_map)
+
+        if self.database is not None:
+            try:
+                removed += self.database.invalidate_unknown_runtimes(version_map)
+            except SQLAlchemyError as e:
+                self.db_errors += 1
+                logger.warning(f"Execution cache invalidation failed: {e}")
+
+        self.invalidations += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "memory_entries": len(self.memory),
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.db_hits) / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "invalidations": self.invalidations,
+            "db_errors": self.db_errors,
+        }
+
+
+@lru_cache()
+def get_execution_cache() -> ExecutionCache:
+    settings = get_settings()
+    return ExecutionCache(
+        enabled=settings.EXECUTION_CACHE_ENABLED,
+        max_entries=settings.EXECUTION_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.EXECUTION_CACHE_TTL_SECONDS,
+        db_enabled=settings.EXECUTION_CACHE_DB_ENABLED,
+        db_ttl_seconds=settings.EXECUTION_CACHE_DB_TTL_SECONDS
+    )
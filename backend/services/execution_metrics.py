@@ -0,0 +1,122 @@
+import functools
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from utils.metrics import MetricsRegistry, SIZE_BUCKETS
+
+
+def run_outcome(run_result: Optional[Dict[str, Any]]) -> str:
+    if not run_result:
+        return "empty"
+    if run_result.get("signal"):
+        return "killed"
+    if run_result.get("code") not in (0, None):
+        return "nonzero_exit"
+    return "ok"
+
+
+class ExecutionMetrics:
+    """The metrics exported on GET /metrics for the code execution path."""
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.execution_duration = registry.histogram(
+            "code_execution_duration_seconds",
+            "Time spent in CodeExecutionService.execute_code, by language and outcome.",
+            ["language", "outcome"]
+        )
+        self.executions_in_flight = registry.gauge(
+            "code_executions_in_flight",
+            "Executions currently running, by language.",
+            ["language"]
+        )
+        self.execution_queue_wait = registry.histogram(
+            "execution_queue_wait_seconds",
+            "Time runs waited for an executor slot, by priority class.",
+            ["priority"]
+        )
+        self.executor_pool_active = registry.gauge(
+            "executor_pool_active_runs",
+            "Runs holding a slot in a language's executor pool.",
+            ["language"]
+        )
+        self.executor_pool_rejections = registry.counter(
+            "executor_pool_rejections_total",
+            "Runs turned away by a language's executor pool, by reason (queue_full or timeout).",
+            ["language", "reason"]
+        )
+        self.preflight_rejections = registry.counter(
+            "preflight_rejections_total",
+            "Submissions rejected locally before reaching the executor, by failed check.",
+            ["language", "check"]
+        )
+        self.executor_request_duration = registry.histogram(
+            "executor_request_duration_seconds",
+            "Latency of single requests to an executor endpoint.",
+            ["endpoint"]
+        )
+        self.executor_errors = registry.counter(
+            "executor_errors_total",
+            "Failed executor requests, by endpoint and HTTP status or error kind.",
+            ["endpoint", "status"]
+        )
+        self.submission_duration = registry.histogram(
+            "submission_request_duration_seconds",
+            "End to end time of the submission handlers, by handler and response status.",
+            ["handler", "status"]
+        )
+        self.submission_stage_duration = registry.histogram(
+            "submission_stage_duration_seconds",
+            "Time spent in each stage of the submission pipeline, by pipeline and stage.",
+            ["pipeline", "stage"]
+        )
+        self.submission_code_bytes = registry.histogram(
+            "submission_code_bytes",
+            "Size of submitted source code.",
+            ["handler"],
+            SIZE_BUCKETS
+        )
+        self.submission_output_bytes = registry.histogram(
+            "submission_output_bytes",
+            "Size of the program output returned by the submission handlers.",
+            ["handler"],
+            SIZE_BUCKETS
+        )
+
+
+@lru_cache()
+def get_metrics_registry() -> MetricsRegistry:
+    return MetricsRegistry()
+
+
+@lru_cache()
+def get_execution_metrics() -> ExecutionMetrics:
+    return ExecutionMetrics(get_metrics_registry())
+
+
+def instrument_submission(handler: str):
+    """Record duration, code size and output size for a submission route handler."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            metrics = get_execution_metrics()
+            code = kwargs.get("code")
+            if code is not None:
+                metrics.submission_code_bytes.observe(len(code.encode("utf-8")), handler=handler)
+
+            started = time.monotonic()
+            status = 500
+            try:
+                response = await func(*args, **kwargs)
+                status = getattr(response, "status_code", 200)
+                if isinstance(response, dict) and response.get("output") is not None:
+                    metrics.submission_output_bytes.observe(len(response["output"].encode("utf-8")), handler=handler)
+                return response
+            finally:
+                metrics.submission_duration.observe(time.monotonic() - started, handler=handler, status=str(status))
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,135 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+from config import get_settings
+from services.execution_metrics import get_execution_metrics
+from utils.latency import LatencyRecorder
+
+# graded adventure attempts, standalone problem submissions, guest runs
+PRIORITY_CLASSES = ("attempt", "problem", "guest")
+DEFAULT_PRIORITY = "problem"
+
+
+class ExecutionScheduler:
+    """Admits executor runs `concurrency` at a time, sharing the slots between priority classes.
+
+    Waiting runs are ordered by start-time fair queuing: while several
+    classes are waiting, each gets slots in proportion to its weight. A
+    burst of guest runs therefore cannot queue ahead of graded attempts,
+    and guests still make progress under sustained attempt load.
+    """
+
+    def __init__(self, concurrency: int, weights: Dict[str, float]):
+        self.concurrency = concurrency
+        self.weights = weights
+        self.running = 0
+        self._virtual_time = 0.0
+        self._finish_tags = {priority: 0.0 for priority in weights}
+        # (finish tag, arrival order, priority, start tag, future)
+        self._waiting: List[Tuple[float, int, str, float, asyncio.Future]] = []
+        self._arrivals = itertools.count()
+        self.queued = {priority: 0 for priority in weights}
+        self.admitted = {priority: 0 for priority in weights}
+        self.wait_latency = {priority: LatencyRecorder() for priority in weights}
+
+    @property
+    def enabled(self) -> bool:
+        return self.concurrency > 0
+
+    def _tag(self, priority: str) -> Tuple[float, float]:
+        start = max(self._virtual_time, self._finish_tags[priority])
+        finish = start + 1 / self.weights[priority]
+        self._finish_tags[priority] = finish
+        return start, finish
+
+    async def _acquire(self, priority: str) -> None:
+        if self.running < self.concurrency and not self._waiting:
+            # idle slot and nobody ahead, no need to queue
+            start, _ = self._tag(priority)
+            self._virtual_time = start
+            self.running += 1
+            return
+
+        start, finish = self._tag(priority)
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (finish, next(self._arrivals), priority, start, future))
+        self.queued[priority] += 1
+        # entries left by cancelled waiters may be all that is queued, free slots go to the new arrival then
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                # gave up while waiting, the heap entry is skipped when it comes up
+                self.queued[priority] -= 1
+            else:
+                # a slot was handed over just as the caller went away, pass it on
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        self.running -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._waiting and self.running < self.concurrency:
+            _, _, priority, start, future = heapq.heappop(self._waiting)
+            if future.cancelled():
+                continue
+            self.queued[priority] -= 1
+            self._virtual_time = start
+            self.running += 1
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: str = DEFAULT_PRIORITY) -> AsyncIterator[None]:
+        if priority not in self.weights:
+            raise ValueError(f"Unknown priority class: {priority}")
+        if not self.enabled:
+            yield
+            return
+
+        started = time.monotonic()
+        await self._acquire(priority)
+        waited = time.monotonic() - started
+        self.admitted[priority] += 1
+        self.wait_latency[priority].record(waited * 1000)
+        get_execution_metrics().execution_queue_wait.observe(waited, priority=priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "concurrency": self.concurrency,
+            "running": self.running,
+            "classes": {
+                priority: {
+                    "weight": self.weights[priority],
+                    "queued": self.queued[priority],
+                    "admitted": self.admitted[priority],
+                    "queue_wait": self.wait_latency[priority].summary(),
+                }
+                for priority in self.weights
+            },
+        }
+
+
+@lru_cache()
+def get_execution_scheduler() -> ExecutionScheduler:
+    settings = get_settings()
+    return ExecutionScheduler(
+        concurrency=settings.EXECUTION_SCHEDULER_CONCURRENCY,
+        weights={
+            "attempt": settings.EXECUTION_WEIGHT_ATTEMPT,
+            "problem": settings.EXECUTION_WEIGHT_PROBLEM,
+            "guest": settings.EXECUTION_WEIGHT_GUEST,
+        }
+    )
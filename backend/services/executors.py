@@ -0,0 +1,729 @@
+import asyncio
+import codecs
+import logging
+import math
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import AsyncIterator, Callable, Dict, Any, Iterator, List, Optional, Tuple
+
+import httpx
+
+from config import Settings, get_settings
+from exceptions import DeadlineExceededError, ValidationError
+from services.artifact_cache import CompiledArtifactCache, create_artifact_cache, make_artifact_key
+from services.execution_metrics import get_execution_metrics
+from services.http_client import ExecutorHttpClient, get_executor_http_client
+from services.piston_endpoints import PistonEndpoint, PistonEndpointPool, get_piston_endpoint_pool
+from services.python_worker_pool import PythonWorkerPool, minimal_environment
+from utils.latency import LatencyRecorder
+
+try:
+    import resource
+except ImportError:
+    # rlimits are POSIX only, local runs still get the wall clock and output caps
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_CHARS = 4096
+
+
+def replay_output(run_result: Dict[str, Any], chunk_chars: int = STREAM_CHUNK_CHARS) -> Iterator[Dict[str, Any]]:
+    """Split a finished run's stdout and stderr into stream events."""
+
+    for stream in ("stdout", "stderr"):
+        text = run_result.get(stream) or ""
+        for start in range(0, len(text), chunk_chars):
+            yield {"stream": stream, "data": text[start:start + chunk_chars]}
+
+
+class ExecutorBackend(ABC):
+    """Runs a single source file and returns a Piston-shaped `run` dict.
+
+    The dict always carries `stdout`, `stderr`, `output`, `code` and `signal`
+    so the submission routes do not care which backend produced it.
+    """
+
+    name = "abstract"
+
+    def runtime_version(self, language: str, requested_version: str) -> str:
+        return requested_version
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    @abstractmethod
+    async def run(
+        self,
+        language: str,
+        version: str,
+        extension: str,
+        code: str,
+        stdin: str = "",
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Run `code`, finishing within `timeout` seconds when one is given (the caller's remaining deadline)."""
+        ...
+
+    async def stream(
+        self,
+        language: str,
+        version: str,
+        extension: str,
+        code: str,
+        stdin: str = "",
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield `{"stream", "data"}` output events, then `{"result": run}` once the run ends.
+
+        Backends that cannot stream run to completion and replay the output in chunks.
+        """
+
+        run_result = await self.run(language, version, extension, code, stdin, timeout=timeout)
+        for event in replay_output(run_result):
+            yield event
+        yield {"result": run_result}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self.name}
+
+
+class RetryableExecutionError(Exception):
+    """An endpoint failed in a way another attempt (or another endpoint) may not."""
+
+    def __init__(self, endpoint: PistonEndpoint, detail: str):
+        super().__init__(detail)
+        self.endpoint = endpoint
+        self.detail = detail
+
+
+class PistonExecutor(ExecutorBackend):
+    """Sends runs to one or more Piston endpoints.
+
+    Each attempt goes to the least busy endpoint whose circuit is not open.
+    Connection errors, timeouts, 429s and 5xx responses are retried with
+    jittered backoff on another endpoint when there is one, and an attempt
+    that outlives the pool's p95 latency is hedged to a second endpoint.
+    """
+
+    name = "piston"
+
+    def __init__(
+        self,
+        http_client: ExecutorHttpClient,
+        endpoint_pool: Optional[PistonEndpointPool] = None,
+        run_timeout_ms: int = 3000,
+        compile_timeout_ms: int = 10000
+    ):
+        self.http_client = http_client
+        self.endpoint_pool = endpoint_pool or get_piston_endpoint_pool()
+        self.run_timeout_ms = run_timeout_ms
+        self.compile_timeout_ms = compile_timeout_ms
+
+    async def _post(self, url: str, payload: Dict[str, Any], timeout: float) -> httpx.Response:
+        if self.http_client.started:
+            return await self.http_client.post(url, json=payload, timeout=timeout)
+
+        # outside the app lifespan (scripts, bare routers) there is no shared pool to borrow from
+        async with httpx.AsyncClient() as client:
+            return await client.post(url, json=payload, timeout=timeout)
+
+    async def _send(self, endpoint: PistonEndpoint, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        endpoint.acquire()
+        try:
+            return await self._exchange(endpoint, payload, timeout)
+        finally:
+            # also on cancellation (a lost hedge, a deadline) and on malformed responses
+            endpoint.release()
+
+    async def _exchange(self, endpoint: PistonEndpoint, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        metrics = get_execution_metrics()
+        started = time.monotonic()
+        try:
+            response = await self._post(endpoint.url, payload, timeout)
+        except httpx.HTTPError as e:
+            endpoint.record_failure()
+            status = "timeout" if isinstance(e, httpx.TimeoutException) else "connection_error"
+            metrics.executor_errors.inc(endpoint=endpoint.url, status=status)
+            raise RetryableExecutionError(endpoint, str(e) or type(e).__name__)
+
+        metrics.executor_request_duration.observe(time.monotonic() - started, endpoint=endpoint.url)
+        if response.status_code == 429 or response.status_code >= 500:
+            endpoint.record_failure()
+            metrics.executor_errors.inc(endpoint=endpoint.url, status=str(response.status_code))
+            raise RetryableExecutionError(endpoint, response.text)
+
+        elapsed_ms = (time.monotonic() - started) * 1000
+        endpoint.record_success(elapsed_ms)
+        if response.status_code != 200:
+            metrics.executor_errors.inc(endpoint=endpoint.url, status=str(response.status_code))
+            raise ValidationError("Code execution failed", response.text)
+
+        self.endpoint_pool.latency.record(elapsed_ms)
+        result = response.json()
+        return result.get("run", {})
+
+    async def _send_hedged(self, payload: Dict[str, Any], exclude: Optional[PistonEndpoint], timeout: float) -> Dict[str, Any]:
+        pool = self.endpoint_pool
+        primary = pool.choose(exclude)
+        delay = pool.hedge_delay()
+        if delay is None:
+            return await self._send(primary, payload, timeout)
+
+        first = asyncio.create_task(self._send(primary, payload, timeout))
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done or not pool.has_alternative(primary):
+                return await first
+
+            pool.hedged += 1
+            second = asyncio.create_task(self._send(pool.choose(exclude=primary), payload, timeout))
+            pending.add(second)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            pool.hedge_wins += 1
+                        return task.result()
+
+            # both attempts failed, report the one that was sent first
+            return first.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def run(
+        self,
+        language: str,
+        version: str,
+        extension: str,
+        code: str,
+        stdin: str = "",
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        run_timeout_ms = self.run_timeout_ms
+        compile_timeout_ms = self.compile_timeout_ms
+        if timeout is not None:
+            # Piston enforces these itself, so an abandoned run does not keep its sandbox busy
+            run_timeout_ms = max(1, min(run_timeout_ms, int(timeout * 1000)))
+            compile_timeout_ms = max(1, min(compile_timeout_ms, int(timeout * 1000)))
+
+        payload = {
+            "language": language,
+            "version": version,
+            "files": [{"name": f"Main.{extension}", "content": code}],
+            "stdin": stdin,
+            "run_timeout": run_timeout_ms,
+            "compile_timeout": compile_timeout_ms
+        }
+
+        pool = self.endpoint_pool
+        expires_at = time.monotonic() + timeout if timeout is not None else None
+        exclude = None
+        last_error = None
+        for attempt in range(pool.retry_attempts + 1):
+            if attempt:
+                pool.retries += 1
+                backoff = pool.backoff(attempt - 1)
+                if expires_at is not None and time.monotonic() + backoff >= expires_at:
+                    raise DeadlineExceededError("execution")
+                await asyncio.sleep(backoff)
+
+            request_timeout = pool.request_timeout
+            if expires_at is not None:
+                remaining = expires_at - time.monotonic()
+                if remaining <= 0:
+                    raise DeadlineExceededError("execution")
+                request_timeout = min(request_timeout, remaining)
+            try:
+                return await self._send_hedged(payload, exclude, request_timeout)
+            except RetryableExecutionError as e:
+                last_error = e
+                exclude = e.endpoint
+
+        raise ValidationError("Code execution failed", last_error.detail)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self.name, **self.endpoint_pool.stats()}
+
+
+@dataclass
+class Toolchain:
+    run: List[str]
+    compile: Optional[List[str]] = None
+    version_command: List[str] = field(default_factory=list)
+    # the JVM and the Go runtime reserve far more address space than they use
+    limit_address_space: bool = True
+    # files or directories the compile step leaves in the working directory for the run step
+    artifacts: List[str] = field(default_factory=list)
+
+
+LOCAL_TOOLCHAINS: Dict[str, Toolchain] = {
+    "python": Toolchain(run=["python3", "-I", "{file}"], version_command=["python3", "--version"]),
+    "javascript": Toolchain(run=["node", "{file}"], version_command=["node", "--version"], limit_address_space=False),
+    "typescript": Toolchain(run=["deno", "run", "--quiet", "{file}"], version_command=["deno", "--version"], limit_address_space=False),
+    "java": Toolchain(
+        compile=["javac", "-d", "classes", "{file}"],
+        run=["java", "-cp", "classes", "Main"],
+        version_command=["javac", "-version"],
+        limit_address_space=False,
+        artifacts=["classes"]
+    ),
+    "c": Toolchain(compile=["gcc", "-O2", "-o", "main", "{file}", "-lm"], run=["./main"], version_command=["gcc", "--version"], artifacts=["main"]),
+    "cpp": Toolchain(compile=["g++", "-O2", "-o", "main", "{file}"], run=["./main"], version_command=["g++", "--version"], artifacts=["main"]),
+    "ruby": Toolchain(run=["ruby", "{file}"], version_command=["ruby", "--version"]),
+    "go": Toolchain(compile=["go", "build", "-o", "main", "{file}"], run=["./main"], version_command=["go", "version"], limit_address_space=False, artifacts=["main"]),
+    "php": Toolchain(run=["php", "{file}"], version_command=["php", "--version"]),
+    "rust": Toolchain(compile=["rustc", "-O", "-o", "main", "{file}"], run=["./main"], version_command=["rustc", "--version"], artifacts=["main"]),
+    "bash": Toolchain(run=["bash", "{file}"], version_command=["bash", "--version"]),
+}
+
+
+def resolve_run_as(account: str) -> Optional[Tuple[int, int]]:
+    """The (uid, gid) of LOCAL_EXECUTOR_RUN_AS, or None when it is not set."""
+
+    if not account:
+        return None
+    try:
+        import pwd
+        entry = pwd.getpwuid(int(account)) if account.isdigit() else pwd.getpwnam(account)
+    except (ImportError, KeyError) as e:
+        raise ValueError(f"LOCAL_EXECUTOR_RUN_AS: no such user {account!r}") from e
+    if entry.pw_uid == 0:
+        raise ValueError("LOCAL_EXECUTOR_RUN_AS must be an unprivileged user")
+    if os.geteuid() != 0:
+        raise ValueError("LOCAL_EXECUTOR_RUN_AS needs the server to start as root to switch users")
+    return entry.pw_uid, entry.pw_gid
+
+
+def drop_privileges(run_as: Optional[Tuple[int, int]]) -> None:
+    # group first, setgid is not allowed any more once the uid has changed
+    if run_as is None:
+        return
+    uid, gid = run_as
+    os.setgroups([])
+    os.setgid(gid)
+    os.setuid(uid)
+
+
+class LocalExecutor(ExecutorBackend):
+    """Runs submissions in local subprocesses inside a throwaway working directory.
+
+    Each process gets CPU, memory and file-size rlimits, a wall clock deadline,
+    a cap on the combined bytes it may write to stdout and stderr and a
+    minimal environment. With `LOCAL_EXECUTOR_RUN_AS` set, compiles and runs
+    also drop to that unprivileged user, which keeps them away from the
+    server's files, its process environment and the compile cache. Nothing
+    else is isolated (no network or filesystem namespaces), so this is not a
+    sandbox for hostile code the way Piston's containers are.
+    """
+
+    name = "local"
+
+    def __init__(self, settings: Settings, toolchains: Optional[Dict[str, Toolchain]] = None):
+        self.cpu_seconds = settings.LOCAL_EXECUTOR_CPU_SECONDS
+        self.memory_bytes = settings.LOCAL_EXECUTOR_MEMORY_MB * 1024 * 1024
+        self.wall_seconds = settings.LOCAL_EXECUTOR_WALL_SECONDS
+        self.compile_wall_seconds = settings.LOCAL_EXECUTOR_COMPILE_WALL_SECONDS
+        self.compile_file_bytes = settings.LOCAL_EXECUTOR_COMPILE_FILE_MB * 1024 * 1024
+        self.output_bytes = settings.LOCAL_EXECUTOR_OUTPUT_BYTES
+        self.run_as = resolve_run_as(settings.LOCAL_EXECUTOR_RUN_AS)
+        self.toolchains = toolchains or LOCAL_TOOLCHAINS
+        self._versions: Dict[str, str] = {}
+        self.runs = 0
+        self.timeouts = 0
+        self.truncated = 0
+        self.python_latency = LatencyRecorder()
+        self.artifact_cache: Optional[CompiledArtifactCache] = None
+        if settings.COMPILE_CACHE_ENABLED:
+            self.artifact_cache = create_artifact_cache(
+                settings.COMPILE_CACHE_DIR or None,
+                settings.COMPILE_CACHE_MAX_MB * 1024 * 1024,
+                # runs as the server's own user could have rewritten what an earlier process left
+                load_existing=self.run_as is not None
+            )
+        self.python_pool = None
+        if settings.PYTHON_WORKER_POOL_ENABLED:
+            self.python_pool = PythonWorkerPool(
+                python_bin=self.toolchains["python"].run[0],
+                size=settings.PYTHON_WORKER_POOL_SIZE,
+                max_uses=settings.PYTHON_WORKER_MAX_USES,
+                cpu_seconds=self.cpu_seconds,
+                memory_bytes=self.memory_bytes,
+                wall_seconds=self.wall_seconds,
+                output_bytes=self.output_bytes,
+                run_as=self.run_as
+            )
+
+    async def start(self) -> None:
+        await self.resolve_versions()
+        if self.python_pool is not None and resource is not None:
+            await self.python_pool.start()
+
+    async def close(self) -> None:
+        if self.python_pool is not None:
+            await self.python_pool.close()
+
+    async def resolve_versions(self) -> None:
+        """Ask every toolchain for its version once, off the event loop, so runtime_version never blocks."""
+
+        missing = [language for language in self.toolchains if language not in self._versions]
+        versions = await asyncio.gather(*(asyncio.to_thread(self._probe_version, language) for language in missing))
+        self._versions.update(zip(missing, versions))
+
+    def _probe_version(self, language: str) -> str:
+        toolchain = self.toolchains[language]
+        version = "unavailable"
+        if toolchain.version_command and shutil.which(toolchain.version_command[0]):
+            try:
+                completed = subprocess.run(toolchain.version_command, capture_output=True, text=True, timeout=10)
+                banner = (completed.stdout or completed.stderr).strip().splitlines()
+                version = banner[0] if banner else "unknown"
+            except (OSError, subprocess.SubprocessError):
+                version = "unknown"
+        return f"local:{version}"
+
+    def runtime_version(self, language: str, requested_version: str) -> str:
+        # resolved in start; an executor used without starting it gets a fixed placeholder instead of a blocking probe
+        return self._versions.get(language, "local:unknown")
+
+    def _limits(self, cpu_seconds: int, limit_memory: bool, file_bytes: int):
+        memory_bytes = self.memory_bytes
+        run_as = self.run_as
+
+        def apply_limits():
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+            resource.setrlimit(resource.RLIMIT_FSIZE, (file_bytes, file_bytes))
+            resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+            if limit_memory:
+                resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+            drop_privileges(run_as)
+
+        return apply_limits if resource is not None else None
+
+    def _environment(self, workdir: str) -> Dict[str, str]:
+        return {**minimal_environment(workdir), "GOCACHE": os.path.join(workdir, ".gocache")}
+
+    async def _run_process(
+        self,
+        command: List[str],
+        workdir: str,
+        wall_seconds: float,
+        cpu_seconds: int,
+        limit_memory: bool,
+        file_bytes: Optional[int] = None,
+        on_output: Optional[Callable[[str, bytes], None]] = None,
+        stdin_path: Optional[str] = None
+    ) -> Dict[str, Any]:
+        started = time.monotonic()
+        try:
+            with open(stdin_path or os.devnull, "rb") as stdin:
+                process = await asyncio.create_subprocess_exec(
+                    *command,
+                    cwd=workdir,
+                    env=self._environment(workdir),
+                    stdin=stdin,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    preexec_fn=self._limits(cpu_seconds, limit_memory, file_bytes or self.output_bytes),
+                    start_new_session=True,
+                )
+        except FileNotFoundError:
+            raise ValidationError(f"Executable not found on the local executor: {command[0]}")
+
+        stdout, stderr, output = bytearray(), bytearray(), bytearray()
+        truncated = False
+
+        async def pump(name: str, stream: asyncio.StreamReader, sink: bytearray):
+            nonlocal truncated
+            while True:
+                chunk = await stream.read(4096)
+                if not chunk:
+                    return
+                room = self.output_bytes - len(output)
+                if room <= 0:
+                    truncated = True
+                    self._kill(process)
+                    return
+                chunk = chunk[:room]
+                sink.extend(chunk)
+                output.extend(chunk)
+                if on_output is not None:
+                    on_output(name, chunk)
+
+        timed_out = False
+        gathered = asyncio.gather(
+            pump("stdout", process.stdout, stdout),
+            pump("stderr", process.stderr, stderr),
+            process.wait()
+        )
+        try:
+            await asyncio.wait_for(gathered, timeout=wall_seconds)
+        except asyncio.TimeoutError:
+            timed_out = True
+            self._kill(process)
+        except asyncio.CancelledError:
+            self._kill(process)
+            raise
+        finally:
+            if gathered.done() and not gathered.cancelled():
+                # a cancelled run leaves the CancelledError of its pumps here, retrieve it so asyncio does not log it
+                gathered.exception()
+            if process.returncode is None:
+                self._kill(process)
+                await process.wait()
+
+        returncode = process.returncode
+        killed_by = signal.Signals(-returncode).name if returncode < 0 else None
+        if timed_out:
+            killed_by = "SIGKILL"
+            self.timeouts += 1
+        if truncated:
+            self.truncated += 1
+
+        return {
+            "stdout": stdout.decode("utf-8", errors="replace"),
+            "stderr": stderr.decode("utf-8", errors="replace"),
+            "output": output.decode("utf-8", errors="replace"),
+            "code": returncode if returncode >= 0 else None,
+            "signal": killed_by,
+            "status": "TO" if timed_out else None,
+            "wall_time": round((time.monotonic() - started) * 1000),
+            "truncated": truncated,
+        }
+
+    def _kill(self, process: asyncio.subprocess.Process) -> None:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    async def run(
+        self,
+        language: str,
+        version: str,
+        extension: str,
+        code: str,
+        stdin: str = "",
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        toolchain = self.toolchains.get(language)
+        if toolchain is None:
+            raise ValidationError(f"Language not available on the local executor: {language}")
+
+        wall_seconds = self.wall_seconds if timeout is None else min(self.wall_seconds, timeout)
+        self.runs += 1
+        started = time.monotonic()
+        expires_at = started + timeout if timeout is not None else None
+        if language == "python" and self.python_pool is not None and self.python_pool.started:
+            try:
+                return await self.python_pool.run(code, stdin, wall_seconds)
+            except RuntimeError as e:
+                logger.warning(f"{e}, running on the per-call path instead")
+            # time spent waiting for a worker comes out of the run's own budget
+            wall_seconds -= time.monotonic() - started
+            if wall_seconds <= 0:
+                self.timeouts += 1
+                return {
+                    "stdout": "", "stderr": "", "output": "", "code": None, "signal": None,
+                    "status": "TO", "wall_time": round((time.monotonic() - started) * 1000), "truncated": False,
+                }
+            started = time.monotonic()
+
+        result = await self._run_source(
+            language, toolchain, extension, code, stdin=stdin, wall_seconds=wall_seconds, expires_at=expires_at
+        )
+        if language == "python":
+            self.python_latency.record((time.monotonic() - started) * 1000)
+        return result
+
+    async def stream(
+        self,
+        language: str,
+        version: str,
+        extension: str,
+        code: str,
+        stdin: str = "",
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        # always the per-call path: the warm Python workers only hand back finished runs
+        toolchain = self.toolchains.get(language)
+        if toolchain is None:
+            raise ValidationError(f"Language not available on the local executor: {language}")
+
+        wall_seconds = self.wall_seconds if timeout is None else min(self.wall_seconds, timeout)
+        expires_at = time.monotonic() + timeout if timeout is not None else None
+        self.runs += 1
+        events: asyncio.Queue = asyncio.Queue()
+        decoders = {name: codecs.getincrementaldecoder("utf-8")(errors="replace") for name in ("stdout", "stderr")}
+
+        def on_output(name: str, chunk: bytes) -> None:
+            text = decoders[name].decode(chunk)
+            if text:
+                events.put_nowait({"stream": name, "data": text})
+
+        task = asyncio.create_task(
+            self._run_source(
+                language, toolchain, extension, code, on_output, stdin, wall_seconds=wall_seconds, expires_at=expires_at
+            )
+        )
+        task.add_done_callback(lambda _: events.put_nowait(None))
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+            run_result = task.result()
+        finally:
+            # the consumer went away (e.g. the browser closed the stream), so stop the program
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+        for name, decoder in decoders.items():
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield {"stream": name, "data": tail}
+        yield {"result": run_result}
+
+    async def _compile(
+        self,
+        language: str,
+        toolchain: Toolchain,
+        filename: str,
+        code: str,
+        workdir: str,
+        on_output: Optional[Callable[[str, bytes], None]],
+        expires_at: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Leave the compiled artifacts in `workdir`, returning the compile run only if it failed.
+
+        Compiling stops at `expires_at` (a monotonic time) when the run has one, like Piston's compile_timeout.
+        """
+
+        cache = self.artifact_cache if toolchain.artifacts else None
+        key = None
+        if cache is not None:
+            key = make_artifact_key(language, self.runtime_version(language, ""), code)
+            if await asyncio.to_thread(cache.restore, key, workdir, toolchain.artifacts):
+                return None
+
+        started = time.monotonic()
+        compile_seconds = self.compile_wall_seconds
+        if expires_at is not None:
+            compile_seconds = max(0.0, min(compile_seconds, expires_at - started))
+        compiled = await self._run_process(
+            [part.format(file=filename) for part in toolchain.compile],
+            workdir,
+            compile_seconds,
+            cpu_seconds=max(1, math.ceil(compile_seconds)),
+            limit_memory=False,
+            # compilers write binaries far larger than a program's output cap
+            file_bytes=self.compile_file_bytes,
+            on_output=on_output
+        )
+        if compiled["code"] != 0:
+            return compiled
+
+        if cache is not None:
+            compile_ms = (time.monotonic() - started) * 1000
+            await asyncio.to_thread(cache.store, key, workdir, toolchain.artifacts, compile_ms)
+        return None
+
+    async def _run_source(
+        self,
+        language: str,
+        toolchain: Toolchain,
+        extension: str,
+        code: str,
+        on_output: Optional[Callable[[str, bytes], None]] = None,
+        stdin: str = "",
+        wall_seconds: Optional[float] = None,
+        expires_at: Optional[float] = None
+    ) -> Dict[str, Any]:
+        wall_seconds = wall_seconds or self.wall_seconds
+        with tempfile.TemporaryDirectory(prefix="adventurecode-") as workdir:
+            if self.run_as is not None:
+                # compilers and programs write here as the unprivileged user
+                os.chown(workdir, *self.run_as)
+            filename = f"Main.{extension}"
+            with open(os.path.join(workdir, filename), "w", encoding="utf-8") as source:
+                source.write(code)
+
+            stdin_path = None
+            if stdin:
+                stdin_path = os.path.join(workdir, ".stdin")
+                with open(stdin_path, "w", encoding="utf-8") as stdin_file:
+                    stdin_file.write(stdin)
+
+            if toolchain.compile:
+                failed = await self._compile(language, toolchain, filename, code, workdir, on_output, expires_at)
+                if failed is not None:
+                    return failed
+                if expires_at is not None:
+                    # the program only gets what compiling left of the budget
+                    wall_seconds = max(0.0, min(wall_seconds, expires_at - time.monotonic()))
+
+            return await self._run_process(
+                [part.format(file=filename) for part in toolchain.run],
+                workdir,
+                wall_seconds,
+                cpu_seconds=self.cpu_seconds,
+                limit_memory=toolchain.limit_address_space,
+                on_output=on_output,
+                stdin_path=stdin_path
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "runs": self.runs,
+            "timeouts": self.timeouts,
+            "truncated_outputs": self.truncated,
+            "python_per_call_latency": self.python_latency.summary(),
+            "compile_cache": self.artifact_cache.stats() if self.artifact_cache is not None else None,
+            "python_worker_pool": self.python_pool.stats() if self.python_pool is not None else None,
+        }
+
+
+@lru_cache()
+def get_local_executor() -> LocalExecutor:
+    return LocalExecutor(get_settings())
+
+
+def create_executor_backend(settings: Settings, http_client: ExecutorHttpClient) -> ExecutorBackend:
+    if settings.EXECUTOR_BACKEND == "local":
+        if not settings.LOCAL_EXECUTOR_RUN_AS and not settings.LOCAL_EXECUTOR_ALLOW_UNSAFE:
+            raise ValueError(
+                "EXECUTOR_BACKEND=local runs submissions as the server's own user: set LOCAL_EXECUTOR_RUN_AS "
+                "to an unprivileged account, or LOCAL_EXECUTOR_ALLOW_UNSAFE=true on a trusted development machine"
+            )
+        return get_local_executor()
+    if settings.EXECUTOR_BACKEND == "piston":
+        return PistonExecutor(
+            http_client,
+            run_timeout_ms=settings.PISTON_RUN_TIMEOUT_MS,
+            compile_timeout_ms=settings.PISTON_COMPILE_TIMEOUT_MS
+        )
+    raise ValueError(f"Unknown EXECUTOR_BACKEND: {settings.EXECUTOR_BACKEND}")
+
+
+@lru_cache()
+def get_executor_backend() -> ExecutorBackend:
+    """The backend the app starts in its lifespan and every request shares."""
+    return create_executor_backend(get_settings(), get_executor_http_client())
@@ -0,0 +1,96 @@
+import httpx
+import logging
+from functools import lru_cache
+from typing import Optional, Dict, Any
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorHttpClient:
+    """Process-wide pooled httpx client used for every call to the code executor.
+
+    Created once in the FastAPI lifespan so submissions reuse keep-alive
+    connections instead of paying TCP+TLS setup on every run.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self.client: Optional[httpx.AsyncClient] = None
+        self.requests_total = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.http2 = False
+
+    def _http2_available(self) -> bool:
+        try:
+            import h2  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    async def start(self) -> None:
+        if self.client is not None:
+            return
+
+        self.http2 = self.settings.PISTON_HTTP2
+        if self.http2 and not self._http2_available():
+            logger.warning("PISTON_HTTP2 is enabled but the 'h2' package is not installed, falling back to HTTP/1.1")
+            self.http2 = False
+
+        limits = httpx.Limits(
+            max_connections=self.settings.PISTON_MAX_CONNECTIONS,
+            max_keepalive_connections=self.settings.PISTON_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=self.settings.PISTON_KEEPALIVE_EXPIRY,
+        )
+        self.client = httpx.AsyncClient(
+            limits=limits,
+            http2=self.http2,
+        )
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    @property
+    def started(self) -> bool:
+        return self.client is not None
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        if self.client is None:
+            raise RuntimeError("Executor HTTP client has not been started")
+
+        self.requests_total += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return await self.client.post(url, **kwargs)
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        connections = []
+        if self.client is not None:
+            # httpx does not expose pool state publicly, so read it from the httpcore pool
+            pool = getattr(self.client._transport, "_pool", None)
+            connections = list(getattr(pool, "connections", []))
+
+        idle = sum(1 for c in connections if c.is_idle())
+        return {
+            "started": self.started,
+            "http2": self.http2,
+            "max_connections": self.settings.PISTON_MAX_CONNECTIONS,
+            "max_keepalive_connections": self.settings.PISTON_MAX_KEEPALIVE_CONNECTIONS,
+            "open_connections": len(connections),
+            "idle_connections": idle,
+            "active_connections": len(connections) - idle,
+            "in_flight_requests": self.in_flight,
+            "peak_in_flight_requests": self.peak_in_flight,
+            "requests_total": self.requests_total,
+        }
+
+
+@lru_cache()
+def get_executor_http_client() -> ExecutorHttpClient:
+    return ExecutorHttpClient()
@@ -0,0 +1,255 @@
+import asyncio
+import functools
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from config import get_settings
+from exceptions import IdempotencyKeyMismatchError, ServiceUnavailableError, ValidationError
+from services.rate_limiter import get_client_address
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+# response headers kept with a stored response and sent again on replay
+KEPT_HEADERS = ("server-timing", "retry-after")
+
+
+@dataclass
+class StoredResponse:
+    status_code: int
+    body: bytes
+    media_type: str
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    def replay(self) -> Response:
+        return Response(
+            content=self.body,
+            status_code=self.status_code,
+            media_type=self.media_type,
+            headers={**self.headers, REPLAYED_HEADER: "true"}
+        )
+
+
+@dataclass
+class IdempotencyEntry:
+    fingerprint: str
+    # resolves to the StoredResponse once the first request has finished
+    outcome: asyncio.Future
+    expires_at: float = 0.0
+
+
+def idempotency_scope(handler: str, user, key: str, client: Optional[str] = None) -> str:
+    """Where a key is stored: per handler and signed-in user, or per client address for guests.
+
+    So neither a guest nor another signed-in user can replay someone else's
+    response by reusing a simple key such as "1".
+    """
+    owner = user.id if user is not None else f"guest-{client or 'unknown'}"
+    return f"{handler}:{owner}:{key}"
+
+
+def request_fingerprint(kwargs: Dict[str, Any]) -> str:
+    """Hash of a handler's request fields, so a key reused with a different submission is caught.
+
+    Only plain values and pydantic bodies count; injected services, sessions
+    and the current user are left out.
+    """
+
+    fields = {}
+    for name, value in kwargs.items():
+        if name == "idempotency_key":
+            continue
+        if isinstance(value, BaseModel):
+            fields[name] = value.dict()
+        elif value is None or isinstance(value, (str, int, float, bool)):
+            fields[name] = value
+    encoded = json.dumps(fields, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _kept_headers(response: Optional[Response]) -> Dict[str, str]:
+    if response is None:
+        return {}
+    return {name: value for name, value in response.headers.items() if name in KEPT_HEADERS}
+
+
+def _store(result: Any, response: Optional[Response] = None) -> StoredResponse:
+    """`response` is the handler's injected Response, whose headers FastAPI adds to a returned dict."""
+    if isinstance(result, Response):
+        return StoredResponse(
+            result.status_code, bytes(result.body), result.media_type or "application/json", _kept_headers(result)
+        )
+    encoded = JSONResponse(content=jsonable_encoder(result))
+    return StoredResponse(encoded.status_code, bytes(encoded.body), "application/json", _kept_headers(response))
+
+
+class IdempotencyStore:
+    """Remembers the responses of submissions sent with an Idempotency-Key header.
+
+    A repeat of a finished request within `ttl_seconds` gets the stored
+    response back without running anything. A repeat that arrives while
+    the first is still running waits for it and gets the same response.
+    Responses with a 5xx status are handed to those waiting, but not kept,
+    so a later retry runs again. Entries live in this process only: with
+    several uvicorn workers a retry routed to another worker runs again.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, enabled: bool = True):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, IdempotencyEntry]" = OrderedDict()
+        self.executions = 0
+        self.replayed = 0
+        self.waited = 0
+        self.mismatches = 0
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.outcome.done() and entry.expires_at <= now:
+                del self._entries[key]
+                continue
+            if len(self._entries) > self.max_entries and entry.outcome.done():
+                del self._entries[key]
+                continue
+            break
+
+    def _live(self, key: str) -> Optional[IdempotencyEntry]:
+        self._expire()
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.outcome.get_loop() is not asyncio.get_running_loop():
+            # left over from another event loop (e.g. between test clients)
+            del self._entries[key]
+            return None
+        if entry.outcome.done() and entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+
+    def will_replay(self, key: str) -> bool:
+        """Whether a request under `key` would be answered from the store (or by waiting on a running one).
+
+        Lets the rate limiter skip charging a retry that runs nothing.
+        """
+        return self.enabled and self._live(key) is not None
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        handler: Callable[[], Awaitable[Any]],
+        response: Optional[Response] = None
+    ) -> Any:
+        entry = self._live(key)
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                self.mismatches += 1
+                raise IdempotencyKeyMismatchError()
+            if entry.outcome.done():
+                self.replayed += 1
+            else:
+                self.waited += 1
+            stored = await asyncio.shield(entry.outcome)
+            return stored.replay()
+
+        entry = IdempotencyEntry(fingerprint, asyncio.get_running_loop().create_future())
+        self._entries[key] = entry
+        self.executions += 1
+        try:
+            result = await handler()
+        except asyncio.CancelledError:
+            self._fail(key, entry, ServiceUnavailableError("The original request was interrupted, please retry"))
+            raise
+        except Exception as e:
+            self._fail(key, entry, e)
+            raise
+
+        stored = _store(result, response)
+        entry.outcome.set_result(stored)
+        if stored.status_code >= 500:
+            self._forget(key, entry)
+        else:
+            entry.expires_at = time.monotonic() + self.ttl_seconds
+            self._entries.move_to_end(key)
+        return result
+
+    def _fail(self, key: str, entry: IdempotencyEntry, error: BaseException) -> None:
+        entry.outcome.set_exception(error)
+        # nobody may be waiting, retrieve the exception so asyncio does not log it as unhandled
+        entry.outcome.exception()
+        self._forget(key, entry)
+
+    def _forget(self, key: str, entry: IdempotencyEntry) -> None:
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "in_flight": sum(1 for entry in self._entries.values() if not entry.outcome.done()),
+            "executions": self.executions,
+            "replayed": self.replayed,
+            "waited": self.waited,
+            "mismatches": self.mismatches,
+        }
+
+
+@lru_cache()
+def get_idempotency_store() -> IdempotencyStore:
+    settings = get_settings()
+    return IdempotencyStore(
+        ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+        max_entries=settings.IDEMPOTENCY_MAX_ENTRIES,
+        enabled=settings.IDEMPOTENCY_ENABLED
+    )
+
+
+def idempotent(handler: str):
+    """Make a submission route honour the Idempotency-Key header.
+
+    The route declares `idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")`,
+    and guest routes (no `current_user`) also declare `request: Request`.
+    Keys are scoped to the handler and the signed-in user, or the client
+    address for guests, so nobody can replay another caller's response.
+    The store is per process, see IdempotencyStore. The Server-Timing header,
+    set on the injected `response` or on a returned Response, is stored
+    and replayed with the body. The route function is tagged with
+    `idempotent_handler` so the rate limit dependencies can tell a
+    replay apart before charging for it.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = kwargs.get("idempotency_key")
+            store = get_idempotency_store()
+            if not key or not store.enabled:
+                return await func(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                raise ValidationError(f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+
+            user = kwargs.get("current_user")
+            request = kwargs.get("request")
+            client = get_client_address(request) if user is None and request is not None else None
+            scope = idempotency_scope(handler, user, key, client)
+            return await store.run(
+                scope, request_fingerprint(kwargs), lambda: func(*args, **kwargs), kwargs.get("response")
+            )
+
+        wrapper.idempotent_handler = handler
+        return wrapper
+
+    return decorator
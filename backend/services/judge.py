@@ -0,0 +1,558 @@
+import asyncio
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Any, Awaitable, Callable, Iterable, List, Optional, Tuple
+
+from config import get_settings
+from exceptions import ValidationError
+
+# strip: the whole output is compared after .strip(), which is how every route judged before modes existed
+# exact: byte for byte
+# trim_lines: trailing whitespace on each line and trailing blank lines are ignored
+# float: like trim_lines, but numeric tokens only need to agree within a tolerance
+JUDGE_MODES = ("strip", "exact", "trim_lines", "float")
+DEFAULT_JUDGE_MODE = "strip"
+DEFAULT_FLOAT_TOLERANCE = 1e-6
+
+
+def validate_judge_mode(mode: Optional[str]) -> str:
+    mode = mode or DEFAULT_JUDGE_MODE
+    if mode not in JUDGE_MODES:
+        raise ValidationError(f"Unknown judge mode: {mode}", f"Expected one of {', '.join(JUDGE_MODES)}")
+    return mode
+
+
+def clip(text: Optional[str], limit: int) -> Optional[str]:
+    """Cut text to `limit` characters so a chatty program cannot bloat a response."""
+
+    if text is None or len(text) <= limit:
+        return text
+    return text[:limit] + f"\n... [{len(text) - limit} more characters]"
+
+
+def run_metrics(run_result: Dict[str, Any]) -> Dict[str, Optional[int]]:
+    """CPU time, wall time (ms) and peak memory (bytes) of a run, None where the executor did not report it."""
+
+    def number(key: str) -> Optional[int]:
+        value = run_result.get(key)
+        return round(value) if isinstance(value, (int, float)) else None
+
+    return {"cpu_time_ms": number("cpu_time"), "wall_time_ms": number("wall_time"), "memory_bytes": number("memory")}
+
+
+def _floats_match(expected: str, actual: str, tolerance: float) -> bool:
+    if expected == actual:
+        return True
+    try:
+        expected_value = float(expected)
+        actual_value = float(actual)
+    except ValueError:
+        return False
+    if math.isnan(expected_value) or math.isnan(actual_value):
+        return math.isnan(expected_value) and math.isnan(actual_value)
+    return abs(expected_value - actual_value) <= tolerance * max(1.0, abs(expected_value))
+
+
+@dataclass
+class Verdict:
+    is_correct: bool
+    mode: str
+    diff: Optional[Dict[str, Any]] = None
+    output_limit_exceeded: bool = False
+    # "time_limit_exceeded" or "memory_limit_exceeded", whatever the output was
+    limit_exceeded: Optional[str] = None
+    limit_detail: Optional[str] = None
+
+    @property
+    def status(self) -> str:
+        if self.limit_exceeded:
+            return self.limit_exceeded
+        return "correct" if self.is_correct else "incorrect"
+
+    def message(self) -> str:
+        if self.is_correct:
+            return "Correct! Well done."
+        if self.limit_exceeded == "time_limit_exceeded":
+            return f"Time limit exceeded. {self.limit_detail}" if self.limit_detail else "Time limit exceeded."
+        if self.limit_exceeded == "memory_limit_exceeded":
+            return f"Memory limit exceeded. {self.limit_detail}" if self.limit_detail else "Memory limit exceeded."
+        if self.output_limit_exceeded:
+            return "Incorrect. Your program printed more output than allowed."
+        diff = self.diff
+        if diff["reason"] == "missing_output":
+            return f"Incorrect. Your output ended early, expected line {diff['line']}:\n{diff['expected']}"
+        if diff["reason"] == "extra_output":
+            return f"Incorrect. Unexpected extra output on line {diff['line']}:\n{diff['actual']}"
+        return (
+            f"Incorrect. First difference on line {diff['line']}.\n"
+            f"Expected:\n{diff['expected']}\n\nYour output:\n{diff['actual']}"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "is_correct": self.is_correct,
+            "status": self.status,
+            "mode": self.mode,
+            "diff": self.diff,
+            "output_limit_exceeded": self.output_limit_exceeded,
+        }
+
+
+class ExpectedOutput:
+    """An expected output normalized once for its judge mode.
+
+    Outputs are compared line by line, so `lines` holds what each line of
+    a correct program's output must match.
+    """
+
+    def __init__(self, raw: str, mode: str = DEFAULT_JUDGE_MODE, tolerance: Optional[float] = None):
+        self.raw = raw
+        self.mode = validate_judge_mode(mode)
+        self.tolerance = DEFAULT_FLOAT_TOLERANCE if tolerance is None else tolerance
+
+        if self.mode == "strip":
+            normalized = raw.strip()
+            lines = normalized.split("\n") if normalized else []
+        elif self.mode == "exact":
+            normalized = raw
+            lines = raw.split("\n")
+        else:
+            lines = [line.rstrip() for line in raw.split("\n")]
+            while lines and not lines[-1]:
+                lines.pop()
+            normalized = "\n".join(lines)
+
+        self.normalized = normalized
+        self.lines = lines
+        self.hash = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        self.tokens = [line.split() for line in lines] if self.mode == "float" else None
+
+    def comparator(self, max_chars: int, diff_chars: int) -> "OutputComparator":
+        return OutputComparator(self, max_chars, diff_chars)
+
+    def judge(self, output: str, max_chars: int, diff_chars: int) -> Verdict:
+        comparator = self.comparator(max_chars, diff_chars)
+        comparator.feed(output)
+        return comparator.finish()
+
+
+class OutputComparator:
+    """Compares output against an ExpectedOutput as it arrives.
+
+    `feed` returns False as soon as the verdict is settled (first mismatch
+    or output past `max_chars`), so a caller streaming output can stop
+    early. Only the current line is buffered, never the whole output.
+    """
+
+    def __init__(self, expected: ExpectedOutput, max_chars: int, diff_chars: int):
+        self.expected = expected
+        self.max_chars = max_chars
+        self.diff_chars = diff_chars
+        self.consumed = 0
+        self.line_number = 0
+        self._partial: List[str] = []
+        self._started = expected.mode != "strip"
+        self.verdict: Optional[Verdict] = None
+
+    def _fail(self, reason: str, expected_line: Optional[str], actual_line: Optional[str]) -> None:
+        self.verdict = Verdict(
+            is_correct=False,
+            mode=self.expected.mode,
+            diff={
+                "line": self.line_number + 1,
+                "reason": reason,
+                "expected": clip(expected_line, self.diff_chars),
+                "actual": clip(actual_line, self.diff_chars),
+            }
+        )
+
+    def _line_matches(self, index: int, line: str) -> bool:
+        expected = self.expected
+        if expected.mode == "exact":
+            return line == expected.lines[index]
+        if expected.mode == "strip":
+            # the last expected line may be followed by trailing whitespace
+            if index == len(expected.lines) - 1:
+                return line.rstrip() == expected.lines[index]
+            return line == expected.lines[index]
+        if expected.mode == "trim_lines":
+            return line.rstrip() == expected.lines[index]
+
+        actual_tokens = line.split()
+        expected_tokens = expected.tokens[index]
+        return len(actual_tokens) == len(expected_tokens) and all(
+            _floats_match(e, a, expected.tolerance) for e, a in zip(expected_tokens, actual_tokens)
+        )
+
+    def _check_line(self, line: str) -> None:
+        if not self._started:
+            if not line.strip():
+                return
+            self._started = True
+            line = line.lstrip()
+
+        index = self.line_number
+        lines = self.expected.lines
+        if index >= len(lines):
+            # only blank lines (or, in exact mode, nothing) may follow the expected output
+            if self.expected.mode == "exact" or line.strip():
+                self._fail("extra_output", None, line)
+        elif not self._line_matches(index, line):
+            self._fail("different", lines[index], line)
+
+        if self.verdict is None:
+            self.line_number += 1
+
+    def feed(self, chunk: str) -> bool:
+        if self.verdict is not None:
+            return False
+
+        self.consumed += len(chunk)
+        if self.consumed > self.max_chars:
+            self.verdict = Verdict(is_correct=False, mode=self.expected.mode, output_limit_exceeded=True)
+            return False
+
+        start = 0
+        while True:
+            newline = chunk.find("\n", start)
+            if newline == -1:
+                self._partial.append(chunk[start:])
+                return True
+            self._partial.append(chunk[start:newline])
+            line = "".join(self._partial)
+            self._partial = []
+            self._check_line(line)
+            if self.verdict is not None:
+                return False
+            start = newline + 1
+
+    def finish(self) -> Verdict:
+        if self.verdict is not None:
+            return self.verdict
+
+        last = "".join(self._partial)
+        self._partial = []
+        # in every mode but exact a missing final newline is not a difference
+        if last or self.expected.mode == "exact":
+            self._check_line(last)
+            if self.verdict is not None:
+                return self.verdict
+
+        if self.line_number < len(self.expected.lines):
+            self._fail("missing_output", self.expected.lines[self.line_number], None)
+            return self.verdict
+
+        self.verdict = Verdict(is_correct=True, mode=self.expected.mode)
+        return self.verdict
+
+
+@dataclass
+class ResourceLimits:
+    """Per-problem (or per-node) limits, checked against what the run reports after it finishes.
+
+    Runs are executed under the executor's own limits and cached independently
+    of these, so the same run can be judged against different limits.
+    """
+
+    time_limit_ms: Optional[int] = None
+    memory_limit_mb: Optional[int] = None
+
+    def check(self, run_result: Dict[str, Any]) -> Optional[Verdict]:
+        metrics = run_metrics(run_result)
+        # CPU time when the executor reports it, so a busy host does not fail a fast solution
+        used_ms = metrics["cpu_time_ms"] if metrics["cpu_time_ms"] is not None else metrics["wall_time_ms"]
+
+        if self.time_limit_ms is not None and used_ms is not None and used_ms > self.time_limit_ms:
+            return self._exceeded("time_limit_exceeded", f"Your program ran for {used_ms} ms, the limit is {self.time_limit_ms} ms.")
+        # killed for running too long under the executor's own limit
+        if run_result.get("status") == "TO" or run_result.get("signal") == "SIGXCPU":
+            return self._exceeded("time_limit_exceeded", None)
+
+        memory = metrics["memory_bytes"]
+        if self.memory_limit_mb is not None and memory is not None and memory > self.memory_limit_mb * 1024 * 1024:
+            used_mb = round(memory / (1024 * 1024), 1)
+            return self._exceeded("memory_limit_exceeded", f"Your program used {used_mb} MB, the limit is {self.memory_limit_mb} MB.")
+        return None
+
+    def _exceeded(self, status: str, detail: Optional[str]) -> Verdict:
+        return Verdict(is_correct=False, mode="limits", limit_exceeded=status, limit_detail=detail)
+
+
+@dataclass
+class JudgeCase:
+    """One stdin / expected output pair. Case 0 is the problem's own expected output with no stdin."""
+
+    stdin: str
+    expected: ExpectedOutput
+    limits: Optional[ResourceLimits] = None
+
+
+@dataclass
+class CaseResult:
+    index: int
+    verdict: Verdict
+    run: Dict[str, Any]
+    duration_ms: float
+
+
+class CaseReport:
+    """Outcome of judging one submission against all of its test cases.
+
+    Cases that never ran because fail-fast stopped the submission are
+    reported as skipped.
+    """
+
+    def __init__(self, total: int, results: Iterable[CaseResult], judge_ms: float = 0.0):
+        self.total = total
+        # time spent comparing output and checking limits, summed over the cases judged here
+        self.judge_ms = judge_ms
+        self.results = {result.index: result for result in results}
+        failures = [result for result in self.results.values() if not result.verdict.is_correct]
+        self.failed = min(failures, key=lambda result: result.index) if failures else None
+        self.is_correct = self.failed is None and len(self.results) == total
+
+    @property
+    def primary(self) -> CaseResult:
+        # the output shown to the user is that of the failing case, or else the first one that ran
+        return self.failed or self.results[min(self.results)]
+
+    @property
+    def run(self) -> Dict[str, Any]:
+        return self.primary.run
+
+    @property
+    def verdict(self) -> Verdict:
+        return self.primary.verdict
+
+    @property
+    def status(self) -> str:
+        return self.verdict.status
+
+    def runtime(self) -> Dict[str, Optional[int]]:
+        """The largest CPU time, wall time and memory over the cases that ran."""
+
+        runtime: Dict[str, Optional[int]] = {"cpu_time_ms": None, "wall_time_ms": None, "memory_bytes": None}
+        for result in self.results.values():
+            for key, value in run_metrics(result.run).items():
+                if value is not None and (runtime[key] is None or value > runtime[key]):
+                    runtime[key] = value
+        return runtime
+
+    def message(self) -> str:
+        message = self.verdict.message()
+        if self.failed is not None and self.total > 1:
+            message += f"\n\n(test case {self.failed.index + 1} of {self.total})"
+        return message
+
+    def cases(self) -> List[Dict[str, Any]]:
+        cases = []
+        for index in range(self.total):
+            result = self.results.get(index)
+            if result is None:
+                cases.append({"index": index, "status": "skipped", "verdict": None, "duration_ms": None, "diff": None})
+                continue
+            cases.append({
+                "index": index,
+                "status": "passed" if result.verdict.is_correct else "failed",
+                "verdict": result.verdict.status,
+                "duration_ms": result.duration_ms,
+                "diff": result.verdict.diff,
+                **run_metrics(result.run),
+            })
+        return cases
+
+
+class ExpectedOutputCache:
+    """LRU of ExpectedOutput keyed by where it came from (a problem or adventure node).
+
+    An entry is reused only while the raw expected output is unchanged, so
+    edits to a problem or node take effect on the next submission.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, Optional[float]], ExpectedOutput]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, source: str, raw: str, mode: Optional[str] = None, tolerance: Optional[float] = None) -> ExpectedOutput:
+        mode = validate_judge_mode(mode)
+        key = (source, mode, tolerance)
+        entry = self._entries.get(key)
+        if entry is not None and entry.raw == raw:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        entry = ExpectedOutput(raw, mode, tolerance)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class OutputJudge:
+    """Entry point the routes use to judge a run against a problem or adventure node."""
+
+    def __init__(
+        self,
+        max_output_chars: int,
+        diff_chars: int,
+        response_output_chars: int,
+        cache_entries: int,
+        case_concurrency: int = 4,
+        fail_fast: bool = True
+    ):
+        self.max_output_chars = max_output_chars
+        self.diff_chars = diff_chars
+        self.response_output_chars = response_output_chars
+        self.expected_outputs = ExpectedOutputCache(cache_entries)
+        self.case_concurrency = case_concurrency
+        self.fail_fast = fail_fast
+
+    def for_problem(self, problem) -> ExpectedOutput:
+        return self.expected_outputs.get(
+            f"problem:{problem.id}", problem.expected_output, problem.judge_mode, problem.float_tolerance
+        )
+
+    def for_node(self, adventure_id: int, node: Dict[str, Any]) -> ExpectedOutput:
+        data = node["data"]
+        return self.expected_outputs.get(
+            f"adventure:{adventure_id}:{node['id']}",
+            data["expected_output"],
+            data.get("judge_mode"),
+            data.get("float_tolerance")
+        )
+
+    def _cases(
+        self,
+        source: str,
+        expected: ExpectedOutput,
+        test_cases: Optional[List[Dict[str, Any]]],
+        limits: Optional[ResourceLimits]
+    ) -> List[JudgeCase]:
+        cases = [JudgeCase("", expected, limits)]
+        for index, test_case in enumerate(test_cases or [], start=1):
+            cases.append(JudgeCase(
+                test_case.get("stdin") or "",
+                self.expected_outputs.get(
+                    f"{source}:case:{index}", test_case["expected_output"], expected.mode, expected.tolerance
+                ),
+                limits
+            ))
+        return cases
+
+    def cases_for_problem(self, problem) -> List[JudgeCase]:
+        return self._cases(
+            f"problem:{problem.id}",
+            self.for_problem(problem),
+            problem.test_cases,
+            ResourceLimits(problem.time_limit_ms, problem.memory_limit_mb)
+        )
+
+    def cases_for_node(self, adventure_id: int, node: Dict[str, Any]) -> List[JudgeCase]:
+        data = node["data"]
+        return self._cases(
+            f"adventure:{adventure_id}:{node['id']}",
+            self.for_node(adventure_id, node),
+            data.get("test_cases"),
+            ResourceLimits(data.get("time_limit_ms"), data.get("memory_limit_mb"))
+        )
+
+    def judge_run(self, case: JudgeCase, run_result: Dict[str, Any], verdict: Optional[Verdict] = None) -> Verdict:
+        """Judge a finished run of `case`; resource limits take precedence over the output.
+
+        `verdict` is the output verdict when the caller already has one (e.g. from a streaming comparator).
+        """
+
+        if case.limits is not None:
+            exceeded = case.limits.check(run_result)
+            if exceeded is not None:
+                return exceeded
+        return verdict if verdict is not None else self.judge(case.expected, run_result.get("output", ""))
+
+    async def run_cases(
+        self,
+        cases: List[JudgeCase],
+        execute: Callable[[str], Awaitable[Dict[str, Any]]],
+        fail_fast: Optional[bool] = None,
+        completed: Iterable[CaseResult] = ()
+    ) -> CaseReport:
+        """Run `execute(stdin)` for every case, at most `case_concurrency` at a time, and judge each run.
+
+        In fail-fast mode the first wrong answer cancels the cases still
+        running or waiting. Cases in `completed` were judged by the caller
+        already (e.g. the streamed first case) and are not run again.
+        Executor errors propagate and cancel the remaining cases.
+        """
+
+        fail_fast = self.fail_fast if fail_fast is None else fail_fast
+        results = list(completed)
+        if fail_fast and any(not result.verdict.is_correct for result in results):
+            return CaseReport(len(cases), results)
+
+        semaphore = asyncio.Semaphore(self.case_concurrency)
+        judge_ms = 0.0
+
+        async def run_case(index: int, case: JudgeCase) -> CaseResult:
+            nonlocal judge_ms
+            async with semaphore:
+                started = time.monotonic()
+                run_result = await execute(case.stdin)
+                judging = time.monotonic()
+                verdict = self.judge_run(case, run_result)
+                finished = time.monotonic()
+                judge_ms += (finished - judging) * 1000
+                return CaseResult(index, verdict, run_result, round((finished - started) * 1000, 2))
+
+        done = {result.index for result in results}
+        tasks = [
+            asyncio.create_task(run_case(index, case))
+            for index, case in enumerate(cases) if index not in done
+        ]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                result = await finished
+                results.append(result)
+                if fail_fast and not result.verdict.is_correct:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        return CaseReport(len(cases), results, judge_ms)
+
+    def judge(self, expected: ExpectedOutput, output: str) -> Verdict:
+        return expected.judge(output, self.max_output_chars, self.diff_chars)
+
+    def comparator(self, expected: ExpectedOutput) -> OutputComparator:
+        return expected.comparator(self.max_output_chars, self.diff_chars)
+
+    def clip(self, text: Optional[str]) -> Optional[str]:
+        return clip(text, self.response_output_chars)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.expected_outputs.stats()
+
+
+@lru_cache()
+def get_output_judge() -> OutputJudge:
+    settings = get_settings()
+    return OutputJudge(
+        max_output_chars=settings.JUDGE_MAX_OUTPUT_CHARS,
+        diff_chars=settings.JUDGE_DIFF_CHARS,
+        response_output_chars=settings.JUDGE_RESPONSE_OUTPUT_CHARS,
+        cache_entries=settings.JUDGE_EXPECTED_CACHE_ENTRIES,
+        case_concurrency=settings.JUDGE_CASE_CONCURRENCY,
+        fail_fast=settings.JUDGE_FAIL_FAST
+    )
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from config import get_settings
+from exceptions import AppException, PreflightError, ServiceUnavailableError
+from utils.latency import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+
+
+class JudgeJob:
+    def __init__(self, kind: str, work: Callable[[], Awaitable[Dict[str, Any]]], owner_id: Optional[int] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner_id = owner_id
+        self.status = "queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[Dict[str, Any]] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.enqueued_monotonic = time.monotonic()
+        self.finished_monotonic: Optional[float] = None
+        self.work = work
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def subscribe(self) -> asyncio.Queue:
+        events = asyncio.Queue()
+        self._subscribers.add(events)
+        return events
+
+    def unsubscribe(self, events: asyncio.Queue) -> None:
+        self._subscribers.discard(events)
+
+    def _set_status(self, status: str) -> None:
+        self.status = status
+        snapshot = self.to_dict()
+        for events in self._subscribers:
+            events.put_nowait(snapshot)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JudgeQueue:
+    """Bounded in-process queue that runs judge jobs on a fixed number of workers.
+
+    Jobs are accepted right away and their verdicts are kept for `job_ttl_seconds`
+    so clients can poll for them or follow them over Server-Sent Events. Nothing
+    is shared between processes: only the worker that accepted a job knows it.
+    """
+
+    def __init__(self, concurrency: int, max_size: int, job_ttl_seconds: float):
+        self.concurrency = concurrency
+        self.max_size = max_size
+        self.job_ttl_seconds = job_ttl_seconds
+        self.jobs: Dict[str, JudgeJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_latency = LatencyRecorder()
+
+    @property
+    def started(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        # workers belong to one event loop, a new loop (e.g. a fresh test client) needs new ones
+        if self.started and self._loop is asyncio.get_running_loop():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        self._loop = None
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - self.job_ttl_seconds
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished and job.finished_monotonic < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    async def submit(self, kind: str, work: Callable[[], Awaitable[Dict[str, Any]]], owner_id: Optional[int] = None) -> JudgeJob:
+        await self.start()
+        self._prune()
+
+        job = JudgeJob(kind, work, owner_id)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise ServiceUnavailableError("Judge queue is full, please try again shortly")
+
+        self.jobs[job.id] = job
+        self.submitted += 1
+        return job
+
+    def get_job(self, job_id: str) -> Optional[JudgeJob]:
+        return self.jobs.get(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            self.running += 1
+            self.wait_latency.record((time.monotonic() - job.enqueued_monotonic) * 1000)
+            job.started_at = datetime.now(timezone.utc)
+            job._set_status("running")
+            try:
+                job.result = await job.work()
+                job.finished_at = datetime.now(timezone.utc)
+                job.finished_monotonic = time.monotonic()
+                self.completed += 1
+                job._set_status("completed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if isinstance(e, AppException):
+                    job.error = {"status_code": e.status_code, "error": e.message, "detail": e.detail}
+                    if isinstance(e, PreflightError):
+                        job.error["preflight"] = e.to_dict()
+                else:
+                    logger.error(f"Judge job {job.id} failed: {e}")
+                    job.error = {"status_code": 500, "error": "Internal server error", "detail": str(e)}
+                job.finished_at = datetime.now(timezone.utc)
+                job.finished_monotonic = time.monotonic()
+                self.failed += 1
+                job._set_status("failed")
+            finally:
+                # the closure holds the submitted code, which is not needed once the verdict exists
+                job.work = None
+                self.running -= 1
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "started": self.started,
+            "concurrency": self.concurrency,
+            "max_size": self.max_size,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "running": self.running,
+            "tracked_jobs": len(self.jobs),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "queue_wait": self.wait_latency.summary(),
+        }
+
+
+@lru_cache()
+def get_judge_queue() -> JudgeQueue:
+    settings = get_settings()
+    return JudgeQueue(
+        concurrency=settings.JUDGE_QUEUE_CONCURRENCY,
+        max_size=settings.JUDGE_QUEUE_MAX_SIZE,
+        job_ttl_seconds=settings.JUDGE_JOB_TTL_SECONDS
+    )
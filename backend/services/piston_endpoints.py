@@ -0,0 +1,161 @@
+import random
+import time
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
+
+from config import get_settings
+from exceptions import ServiceUnavailableError
+from utils.latency import LatencyRecorder
+
+
+class PistonEndpoint:
+    """One executor URL with its own in-flight count, latency window and circuit breaker.
+
+    The circuit opens after `failure_threshold` consecutive failures. Once
+    `cooldown_seconds` have passed a single probe request is let through;
+    its outcome closes the circuit again or re-opens it.
+    """
+
+    def __init__(self, url: str, failure_threshold: int, cooldown_seconds: float):
+        self.url = url
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.probing = False
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.failures = 0
+        self.circuit_opens = 0
+        self.latency = LatencyRecorder()
+
+    def available(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown_seconds:
+            self.state = "half_open"
+        return self.state == "half_open" and not self.probing
+
+    def acquire(self) -> None:
+        """Count a request as in flight; every acquire is paired with a release, however the request ends."""
+
+        if self.state == "half_open":
+            self.probing = True
+        self.outstanding += 1
+        self.requests += 1
+
+    def release(self) -> None:
+        self.outstanding -= 1
+        # a probe that ended without a verdict (e.g. it lost a hedge) lets the next one through
+        self.probing = False
+
+    def record_success(self, milliseconds: float) -> None:
+        self.probing = False
+        self.consecutive_failures = 0
+        self.state = "closed"
+        self.latency.record(milliseconds)
+
+    def record_failure(self) -> None:
+        self.probing = False
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.circuit_opens += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.latency.percentile(95)
+        return {
+            "url": self.url,
+            "state": self.state,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "circuit_opens": self.circuit_opens,
+            "latency": {**self.latency.summary(), "p95_ms": round(p95, 2) if p95 is not None else None},
+        }
+
+
+class PistonEndpointPool:
+    """Process-wide set of executor endpoints shared by every PistonExecutor.
+
+    Requests go to the available endpoint with the fewest outstanding
+    requests. The pool also holds the retry and hedging policy so its
+    counters survive the per-request CodeExecutionService instances.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        failure_threshold: int = 5,
+        cooldown_seconds: float = 30.0,
+        request_timeout: float = 30.0,
+        retry_attempts: int = 2,
+        retry_backoff_seconds: float = 0.1,
+        hedge_enabled: bool = True,
+        hedge_min_samples: int = 20
+    ):
+        if not urls:
+            raise ValueError("At least one executor endpoint is required")
+        self.endpoints = [PistonEndpoint(url, failure_threshold, cooldown_seconds) for url in urls]
+        self.request_timeout = request_timeout
+        self.retry_attempts = retry_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_samples = hedge_min_samples
+        self.latency = LatencyRecorder()
+        self.retries = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def choose(self, exclude: Optional[PistonEndpoint] = None) -> PistonEndpoint:
+        candidates = [e for e in self.endpoints if e is not exclude and e.available()]
+        if not candidates and exclude is not None and exclude.available():
+            # a single healthy endpoint is still better than failing the request
+            candidates = [exclude]
+        if not candidates:
+            raise ServiceUnavailableError("No code executor is available, please try again shortly")
+        fewest = min(e.outstanding for e in candidates)
+        return random.choice([e for e in candidates if e.outstanding == fewest])
+
+    def has_alternative(self, endpoint: PistonEndpoint) -> bool:
+        return any(e is not endpoint and e.available() for e in self.endpoints)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None when hedging does not apply."""
+
+        if not self.hedge_enabled or len(self.endpoints) < 2 or len(self.latency.samples) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(95) / 1000
+
+    def backoff(self, attempt: int) -> float:
+        # full jitter keeps retries from many requests from lining up on a recovering endpoint
+        return random.uniform(0, self.retry_backoff_seconds * (2 ** attempt))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "endpoints": [endpoint.stats() for endpoint in self.endpoints],
+            "retries": self.retries,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "latency": self.latency.summary(),
+        }
+
+
+@lru_cache()
+def get_piston_endpoint_pool() -> PistonEndpointPool:
+    settings = get_settings()
+    return PistonEndpointPool(
+        urls=settings.PISTON_URLS or [settings.PISTON_URL],
+        failure_threshold=settings.PISTON_CIRCUIT_FAILURE_THRESHOLD,
+        cooldown_seconds=settings.PISTON_CIRCUIT_COOLDOWN_SECONDS,
+        request_timeout=settings.PISTON_REQUEST_TIMEOUT,
+        retry_attempts=settings.PISTON_RETRY_ATTEMPTS,
+        retry_backoff_seconds=settings.PISTON_RETRY_BACKOFF_SECONDS,
+        hedge_enabled=settings.PISTON_HEDGE_ENABLED,
+        hedge_min_samples=settings.PISTON_HEDGE_MIN_SAMPLES
+    )
@@ -0,0 +1,96 @@
+import hashlib
+import warnings
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict
+
+from config import get_settings
+from exceptions import PreflightError
+from services.execution_metrics import get_execution_metrics
+
+
+class Preflight:
+    """Cheap local checks run before a submission is sent to the executor.
+
+    Every language gets a size and encoding check. Python is also compiled
+    locally, so syntax errors come back at once instead of costing a
+    remote run. A failed check raises PreflightError, and each failure is
+    counted as an execution saved. Sources that passed are remembered, so
+    the same submission is not compiled again for each of its test cases.
+    """
+
+    def __init__(self, max_code_bytes: int, enabled: bool = True, remember: int = 256):
+        self.max_code_bytes = max_code_bytes
+        self.enabled = enabled
+        self.remember = remember
+        self._passed: "OrderedDict[str, None]" = OrderedDict()
+        self.checked = 0
+        self.rejected: Dict[str, int] = {}
+
+    def check(self, code: str, language: str) -> None:
+        if not self.enabled:
+            return
+        key = hashlib.sha256(f"{language}\0{code}".encode("utf-8", errors="surrogatepass")).hexdigest()
+        if key in self._passed:
+            self._passed.move_to_end(key)
+            return
+        self.checked += 1
+        try:
+            self._check_encoding(code)
+            self._check_size(code)
+            if language == "python":
+                self._check_python(code)
+        except PreflightError as e:
+            self.rejected[e.check] = self.rejected.get(e.check, 0) + 1
+            get_execution_metrics().preflight_rejections.inc(language=language, check=e.check)
+            raise
+        self._passed[key] = None
+        if len(self._passed) > self.remember:
+            self._passed.popitem(last=False)
+
+    def _check_encoding(self, code: str) -> None:
+        try:
+            code.encode("utf-8")
+        except UnicodeEncodeError as e:
+            raise PreflightError("encoding", f"Code is not valid UTF-8 (position {e.start})")
+        if "\x00" in code:
+            raise PreflightError("encoding", "Code contains a null byte")
+
+    def _check_size(self, code: str) -> None:
+        size = len(code.encode("utf-8"))
+        if size > self.max_code_bytes:
+            raise PreflightError("size", f"Code is {size} bytes, the limit is {self.max_code_bytes} bytes")
+
+    def _check_python(self, code: str) -> None:
+        try:
+            with warnings.catch_warnings():
+                # SyntaxWarnings (e.g. "is" with a literal) are the program's business, not ours
+                warnings.simplefilter("ignore")
+                compile(code, "main.py", "exec", dont_inherit=True)
+        except SyntaxError as e:
+            # covers IndentationError and TabError
+            raise PreflightError(
+                "syntax",
+                f"{type(e).__name__}: {e.msg}",
+                line=e.lineno,
+                column=e.offset,
+                text=e.text.rstrip("\n") if e.text else None
+            )
+        except (ValueError, RecursionError, MemoryError):
+            # too deeply nested for the local parser, the executor gives the real answer
+            return
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "max_code_bytes": self.max_code_bytes,
+            "checked": self.checked,
+            "rejected": dict(self.rejected),
+            "executions_saved": sum(self.rejected.values()),
+        }
+
+
+@lru_cache()
+def get_preflight() -> Preflight:
+    settings = get_settings()
+    return Preflight(settings.PREFLIGHT_MAX_CODE_BYTES, settings.PREFLIGHT_ENABLED)
@@ -34,6 +34,11 @@ class ProblemService:
             expected_output=problem_data.expected_output,
             language=problem_data.language,
             is_public=problem_data.is_public,
+            judge_mode=problem_data.judge_mode,
+            float_tolerance=problem_data.float_tolerance,
+            test_cases=[case.dict() for case in problem_data.test_cases] if problem_data.test_cases else None,
+            time_limit_ms=problem_data.time_limit_ms,
+            memory_limit_mb=problem_data.memory_limit_mb,
             completions=0,
             creator_id=creator.id
         )
@@ -52,6 +57,14 @@ class ProblemService:
         
         return problem
     
+    def get_problem_by_id(self, problem_id: int) -> Problem:
+        problem = self.db.query(Problem).filter(Problem.id == problem_id).first()
+
+        if not problem:
+            raise NotFoundError("Problem")
+        
+        return problem
+    
     def get_user_problems(self, user: User) -> List[Problem]:
         return self.db.query(Problem).filter(Problem.creator_id == user.id).all()
     
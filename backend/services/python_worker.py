@@ -0,0 +1,216 @@
+"""Warm Python worker used by PythonWorkerPool.
+
+Runs as its own interpreter and reads one JSON job per line from stdin. Every
+job is executed in a forked child with its own session, working directory,
+rlimits and fresh globals, so nothing a submission does leaks into the next
+one. When the job names a (uid, gid) under "run_as", the child switches to
+that user before running anything. The result is written back as one JSON line on stdout.
+
+Right after forking, the worker writes the child's pid as a line of its own
+({"pid": ...}), so the pool can kill the child's process group if the run is
+cancelled. The child also asks the kernel to kill it when the worker dies.
+
+Only the standard library may be imported here: the worker is started with
+`python -I` and does not see the backend package.
+"""
+
+import builtins
+import ctypes
+import io
+import json
+import os
+import resource
+import select
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import traceback
+
+
+PR_SET_PDEATHSIG = 1
+
+
+def die_with_parent(parent_pid):
+    # the child leaves the worker's session, so nothing else would stop it if the worker is killed
+    try:
+        ctypes.CDLL(None, use_errno=True).prctl(PR_SET_PDEATHSIG, signal.SIGKILL)
+    except (OSError, AttributeError):
+        return
+    if os.getppid() != parent_pid:
+        # the worker died before the signal was armed
+        os._exit(1)
+
+
+def drop_privileges(run_as):
+    if run_as is None:
+        return
+    uid, gid = run_as
+    os.setgroups([])
+    os.setgid(gid)
+    os.setuid(uid)
+
+
+def run_child(job, workdir, stdin_path, stdout_fd, stderr_fd, parent_pid):
+    os.setsid()
+    # before arming the death signal, changing credentials clears it
+    drop_privileges(job.get("run_as"))
+    die_with_parent(parent_pid)
+    stdin_fd = os.open(stdin_path, os.O_RDONLY)
+    os.dup2(stdin_fd, 0)
+    os.dup2(stdout_fd, 1)
+    os.dup2(stderr_fd, 2)
+    os.chdir(workdir)
+
+    resource.setrlimit(resource.RLIMIT_CPU, (job["cpu_seconds"], job["cpu_seconds"] + 1))
+    resource.setrlimit(resource.RLIMIT_AS, (job["memory_bytes"], job["memory_bytes"]))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (job["output_bytes"], job["output_bytes"]))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+    sys.stdin = io.TextIOWrapper(io.FileIO(0, "r", closefd=False), encoding="utf-8")
+    sys.stdout = io.TextIOWrapper(io.FileIO(1, "w", closefd=False), encoding="utf-8")
+    sys.stderr = io.TextIOWrapper(io.FileIO(2, "w", closefd=False), encoding="utf-8", line_buffering=True)
+    sys.argv = ["Main.py"]
+
+    exit_code = 0
+    try:
+        program = compile(job["code"], "Main.py", "exec")
+        exec(program, {"__name__": "__main__", "__builtins__": builtins})
+    except SystemExit as e:
+        if e.code is None:
+            exit_code = 0
+        elif isinstance(e.code, int):
+            exit_code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException as e:
+        # drop this frame so the traceback starts at the submission like a normal run
+        tb = e.__traceback__.tb_next if e.__traceback__ else None
+        traceback.print_exception(type(e), e, tb)
+        exit_code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except BaseException:
+            pass
+    os._exit(exit_code & 0xFF)
+
+
+def run_job(job):
+    workdir = tempfile.mkdtemp(prefix="adventurecode-py-")
+    if job.get("run_as") is not None:
+        os.chown(workdir, *job["run_as"])
+    stdin_path = os.devnull
+    if job.get("stdin"):
+        stdin_path = os.path.join(workdir, ".stdin")
+        with open(stdin_path, "w", encoding="utf-8") as stdin_file:
+            stdin_file.write(job["stdin"])
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
+    started = time.monotonic()
+    deadline = started + job["wall_seconds"]
+
+    sys.stdout.flush()
+    parent_pid = os.getpid()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(stdout_r)
+            os.close(stderr_r)
+            run_child(job, workdir, stdin_path, stdout_w, stderr_w, parent_pid)
+        finally:
+            os._exit(1)
+
+    os.close(stdout_w)
+    os.close(stderr_w)
+    sys.stdout.write(json.dumps({"pid": pid}) + "\n")
+    sys.stdout.flush()
+
+    streams = {stdout_r: bytearray(), stderr_r: bytearray()}
+    output = bytearray()
+    open_fds = [stdout_r, stderr_r]
+    truncated = False
+    timed_out = False
+
+    while open_fds:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            timed_out = True
+            break
+        readable, _, _ = select.select(open_fds, [], [], remaining)
+        for fd in readable:
+            chunk = os.read(fd, 4096)
+            if not chunk:
+                open_fds.remove(fd)
+                continue
+            room = job["output_bytes"] - len(output)
+            if len(chunk) > room:
+                truncated = True
+                chunk = chunk[:max(room, 0)]
+            streams[fd].extend(chunk)
+            output.extend(chunk)
+        if truncated:
+            break
+
+    # the child can close its pipes and keep running, so the deadline still applies
+    status = usage = None
+    while not open_fds and not timed_out:
+        waited, status, usage = os.wait4(pid, os.WNOHANG)
+        if waited:
+            break
+        status = None
+        if time.monotonic() >= deadline:
+            timed_out = True
+        else:
+            time.sleep(0.005)
+
+    if status is None:
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        _, status, usage = os.wait4(pid, 0)
+
+    os.close(stdout_r)
+    os.close(stderr_r)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    code = os.WEXITSTATUS(status) if os.WIFEXITED(status) else None
+    killed_by = signal.Signals(os.WTERMSIG(status)).name if os.WIFSIGNALED(status) else None
+    if timed_out:
+        killed_by = "SIGKILL"
+
+    return {
+        "stdout": streams[stdout_r].decode("utf-8", errors="replace"),
+        "stderr": streams[stderr_r].decode("utf-8", errors="replace"),
+        "output": output.decode("utf-8", errors="replace"),
+        "code": code,
+        "signal": killed_by,
+        "status": "TO" if timed_out else None,
+        "wall_time": round((time.monotonic() - started) * 1000),
+        "cpu_time": round((usage.ru_utime + usage.ru_stime) * 1000),
+        # ru_maxrss is in kilobytes on Linux
+        "memory": usage.ru_maxrss * 1024,
+        "truncated": truncated,
+    }
+
+
+def main():
+    # tell the pool the interpreter is warm and ready for work
+    sys.stdout.write("ready\n")
+    sys.stdout.flush()
+
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            return
+        result = run_job(json.loads(line))
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
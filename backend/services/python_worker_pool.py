@@ -0,0 +1,291 @@
+import asyncio
+import json
+import logging
+import os
+import signal
+import tempfile
+import time
+from typing import Dict, Any, Optional, Set, Tuple
+
+from utils.latency import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "python_worker.py")
+RESPAWN_BACKOFF_SECONDS = 0.5
+RESPAWN_BACKOFF_MAX_SECONDS = 30.0
+
+
+def minimal_environment(home: str) -> Dict[str, str]:
+    """The only variables submitted code gets to see, never the server's own (SECRET_KEY, DATABASE_URL, ...)."""
+    return {
+        "PATH": os.environ.get("PATH", "/usr/local/bin:/usr/bin:/bin"),
+        "HOME": home,
+        "TMPDIR": home,
+        "LANG": "C.UTF-8",
+    }
+
+
+class PythonWorker:
+    """One warm interpreter running services/python_worker.py."""
+
+    def __init__(self, python_bin: str, line_limit: int):
+        self.python_bin = python_bin
+        self.line_limit = line_limit
+        self.process: Optional[asyncio.subprocess.Process] = None
+        # the forked child running the current job, a session leader so its pid is its process group
+        self.child_pid: Optional[int] = None
+        self.uses = 0
+        self.healthy = False
+
+    async def spawn(self) -> None:
+        self.process = await asyncio.create_subprocess_exec(
+            self.python_bin, "-I", "-u", WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            # the forked submissions inherit the worker's environment
+            env=minimal_environment(tempfile.gettempdir()),
+            start_new_session=True,
+            limit=self.line_limit,
+        )
+        ready = await asyncio.wait_for(self.process.stdout.readline(), timeout=10)
+        if ready.strip() != b"ready":
+            raise RuntimeError("Python worker failed to start")
+        self.healthy = True
+
+    async def run(self, job: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        self.uses += 1
+        deadline = time.monotonic() + timeout
+        self.process.stdin.write(json.dumps(job).encode("utf-8") + b"\n")
+        await self.process.stdin.drain()
+        self.child_pid = (await self._read_line(deadline))["pid"]
+        result = await self._read_line(deadline)
+        # the worker has reaped the child by now
+        self.child_pid = None
+        return result
+
+    async def _read_line(self, deadline: float) -> Dict[str, Any]:
+        line = await asyncio.wait_for(self.process.stdout.readline(), timeout=max(deadline - time.monotonic(), 0))
+        if not line:
+            raise RuntimeError("Python worker exited unexpectedly")
+        return json.loads(line)
+
+    def kill_child(self) -> None:
+        """Stop the job's process group straight away, without waiting for the worker."""
+
+        pid, self.child_pid = self.child_pid, None
+        if pid is None:
+            return
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            # not a session leader yet, the child itself is all there is
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        except PermissionError:
+            pass
+
+    async def kill(self) -> None:
+        self.healthy = False
+        self.kill_child()
+        if self.process is None or self.process.returncode is not None:
+            return
+        try:
+            self.process.kill()
+        except ProcessLookupError:
+            pass
+        await self.process.wait()
+
+
+class PythonWorkerPool:
+    """Pool of pre-warmed Python interpreters.
+
+    Each submission runs in a child forked from an idle worker, which skips
+    interpreter start-up. Workers are replaced in the background after
+    `max_uses` jobs, or straight away if one misbehaves or its run is
+    cancelled; a failed respawn is retried with backoff. When no worker
+    is alive, or none frees up within a run's wall time, run raises
+    RuntimeError and the caller falls back to the per-call path with
+    whatever is left of the budget.
+    """
+
+    def __init__(
+        self,
+        python_bin: str,
+        size: int,
+        max_uses: int,
+        cpu_seconds: int,
+        memory_bytes: int,
+        wall_seconds: float,
+        output_bytes: int,
+        run_as: Optional[Tuple[int, int]] = None
+    ):
+        self.python_bin = python_bin
+        self.size = size
+        self.max_uses = max_uses
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self.wall_seconds = wall_seconds
+        self.output_bytes = output_bytes
+        # (uid, gid) the forked submissions switch to, the worker itself keeps the server's user
+        self.run_as = run_as
+        # a JSON encoded result can escape every output byte into several characters
+        self.line_limit = output_bytes * 12 + 64 * 1024
+        self._idle: Optional[asyncio.Queue] = None
+        # every live worker, idle or busy, so close can stop the busy ones too
+        self._workers: Set[PythonWorker] = set()
+        self._replacements: Set[asyncio.Task] = set()
+        self.started = False
+        self.runs = 0
+        self.recycled = 0
+        self.failures = 0
+        self.cancelled = 0
+        self.respawn_failures = 0
+        self.unavailable = 0
+        self.latency = LatencyRecorder()
+
+    async def start(self) -> None:
+        if self.started:
+            return
+
+        self._idle = asyncio.Queue()
+        workers = [PythonWorker(self.python_bin, self.line_limit) for _ in range(self.size)]
+        results = await asyncio.gather(*(worker.spawn() for worker in workers), return_exceptions=True)
+        missing = 0
+        for worker, result in zip(workers, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Could not warm up Python worker: {result}")
+                await worker.kill()
+                missing += 1
+            else:
+                self._workers.add(worker)
+                self._idle.put_nowait(worker)
+
+        self.started = self._idle.qsize() > 0
+        logger.info(f"Python worker pool warmed up with {self._idle.qsize()} workers")
+        if self.started:
+            for _ in range(missing):
+                self._background(self._respawn())
+
+    async def close(self) -> None:
+        self.started = False
+        for task in list(self._replacements):
+            task.cancel()
+        # busy workers too, their runs end with "worker exited unexpectedly"
+        for worker in list(self._workers):
+            await worker.kill()
+        self._workers.clear()
+        if self._idle is not None:
+            while not self._idle.empty():
+                self._idle.get_nowait()
+
+    def _background(self, coroutine) -> None:
+        task = asyncio.create_task(coroutine)
+        self._replacements.add(task)
+        task.add_done_callback(self._replacements.discard)
+
+    async def _replace(self, worker: PythonWorker) -> None:
+        await worker.kill()
+        self._workers.discard(worker)
+        self.recycled += 1
+        await self._respawn()
+
+    async def _respawn(self) -> None:
+        attempt = 0
+        while self.started:
+            replacement = PythonWorker(self.python_bin, self.line_limit)
+            try:
+                await replacement.spawn()
+            except Exception as e:
+                await replacement.kill()
+                self.respawn_failures += 1
+                delay = min(RESPAWN_BACKOFF_SECONDS * 2 ** attempt, RESPAWN_BACKOFF_MAX_SECONDS)
+                attempt += 1
+                logger.error(f"Could not replace Python worker, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+                continue
+            if not self.started:
+                # closed while this one was starting
+                await replacement.kill()
+                return
+            self._workers.add(replacement)
+            self._idle.put_nowait(replacement)
+            return
+
+    def _release(self, worker: PythonWorker) -> None:
+        if not self.started:
+            return
+        if worker.healthy and worker.uses < self.max_uses:
+            self._idle.put_nowait(worker)
+            return
+        self._background(self._replace(worker))
+
+    async def run(self, code: str, stdin: str = "", wall_seconds: Optional[float] = None) -> Dict[str, Any]:
+        wall_seconds = wall_seconds or self.wall_seconds
+        job = {
+            "code": code,
+            "stdin": stdin,
+            "cpu_seconds": self.cpu_seconds,
+            "memory_bytes": self.memory_bytes,
+            "wall_seconds": wall_seconds,
+            "output_bytes": self.output_bytes,
+            "run_as": list(self.run_as) if self.run_as is not None else None,
+        }
+
+        if not self._workers:
+            # only replacements in flight, which may keep failing: waiting would spend the run's budget
+            self.unavailable += 1
+            raise RuntimeError("No Python workers are running")
+        try:
+            # a run never waits longer for a worker than it could take to run
+            worker = await asyncio.wait_for(self._idle.get(), timeout=wall_seconds)
+        except asyncio.TimeoutError:
+            self.unavailable += 1
+            raise RuntimeError(f"No Python worker became free within {wall_seconds}s")
+
+        started = time.monotonic()
+        try:
+            result = await worker.run(job, timeout=wall_seconds + 5)
+        except asyncio.TimeoutError:
+            worker.healthy = False
+            worker.kill_child()
+            self.failures += 1
+            result = {
+                "stdout": "", "stderr": "", "output": "", "code": None, "signal": "SIGKILL",
+                "status": "TO", "wall_time": round((time.monotonic() - started) * 1000), "truncated": False,
+            }
+        except (RuntimeError, ValueError, ConnectionError) as e:
+            worker.healthy = False
+            self.failures += 1
+            raise RuntimeError(f"Python worker failed: {e}")
+        except asyncio.CancelledError:
+            # stop the submission now; the worker is still busy with the job, so it is replaced
+            worker.kill_child()
+            worker.healthy = False
+            self.cancelled += 1
+            raise
+        finally:
+            self._release(worker)
+
+        self.runs += 1
+        self.latency.record((time.monotonic() - started) * 1000)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "started": self.started,
+            "size": self.size,
+            "workers": len(self._workers),
+            "idle_workers": self._idle.qsize() if self._idle is not None else 0,
+            "max_uses": self.max_uses,
+            "runs": self.runs,
+            "recycled": self.recycled,
+            "failures": self.failures,
+            "cancelled": self.cancelled,
+            "respawn_failures": self.respawn_failures,
+            "unavailable": self.unavailable,
+            "latency": self.latency.summary(),
+        }
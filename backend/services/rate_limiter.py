@@ -0,0 +1,143 @@
+import math
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Any, Tuple
+
+from fastapi import Request
+
+from config import get_settings
+from exceptions import RateLimitError
+
+# languages that pay a compile step on the executor cost more to run
+COMPILED_LANGUAGES = {"c", "cpp", "go", "java", "rust", "typescript"}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def try_consume(self, cost: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True, 0.0
+
+        return False, (cost - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Token buckets per (tier, key) in front of the code execution path.
+
+    Authenticated callers are keyed by user ID and guests by client address.
+    Each tier has its own refill rate and burst size.
+    """
+
+    def __init__(self, tiers: Dict[str, Tuple[float, float]], max_buckets: int = 10000, enabled: bool = True):
+        self.tiers = tiers
+        self.max_buckets = max_buckets
+        self.enabled = enabled
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self.allowed = {tier: 0 for tier in tiers}
+        self.rejected = {tier: 0 for tier in tiers}
+        self.rejected_expensive = {tier: 0 for tier in tiers}
+
+    def _bucket(self, tier: str, key: str) -> TokenBucket:
+        bucket = self._buckets.get((tier, key))
+        if bucket is None:
+            rate, capacity = self.tiers[tier]
+            bucket = TokenBucket(rate, capacity)
+            self._buckets[(tier, key)] = bucket
+            # least recently used first; a dropped bucket comes back full, drained or not, so
+            # max_buckets has to stay well above the number of keys active within one refill
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end((tier, key))
+        return bucket
+
+    def check(self, tier: str, key: str, cost: float = 1.0) -> None:
+        if not self.enabled:
+            return
+
+        bucket = self._bucket(tier, key)
+        if cost > bucket.capacity:
+            # could never be paid for, clipping it would let a large batch through for a burst's worth
+            self.rejected[tier] += 1
+            self.rejected_expensive[tier] += 1
+            raise RateLimitError(
+                "This request needs more code executions than the rate limit allows at once, send fewer",
+                retry_after=max(1, math.ceil(bucket.capacity / bucket.rate))
+            )
+
+        allowed, retry_after = bucket.try_consume(cost)
+        if allowed:
+            self.allowed[tier] += 1
+            return
+
+        self.rejected[tier] += 1
+        if cost > 1:
+            self.rejected_expensive[tier] += 1
+        raise RateLimitError(
+            "Too many code executions, please slow down",
+            retry_after=max(1, math.ceil(retry_after))
+        )
+
+    def burst(self, tier: str) -> float:
+        return self.tiers[tier][1]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "tiers": {
+                tier: {
+                    "rate_per_second": rate,
+                    "burst": capacity,
+                    "allowed": self.allowed[tier],
+                    "rejected": self.rejected[tier],
+                    "rejected_expensive": self.rejected_expensive[tier],
+                }
+                for tier, (rate, capacity) in self.tiers.items()
+            },
+            "active_buckets": len(self._buckets),
+        }
+
+
+def execution_cost(language: str, code: str) -> float:
+    """Tokens one execution costs: compiled languages and large sources drain a bucket faster."""
+
+    cost = 1.0
+    if language.lower() in COMPILED_LANGUAGES:
+        cost += 1.0
+    cost += len(code) // 8192
+    return cost
+
+
+def get_client_address(request: Request) -> str:
+    """The address a guest is known by, for its rate-limit bucket and idempotency keys."""
+
+    settings = get_settings()
+    forwarded_for = request.headers.get("x-forwarded-for")
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR and forwarded_for:
+        # the right-most entry is the one added by our own proxy, the rest is client supplied
+        return forwarded_for.split(",")[-1].strip()
+    return request.client.host if request.client else "unknown"
+
+
+@lru_cache()
+def get_rate_limiter() -> RateLimiter:
+    settings = get_settings()
+    return RateLimiter(
+        tiers={
+            "user": (settings.RATE_LIMIT_USER_RATE, settings.RATE_LIMIT_USER_BURST),
+            "guest": (settings.RATE_LIMIT_GUEST_RATE, settings.RATE_LIMIT_GUEST_BURST),
+        },
+        max_buckets=settings.RATE_LIMIT_MAX_BUCKETS,
+        enabled=settings.RATE_LIMIT_ENABLED
+    )
@@ -0,0 +1,87 @@
+import asyncio
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from exceptions import RunCancelledError
+
+
+class RunSessions:
+    """Keeps at most one dry run in flight per session (a user editing one node or problem).
+
+    Starting a run cancels the session's previous run if it is still
+    going, and a run whose client has disconnected is cancelled too, so
+    executor time is only spent on output somebody will read. Cancelling
+    the run cancels the execution behind it and frees its executor slot.
+    """
+
+    def __init__(self, disconnect_poll_seconds: float = 0.25):
+        self.disconnect_poll_seconds = disconnect_poll_seconds
+        self._runs: Dict[str, asyncio.Task] = {}
+        # why a run task was cancelled, until its caller has seen it
+        self._reasons: Dict[asyncio.Task, str] = {}
+        self.started = 0
+        self.completed = 0
+        self.superseded = 0
+        self.disconnected = 0
+
+    def _supersede(self, session: str) -> None:
+        previous = self._runs.get(session)
+        if previous is None or previous.done() or previous.get_loop() is not asyncio.get_running_loop():
+            return
+        self._reasons[previous] = "superseded"
+        self.superseded += 1
+        previous.cancel()
+
+    async def _watch(self, task: asyncio.Task, is_disconnected: Callable[[], Awaitable[bool]]) -> None:
+        while not task.done():
+            if await is_disconnected():
+                self._reasons[task] = "disconnected"
+                self.disconnected += 1
+                task.cancel()
+                return
+            await asyncio.sleep(self.disconnect_poll_seconds)
+
+    async def run(
+        self,
+        session: str,
+        work: Callable[[], Awaitable[Any]],
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+    ) -> Any:
+        self._supersede(session)
+        task = asyncio.create_task(work())
+        self._runs[session] = task
+        self.started += 1
+        watcher = asyncio.create_task(self._watch(task, is_disconnected)) if is_disconnected else None
+        try:
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            # the handler itself was cancelled, usually because the server saw the client go
+            task.cancel()
+            self.disconnected += 1
+            raise
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            if self._runs.get(session) is task:
+                del self._runs[session]
+
+        if task.cancelled():
+            raise RunCancelledError(self._reasons.pop(task, "cancelled"))
+        self._reasons.pop(task, None)
+        result = task.result()
+        self.completed += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": sum(1 for task in self._runs.values() if not task.done()),
+            "started": self.started,
+            "completed": self.completed,
+            "superseded": self.superseded,
+            "disconnected": self.disconnected,
+        }
+
+
+@lru_cache()
+def get_run_sessions() -> RunSessions:
+    return RunSessions()
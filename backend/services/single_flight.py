@@ -0,0 +1,85 @@
+import asyncio
+import copy
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config import get_settings
+
+
+class Flight:
+    __slots__ = ("task", "waiters", "expires_at")
+
+    def __init__(self, task: asyncio.Task, expires_at: Optional[float]):
+        self.task = task
+        self.waiters = 0
+        # monotonic time the work gets cut off at, None when it runs to the executor's own limits
+        self.expires_at = expires_at
+
+    def covers(self, expires_at: Optional[float]) -> bool:
+        if self.expires_at is None:
+            return True
+        return expires_at is not None and self.expires_at >= expires_at
+
+
+class SingleFlight:
+    """Shares one in-flight call between concurrent callers asking for the same key.
+
+    The first caller for a key starts the work as a task; callers arriving
+    before it finishes wait on that task instead of starting their own. The
+    task is only cancelled once every caller waiting on it has gone away.
+
+    The work runs under its first caller's terms, so a caller only joins
+    when those are no worse than its own: anything that changes how the
+    work is scheduled (e.g. priority) belongs in the key, and a caller
+    whose `expires_at` is later than the flight's starts a fresh flight,
+    which takes over the key, rather than be cut off early.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._calls: Dict[str, Flight] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, work: Callable[[], Awaitable[Any]], expires_at: Optional[float] = None) -> Any:
+        if not self.enabled:
+            return await work()
+
+        flight = self._calls.get(key)
+        if flight is None or flight.task.get_loop() is not asyncio.get_running_loop() or not flight.covers(expires_at):
+            flight = Flight(asyncio.create_task(work()), expires_at)
+            self._calls[key] = flight
+            flight.task.add_done_callback(lambda _, key=key, flight=flight: self._forget(key, flight))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+        # every caller gets its own copy, as with cache hits
+        return copy.deepcopy(result)
+
+    def _forget(self, key: str, flight: Flight) -> None:
+        if self._calls.get(key) is flight:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._calls),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+        }
+
+
+@lru_cache()
+def get_single_flight() -> SingleFlight:
+    return SingleFlight(enabled=get_settings().EXECUTION_SINGLE_FLIGHT_ENABLED)
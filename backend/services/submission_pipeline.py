@@ -0,0 +1,213 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+from exceptions import (
+    AppException,
+    AuthorisationError,
+    DeadlineExceededError,
+    NotFoundError,
+    PreflightError,
+    ServiceUnavailableError,
+    ValidationError
+)
+from models.user import User
+from services.adventure_service import AdventureService
+from services.code_execution_service import CodeExecutionService
+from services.deadlines import check_deadline
+from services.execution_metrics import get_execution_metrics
+from services.execution_scheduler import DEFAULT_PRIORITY
+from services.judge import CaseReport, JudgeCase, get_output_judge
+
+logger = logging.getLogger("uvicorn.error")
+
+
+@dataclass
+class SubmissionContext:
+    """Everything one adventure node submission carries from stage to stage."""
+
+    code: str
+    language: str
+    node_id: str
+    fail_fast: Optional[bool] = None
+    priority: str = DEFAULT_PRIORITY
+    user: Optional[User] = None
+    attempt_id: Optional[int] = None
+    adventure_id: Optional[int] = None
+    # filled in by the stages
+    attempt: Any = None
+    adventure: Any = None
+    node: Optional[Dict[str, Any]] = None
+    cases: List[JudgeCase] = field(default_factory=list)
+    report: Optional[CaseReport] = None
+    response: Dict[str, Any] = field(default_factory=dict)
+    # stage name -> milliseconds, in the order the stages ran
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{stage};dur={ms:.1f}" for stage, ms in self.timings.items())
+
+
+# a stage may return {step name: ms} for parts of its own time that belong to another step
+Stage = Callable[[SubmissionContext], Awaitable[Optional[Dict[str, float]]]]
+
+
+class SubmissionPipeline:
+    """Runs a submission through named stages in order and times each one.
+
+    A stage reads what earlier stages left on the context and adds its
+    own part. A stage that raises stops the pipeline; the stages that
+    ran, including the failed one, are still timed. Time a stage splits
+    out (e.g. judging, which happens as each case's run finishes) is
+    reported under its own name and left out of the stage's.
+    """
+
+    def __init__(self, name: str, stages: List[Tuple[str, Stage]]):
+        self.name = name
+        self.stages = stages
+
+    async def run(self, context: SubmissionContext) -> SubmissionContext:
+        metrics = get_execution_metrics()
+        for stage_name, stage in self.stages:
+            started = time.monotonic()
+            split: Optional[Dict[str, float]] = None
+            try:
+                split = await stage(context)
+            finally:
+                elapsed_ms = (time.monotonic() - started) * 1000
+                split = split or {}
+                timings = {stage_name: max(elapsed_ms - sum(split.values()), 0.0), **split}
+                for name, ms in timings.items():
+                    context.timings[name] = ms
+                    metrics.submission_stage_duration.observe(ms / 1000, pipeline=self.name, stage=name)
+        return context
+
+
+def resolve_attempt_node(adventure_service: AdventureService) -> Stage:
+    async def resolve(context: SubmissionContext) -> None:
+        context.attempt = adventure_service.get_owned_attempt(context.attempt_id, context.user)
+        context.adventure = context.attempt.adventure
+        context.node = adventure_service.find_node(context.adventure, context.node_id)
+        context.cases = get_output_judge().cases_for_node(context.adventure.id, context.node)
+        check_deadline("lookup")
+
+    return resolve
+
+
+def resolve_guest_node(adventure_service: AdventureService) -> Stage:
+    async def resolve(context: SubmissionContext) -> None:
+        context.adventure = adventure_service.get_adventure_by_id(context.adventure_id)
+        context.node = adventure_service.find_node(context.adventure, context.node_id)
+        context.cases = get_output_judge().cases_for_node(context.adventure.id, context.node)
+        check_deadline("lookup")
+
+    return resolve
+
+
+def preflight(code_execution_service: CodeExecutionService) -> Stage:
+    async def check(context: SubmissionContext) -> None:
+        language = context.language.lower()
+        code_execution_service.get_version(language)
+        code_execution_service.preflight.check(context.code, language)
+
+    return check
+
+
+def execute(code_execution_service: CodeExecutionService) -> Stage:
+    async def run(context: SubmissionContext) -> Dict[str, float]:
+        # output is compared as each case finishes so fail-fast can stop the rest, that time is reported as "judge"
+        context.report = await get_output_judge().run_cases(
+            context.cases,
+            lambda stdin: code_execution_service.execute_code(
+                context.code, context.language, stdin, priority=context.priority
+            ),
+            context.fail_fast
+        )
+        return {"judge": context.report.judge_ms}
+
+    return run
+
+
+async def respond(context: SubmissionContext) -> None:
+    output_judge = get_output_judge()
+    report = context.report
+    run_result = report.run
+    context.response = {
+        "message": report.message(),
+        "output": output_judge.clip(run_result.get("output", "").strip()),
+        "stdout": output_judge.clip(run_result.get("stdout")),
+        "stderr": output_judge.clip(run_result.get("stderr")),
+        "is_correct": report.is_correct,
+        "diff": report.verdict.diff,
+        "verdict": report.status,
+        "runtime": report.runtime(),
+        "test_cases": report.cases(),
+    }
+
+
+def persist(adventure_service: AdventureService) -> Stage:
+    async def save(context: SubmissionContext) -> None:
+        report = context.report
+        adventure_service.record_submission(
+            context.attempt,
+            context.node_id,
+            context.code,
+            context.response["output"],
+            report.is_correct,
+            verdict=report.status,
+            runtime=report.runtime()
+        )
+
+    return save
+
+
+def attempt_pipeline(
+    adventure_service: AdventureService,
+    code_execution_service: CodeExecutionService
+) -> SubmissionPipeline:
+    return SubmissionPipeline("attempt", [
+        ("resolve", resolve_attempt_node(adventure_service)),
+        ("preflight", preflight(code_execution_service)),
+        ("execute", execute(code_execution_service)),
+        ("respond", respond),
+        ("persist", persist(adventure_service)),
+    ])
+
+
+def guest_pipeline(
+    adventure_service: AdventureService,
+    code_execution_service: CodeExecutionService
+) -> SubmissionPipeline:
+    # guests are judged the same way, but nothing is saved
+    return SubmissionPipeline("guest", [
+        ("resolve", resolve_guest_node(adventure_service)),
+        ("preflight", preflight(code_execution_service)),
+        ("execute", execute(code_execution_service)),
+        ("respond", respond),
+    ])
+
+
+def submission_error_response(e: Exception, context: SubmissionContext, handler: str) -> JSONResponse:
+    """The error response for a failed pipeline run, with the timings of the stages that ran."""
+
+    if isinstance(e, NotFoundError):
+        status_code, content = 404, {"error": e.message}
+    elif isinstance(e, PreflightError):
+        status_code, content = 400, {"error": e.message, "detail": e.detail, "preflight": e.to_dict()}
+    elif isinstance(e, ValidationError):
+        status_code, content = 400, {"error": "Validation failed", "detail": e.message}
+    elif isinstance(e, DeadlineExceededError):
+        status_code, content = 504, {"error": e.message, "stage": e.stage}
+    elif isinstance(e, ServiceUnavailableError):
+        status_code, content = 503, {"error": e.message}
+    elif isinstance(e, AuthorisationError):
+        status_code, content = 403, {"error": e.message}
+    elif isinstance(e, AppException):
+        status_code, content = e.status_code, {"error": e.message}
+    else:
+        logger.error(f"Error in {handler}: {e}", exc_info=e)
+        status_code, content = 500, {"error": "Internal server error", "detail": str(e)}
+    return JSONResponse(status_code=status_code, content=content, headers={"Server-Timing": context.server_timing()})
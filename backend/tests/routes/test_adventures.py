@@ -20,7 +20,7 @@ from schemas.adventure import (
 from schemas.problem import ProblemBase, ProblemCreate
 from services.adventure_service import AdventureService
 from services.code_execution_service import CodeExecutionService
-from exceptions import NotFoundError, ValidationError, AuthorisationError
+from exceptions import NotFoundError, ValidationError, GraphValidationError, AuthorisationError
 
 @pytest.fixture
 
@@ -166,6 +166,21 @@ class TestCreateAdventure:
         data = response.json()
         assert "Validation failed" in data["error"]
 
+    @patch('routes.adventures.AdventureService')
+    def test_create_adventure_invalid_graph(self, mock_service_class, adventure_client):
+        """Test adventure creation returns every graph problem found"""
+        mock_service = mock_service_class.return_value
+        mock_service.create_adventure.side_effect = GraphValidationError([
+            {"check": "multiple_ends", "message": "Adventure can only have one ending problem: a, b", "ids": ["a", "b"], "count": 2},
+            {"check": "unreachable", "message": "These problems cannot be reached from the start: c", "ids": ["c"], "count": 1},
+        ])
+        response = adventure_client.post("/adventures/", json=mock_adventure_create)
+
+        assert response.status_code == 400
+        data = response.json()
+        assert data["detail"] == "Adventure can only have one ending problem: a, b"
+        assert [problem["check"] for problem in data["graph"]["problems"]] == ["multiple_ends", "unreachable"]
+
     @patch('routes.adventures.AdventureService')
     def test_create_adventure_internal_error(self, mock_service_class, adventure_client):
         """Test adventure creation with internal server error"""
@@ -622,6 +637,11 @@ class TestAdventureAttempts:
         assert "Attempt not found" in data["error"]
 
 
+def find_node(adventure, node_id):
+    """The real node lookup, for tests that mock the rest of AdventureService"""
+    return AdventureService.find_node(None, adventure, node_id)
+
+
 class TestAdventureSubmissions:
     """Test the POST /adventures/submissions endpoint"""
 
@@ -631,8 +651,6 @@ class TestAdventureSubmissions:
         """Test successful adventure problem submission"""
        
         mock_service = mock_service_class.return_value
-        mock_attempts = [Mock(id=1, adventure_id=1, user_id=1)]
-        mock_service.get_user_attempts.return_value = mock_attempts
         
         mock_adventure = Mock()
         mock_adventure.graph_data = {
@@ -643,8 +661,9 @@ class TestAdventureSubmissions:
                 }
             ]
         }
-        mock_service.get_adventure_by_id.return_value = mock_adventure
-        mock_service.submit_adventure_problem.return_value = None
+        mock_service.get_owned_attempt.return_value = Mock(id=1, adventure_id=1, user_id=1, adventure=mock_adventure)
+        mock_service.find_node.side_effect = find_node
+        mock_service.record_submission.return_value = None
         
         mock_code_service = mock_code_service_class.return_value
         mock_code_service.execute_code = AsyncMock(return_value={
@@ -666,6 +685,9 @@ class TestAdventureSubmissions:
         data = response.json()
         assert data["is_correct"] is True
         assert "Correct! Well done." in data["message"]
+        stages = [timing.split(";")[0] for timing in response.headers["Server-Timing"].split(", ")]
+        assert stages == ["resolve", "preflight", "execute", "judge", "respond", "persist"]
+        mock_service.record_submission.assert_called_once()
 
     @patch('routes.adventures.AdventureService')
     @patch('routes.adventures.CodeExecutionService')
@@ -673,8 +695,6 @@ class TestAdventureSubmissions:
         """Test incorrect adventure problem submission"""
         
         mock_service = mock_service_class.return_value
-        mock_attempts = [Mock(id=1, adventure_id=1, user_id=1)]
-        mock_service.get_user_attempts.return_value = mock_attempts
         
         mock_adventure = Mock()
         mock_adventure.graph_data = {
@@ -685,8 +705,9 @@ class TestAdventureSubmissions:
                 }
             ]
         }
-        mock_service.get_adventure_by_id.return_value = mock_adventure
-        mock_service.submit_adventure_problem.return_value = None
+        mock_service.get_owned_attempt.return_value = Mock(id=1, adventure_id=1, user_id=1, adventure=mock_adventure)
+        mock_service.find_node.side_effect = find_node
+        mock_service.record_submission.return_value = None
         
     
         mock_code_service = mock_code_service_class.return_value
@@ -714,7 +735,7 @@ class TestAdventureSubmissions:
     def test_submit_adventure_problem_attempt_not_found(self, mock_service_class, adventure_client):
         """Test submission with non-existent attempt"""
         mock_service = mock_service_class.return_value
-        mock_service.get_user_attempts.return_value = []  
+        mock_service.get_owned_attempt.side_effect = NotFoundError("Adventure attempt")
         
         form_data = {
             "attempt_id": 999,
@@ -733,12 +754,11 @@ class TestAdventureSubmissions:
     def test_submit_adventure_problem_node_not_found(self, mock_service_class, adventure_client):
         """Test submission with non-existent node"""
         mock_service = mock_service_class.return_value
-        mock_attempts = [Mock(id=1, adventure_id=1, user_id=1)]
-        mock_service.get_user_attempts.return_value = mock_attempts
         
         mock_adventure = Mock()
         mock_adventure.graph_data = {"nodes": []}  
-        mock_service.get_adventure_by_id.return_value = mock_adventure
+        mock_service.get_owned_attempt.return_value = Mock(id=1, adventure_id=1, user_id=1, adventure=mock_adventure)
+        mock_service.find_node.side_effect = find_node
         
         form_data = {
             "attempt_id": 1,
@@ -752,6 +772,9 @@ class TestAdventureSubmissions:
         assert response.status_code == 404
         data = response.json()
         assert "Node not found in this adventure" in data["error"]
+        # the failed lookup is still timed, and nothing after it ran
+        assert response.headers["Server-Timing"].startswith("resolve;dur=")
+        assert "execute" not in response.headers["Server-Timing"]
 
 
 class TestCompletedPublicAdventures:
@@ -847,3 +870,62 @@ class TestCompletedPublicAdventures:
         assert len(data) == 0
 
 
+
+
+class TestRuntimeDistribution:
+    """Test the GET /adventures/{adventure_id}/nodes/{node_id}/runtime_distribution endpoint"""
+
+    def make_adventure(self, db_session, creator_id):
+        adventure = AdventureModel(
+            creator_id=creator_id,
+            name="Timed Adventure",
+            description="Adventure with timed nodes",
+            access_code=uuid.uuid4().hex[:6],
+            start_node_id="start",
+            end_node_id="end",
+            graph_data={"nodes": [{"id": "start", "data": {}}, {"id": "end", "data": {}}], "edges": []}
+        )
+        db_session.add(adventure)
+        db_session.flush()
+        attempt = AdventureAttemptModel(adventure_id=adventure.id, user_id=creator_id, start_node_id="start")
+        db_session.add(attempt)
+        db_session.flush()
+        return adventure, attempt
+
+    def test_runtime_distribution_of_accepted_submissions(self, adventure_client, db_session, test_user):
+        """Only correct submissions for the node are counted, by CPU time and memory"""
+        from models.submission import AdventureProblemSubmission
+
+        adventure, attempt = self.make_adventure(db_session, test_user.id)
+        for cpu_time, is_correct in ((10, True), (20, True), (30, True), (40, True), (5000, False)):
+            db_session.add(AdventureProblemSubmission(
+                attempt_id=attempt.id,
+                node_id="start",
+                code_submitted="print(1)",
+                output="1",
+                is_correct=is_correct,
+                verdict="correct" if is_correct else "time_limit_exceeded",
+                cpu_time_ms=cpu_time,
+                wall_time_ms=cpu_time + 5,
+                memory_bytes=cpu_time * 1024
+            ))
+        db_session.commit()
+
+        response = adventure_client.get(f"/adventures/{adventure.id}/nodes/start/runtime_distribution")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["accepted"] == 4
+        assert (data["time_ms"]["min"], data["time_ms"]["p50"], data["time_ms"]["max"]) == (10, 20, 40)
+        assert sum(bucket["count"] for bucket in data["time_ms"]["histogram"]) == 4
+        assert data["memory_bytes"]["max"] == 40 * 1024
+
+    def test_runtime_distribution_is_creator_only(self, adventure_client, db_session, test_user):
+        """Other users get a 403 and unknown nodes a 404"""
+        adventure, _ = self.make_adventure(db_session, test_user.id + 1)
+        response = adventure_client.get(f"/adventures/{adventure.id}/nodes/start/runtime_distribution")
+        assert response.status_code == 403
+
+        own, _ = self.make_adventure(db_session, test_user.id)
+        response = adventure_client.get(f"/adventures/{own.id}/nodes/missing/runtime_distribution")
+        assert response.status_code == 404
@@ -0,0 +1,44 @@
+"""This file contains tests for the executor endpoints within routes/executor.py"""
+
+
+import pytest
+from fastapi import status, FastAPI
+from fastapi.testclient import TestClient
+
+from routes.executor import router as executor_router
+from services.executors import get_executor_backend
+
+
+@pytest.fixture
+def executor_client(db_session, test_user):
+    """This creates a test client with the executor routes and test_user signed in"""
+    app = FastAPI()
+    app.include_router(executor_router)
+
+    def get_test_db():
+        yield db_session
+
+    def get_current_user():
+        yield test_user
+
+    from database import get_db
+    from dependencies import get_current_user as get_current_user_dep
+
+    app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[get_current_user_dep] = get_current_user
+
+    with TestClient(app) as client:
+        yield client
+
+
+def test_executor_stats_are_admin_only(executor_client, db_session, test_user):
+    """Stats are refused to non-admins, and admins get those of the shared backend"""
+    response = executor_client.get("/executor/stats")
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    test_user.is_admin = True
+    db_session.commit()
+    response = executor_client.get("/executor/stats")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["backend"] == get_executor_backend().stats()
@@ -0,0 +1,138 @@
+"""This file contains tests for the queued judge endpoints within routes/judge_jobs.py"""
+
+
+import time
+import pytest
+from unittest.mock import patch, AsyncMock
+from fastapi import status, FastAPI
+from fastapi.testclient import TestClient
+
+from routes.judge_jobs import router as judge_jobs_router
+from services.problem_service import ProblemService
+from schemas.problem import ProblemCreate
+from models.problem import Problem
+from models.user import User
+from services.judge_queue import JudgeJob, get_judge_queue
+from utils.auth import create_access_token
+
+
+@pytest.fixture
+def jobs_app():
+    """Create a FastApi instance with the judge job routes included"""
+    app = FastAPI()
+    app.include_router(judge_jobs_router)
+    return app
+
+
+@pytest.fixture
+def jobs_client(jobs_app, db_session, test_user):
+    """This creates a test client with database and authentication overides"""
+
+    def get_test_db():
+        yield db_session
+
+    def get_current_user():
+        yield test_user
+
+    from database import get_db
+    from dependencies import get_current_user as get_current_user_dep
+
+    jobs_app.dependency_overrides[get_db] = get_test_db
+    jobs_app.dependency_overrides[get_current_user_dep] = get_current_user
+
+    with TestClient(jobs_app) as client:
+        yield client
+
+    jobs_app.dependency_overrides.clear()
+
+
+def wait_for_job(client, job_id, timeout=5):
+    """Poll a job until it has a verdict"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError("job did not finish in time")
+
+
+@patch('routes.judge_jobs.SessionLocal')
+@patch('routes.judge_jobs.CodeExecutionService')
+def test_enqueue_solution_returns_job_and_verdict(mock_code_service_class, mock_session_local, jobs_client, db_session, test_user):
+    """A queued submission is accepted immediately and its verdict persisted once judged"""
+    problem = ProblemService(db_session).create_problem(
+        ProblemCreate(
+            title="Queued",
+            description="Print hello",
+            code_snippet="print('hello')",
+            expected_output="hello",
+            language="python",
+            is_public=True
+        ),
+        test_user
+    )
+    problem_id = problem.id
+    mock_session_local.return_value = db_session
+    mock_code_service_class.return_value.execute_code = AsyncMock(return_value={
+        "output": "hello\n",
+        "stdout": "hello\n",
+        "stderr": ""
+    })
+
+    response = jobs_client.post("/jobs/submissions", data={
+        "access_code": problem.access_code,
+        "code": "print('hello')",
+        "language": "python"
+    })
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job = wait_for_job(jobs_client, response.json()["job_id"])
+    assert job["status"] == "completed"
+    assert job["result"]["is_correct"] is True
+
+    stored = db_session.query(Problem).filter(Problem.id == problem_id).first()
+    assert stored.completions == 1
+
+
+def test_enqueue_solution_unknown_problem(jobs_client):
+    """Unknown access codes are rejected before anything is queued"""
+    response = jobs_client.post("/jobs/submissions", data={
+        "access_code": "nope00",
+        "code": "print('hello')",
+        "language": "python"
+    })
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_get_unknown_job(jobs_client):
+    """Polling a job that does not exist returns 404"""
+    response = jobs_client.get("/jobs/does-not-exist")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_queue_stats_are_not_public(jobs_client):
+    """Queue internals are only served to admins, through /executor/stats"""
+    response = jobs_client.get("/jobs/stats")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_jobs_are_private_to_their_owner_when_a_token_is_sent(jobs_client, db_session, test_user):
+    """A signed-in user cannot read someone else's job, while token-less polls still work by job ID"""
+    other = User(name="Eve", username="eve123", password_hash="123")
+    db_session.add(other)
+    db_session.commit()
+
+    async def work():
+        return {}
+
+    job = JudgeJob("adventure", work, owner_id=test_user.id)
+    get_judge_queue().jobs[job.id] = job
+
+    def bearer(username):
+        return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+    assert jobs_client.get(f"/jobs/{job.id}", headers=bearer("bob123")).status_code == status.HTTP_200_OK
+    assert jobs_client.get(f"/jobs/{job.id}").status_code == status.HTTP_200_OK
+    assert jobs_client.get(f"/jobs/{job.id}", headers=bearer("eve123")).status_code == status.HTTP_403_FORBIDDEN
+    assert jobs_client.get(f"/jobs/{job.id}/events", headers=bearer("eve123")).status_code == status.HTTP_403_FORBIDDEN
@@ -79,6 +79,24 @@ def test_create_problem_missing_fields(problem_client):
     response = problem_client.post("/problems", data=form_data)
     assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
 
+@pytest.mark.parametrize("test_cases", ['[{"stdin": "1"', '{"stdin": "1", "expected_output": "2"}', '[1, 2]'])
+def test_create_problem_rejects_bad_test_cases(problem_client, test_cases):
+    """Test cases that are not valid JSON, not a list, or not test case objects give a 400"""
+    form_data = {
+        "title": "Test Problem",
+        "description": "Test description",
+        "code_snippet": "print('Hello')",
+        "expected_output": "Hello",
+        "language": "python",
+        "is_public": True,
+        "test_cases": test_cases
+    }
+
+    response = problem_client.post("/problems", data=form_data)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["error"] == "Validation failed"
+
 def test_get_user_problems_success(problem_client, test_user, db_session):
     """Test retrieving user's problems"""
 
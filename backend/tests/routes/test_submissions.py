@@ -0,0 +1,303 @@
+"""This file contains tests for the batch judging endpoint within routes/submissions.py"""
+
+
+import json
+import pytest
+from unittest.mock import patch, AsyncMock
+from fastapi import status, FastAPI
+from fastapi.testclient import TestClient
+
+from routes.submissions import router as submissions_router
+from services.problem_service import ProblemService
+from schemas.problem import ProblemCreate
+
+
+@pytest.fixture
+def submissions_app():
+    """Create a FastApi instance with the submission routes included"""
+    app = FastAPI()
+    app.include_router(submissions_router)
+    return app
+
+
+@pytest.fixture
+def submissions_client(submissions_app, db_session, test_user):
+    """This creates a test client with database and authentication overides"""
+
+    def get_test_db():
+        yield db_session
+
+    def get_current_user():
+        yield test_user
+
+    from database import get_db
+    from dependencies import get_current_user as get_current_user_dep
+
+    submissions_app.dependency_overrides[get_db] = get_test_db
+    submissions_app.dependency_overrides[get_current_user_dep] = get_current_user
+
+    with TestClient(submissions_app) as client:
+        yield client
+
+    submissions_app.dependency_overrides.clear()
+
+
+@patch('routes.submissions.CodeExecutionService')
+def test_submit_batch_reports_verdicts_in_order(mock_code_service_class, submissions_client, db_session, test_user):
+    """Each item gets a verdict in input order, and one failing item does not fail the batch"""
+    problem = ProblemService(db_session).create_problem(
+        ProblemCreate(
+            title="Batch",
+            description="Print hello",
+            code_snippet="print('hello')",
+            expected_output="hello",
+            language="python",
+            is_public=True
+        ),
+        test_user
+    )
+
+    async def execute_code(code, language, stdin="", priority="problem"):
+        return {"output": code, "stdout": code, "stderr": ""}
+
+    mock_code_service_class.return_value.execute_code = AsyncMock(side_effect=execute_code)
+
+    response = submissions_client.post("/submissions/batch", json={"items": [
+        {"code": "hello", "language": "python", "access_code": problem.access_code},
+        {"code": "goodbye", "language": "python", "access_code": problem.access_code},
+        {"code": "hello", "language": "python", "access_code": "missing"},
+    ]})
+
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert [r["index"] for r in body["results"]] == [0, 1, 2]
+    assert body["results"][0]["is_correct"] is True
+    assert body["results"][1]["is_correct"] is False
+    assert body["results"][2]["status"] == "error"
+    assert (body["total"], body["succeeded"], body["failed"], body["correct"]) == (3, 2, 1, 1)
+
+
+@patch('routes.submissions.CodeExecutionService')
+def test_submit_solution_judges_every_test_case(mock_code_service_class, submissions_client, db_session, test_user):
+    """Extra test cases run with their stdin and each gets its own verdict"""
+    problem = ProblemService(db_session).create_problem(
+        ProblemCreate(
+            title="Double",
+            description="Print twice the number on stdin",
+            code_snippet="print(int(input()) * 2)",
+            expected_output="0",
+            language="python",
+            is_public=True,
+            test_cases=[{"stdin": "2", "expected_output": "4"}, {"stdin": "5", "expected_output": "10"}]
+        ),
+        test_user
+    )
+
+    async def execute_code(code, language, stdin="", priority="problem"):
+        # a solution that gets the last case wrong
+        value = int(stdin or 0) * 2
+        output = str(value + 1 if value == 10 else value)
+        return {"output": output, "stdout": output, "stderr": ""}
+
+    mock_code_service_class.return_value.execute_code = AsyncMock(side_effect=execute_code)
+
+    response = submissions_client.post("/submissions", data={
+        "access_code": problem.access_code, "code": "print(int(input()) * 2)", "language": "python", "fail_fast": "false"
+    })
+
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert body["is_correct"] is False
+    assert "(test case 3 of 3)" in body["message"]
+    assert body["output"] == "11"
+    assert [case["status"] for case in body["test_cases"]] == ["passed", "passed", "failed"]
+    assert body["test_cases"][2]["diff"]["expected"] == "10"
+    assert mock_code_service_class.return_value.execute_code.await_count == 3
+
+
+
+@patch('routes.submissions.CodeExecutionService')
+def test_submit_solution_replays_repeated_idempotency_key(mock_code_service_class, submissions_client, db_session, test_user):
+    """A retried POST with the same Idempotency-Key gets the stored verdict without running again"""
+    problem = ProblemService(db_session).create_problem(
+        ProblemCreate(
+            title="Hello",
+            description="Print hello",
+            code_snippet="print('hello')",
+            expected_output="hello",
+            language="python",
+            is_public=True
+        ),
+        test_user
+    )
+
+    async def execute_code(code, language, stdin="", priority="problem"):
+        return {"output": "hello", "stdout": "hello", "stderr": ""}
+
+    mock_code_service_class.return_value.execute_code = AsyncMock(side_effect=execute_code)
+    form = {"access_code": problem.access_code, "code": "print('hello')", "language": "python"}
+    headers = {"Idempotency-Key": "retry-test-1"}
+
+    first = submissions_client.post("/submissions", data=form, headers=headers)
+    second = submissions_client.post("/submissions", data=form, headers=headers)
+
+    assert first.status_code == second.status_code == status.HTTP_200_OK
+    assert second.json() == first.json()
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert mock_code_service_class.return_value.execute_code.await_count == 1
+
+    reused = submissions_client.post("/submissions", data={**form, "code": "print('other')"}, headers=headers)
+    assert reused.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@patch('routes.submissions.CodeExecutionService')
+def test_guests_do_not_share_idempotency_keys(mock_code_service_class, monkeypatch, submissions_client, db_session, test_user):
+    """Two guests reusing the same simple key each get their own run, the same guest gets a replay"""
+    from config import get_settings
+    monkeypatch.setattr(get_settings(), "RATE_LIMIT_TRUST_FORWARDED_FOR", True)
+
+    problem = ProblemService(db_session).create_problem(
+        ProblemCreate(
+            title="Hello",
+            description="Print hello",
+            code_snippet="print('hello')",
+            expected_output="hello",
+            language="python",
+            is_public=True
+        ),
+        test_user
+    )
+
+    async def execute_code(code, language, stdin="", priority="problem"):
+        return {"output": "hello", "stdout": "hello", "stderr": ""}
+
+    mock_code_service_class.return_value.execute_code = AsyncMock(side_effect=execute_code)
+    form = {"access_code": problem.access_code, "code": "print('hello')", "language": "python"}
+
+    first = submissions_client.post("/submissions", data=form, headers={"Idempotency-Key": "1", "X-Forwarded-For": "198.51.100.1"})
+    other = submissions_client.post("/submissions", data=form, headers={"Idempotency-Key": "1", "X-Forwarded-For": "198.51.100.2"})
+    again = submissions_client.post("/submissions", data=form, headers={"Idempotency-Key": "1", "X-Forwarded-For": "198.51.100.1"})
+
+    assert first.status_code == other.status_code == again.status_code == status.HTTP_200_OK
+    assert "Idempotent-Replayed" not in other.headers
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert mock_code_service_class.return_value.execute_code.await_count == 2
+
+
+@patch('routes.submissions.CodeExecutionService')
+def test_replayed_submission_is_not_rate_limited(mock_code_service_class, monkeypatch, submissions_client, db_session, test_user):
+    """A retry answered from the idempotency store spends no rate-limit tokens, a new submission does"""
+    import dependencies
+    from services.rate_limiter import RateLimiter
+    limiter = RateLimiter({"user": (0.01, 1), "guest": (0.01, 1)})
+    monkeypatch.setattr(dependencies, "get_rate_limiter", lambda: limiter)
+
+    problem = ProblemService(db_session).create_problem(
+        ProblemCreate(
+            title="Hello",
+            description="Print hello",
+            code_snippet="print('hello')",
+            expected_output="hello",
+            language="python",
+            is_public=True
+        ),
+        test_user
+    )
+
+    async def execute_code(code, language, stdin="", priority="problem"):
+        return {"output": "hello", "stdout": "hello", "stderr": ""}
+
+    mock_code_service_class.return_value.execute_code = AsyncMock(side_effect=execute_code)
+    form = {"access_code": problem.access_code, "code": "print('hello')", "language": "python"}
+
+    first = submissions_client.post("/submissions", data=form, headers={"Idempotency-Key": "limited-1"})
+    replayed = submissions_client.post("/submissions", data=form, headers={"Idempotency-Key": "limited-1"})
+    fresh = submissions_client.post("/submissions", data=form, headers={"Idempotency-Key": "limited-2"})
+
+    assert first.status_code == replayed.status_code == status.HTTP_200_OK
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+    assert fresh.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert mock_code_service_class.return_value.execute_code.await_count == 1
+
+
+def test_submit_batch_rejects_items_without_target(submissions_client):
+    """Items must name a problem or an adventure node"""
+    response = submissions_client.post("/submissions/batch", json={"items": [
+        {"code": "print(1)", "language": "python"}
+    ]})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@patch('routes.submissions.SessionLocal')
+@patch('routes.submissions.CodeExecutionService')
+def test_stream_solution_sends_chunks_then_verdict(mock_code_service_class, mock_session_local, submissions_client, db_session, test_user):
+    """Output chunks are streamed as events and the verdict is the last event"""
+    problem = ProblemService(db_session).create_problem(
+        ProblemCreate(
+            title="Stream",
+            description="Print hello",
+            code_snippet="print('hello')",
+            expected_output="hello",
+            language="python",
+            is_public=True
+        ),
+        test_user
+    )
+    mock_session_local.return_value = db_session
+
+    async def stream_code(code, language, stdin="", priority="problem", deadline=None, comparator=None):
+        yield {"stream": "stdout", "data": "hel"}
+        yield {"stream": "stdout", "data": "lo\n"}
+        yield {"result": {"output": "hello\n", "code": 0, "signal": None}}
+
+    mock_code_service_class.return_value.stream_code = stream_code
+
+    response = submissions_client.post("/submissions/stream", data={
+        "access_code": problem.access_code,
+        "code": "print('hello')",
+        "language": "python"
+    })
+
+    assert response.status_code == status.HTTP_200_OK
+    events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    assert [lines[0] for lines in events] == ["event: stdout", "event: stdout", "event: verdict"]
+    assert '"is_correct": true' in events[-1][1]
+
+
+@patch('routes.submissions.SessionLocal')
+@patch('routes.submissions.CodeExecutionService')
+def test_stream_solution_judges_output_past_the_stream_limit(mock_code_service_class, mock_session_local, submissions_client, db_session, test_user):
+    """A correct answer longer than the streamed events is judged on the run's full output"""
+    expected = "x" * (100 * 1024)
+    problem = ProblemService(db_session).create_problem(
+        ProblemCreate(
+            title="Long stream",
+            description="Print a lot",
+            code_snippet="print('x' * 102400)",
+            expected_output=expected,
+            language="python",
+            is_public=True
+        ),
+        test_user
+    )
+    mock_session_local.return_value = db_session
+
+    async def stream_code(code, language, stdin="", priority="problem", deadline=None, comparator=None):
+        assert deadline is not None
+        # what stream_code forwards once STREAM_OUTPUT_MAX_BYTES is reached
+        yield {"stream": "stdout", "data": expected[:64 * 1024]}
+        yield {"result": {"output": expected + "\n", "code": 0, "signal": None, "truncated": True}}
+
+    mock_code_service_class.return_value.stream_code = stream_code
+
+    response = submissions_client.post("/submissions/stream", data={
+        "access_code": problem.access_code,
+        "code": "print('x' * 102400)",
+        "language": "python"
+    })
+
+    assert response.status_code == status.HTTP_200_OK
+    verdict = json.loads(response.text.strip().split("\n\n")[-1].split("\n")[1][len("data: "):])
+    assert verdict["is_correct"] is True
+    assert verdict["truncated"] is True
@@ -0,0 +1,157 @@
+"""This file contains tests for the compiled adventure graphs in services/adventure_graph.py"""
+
+
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import update
+
+from exceptions import GraphValidationError
+from models.adventure import Adventure
+from schemas.adventure import AdventureUpdate, GraphData
+from services.adventure_graph import AdventureGraphCache, compile_graph, validate_graph
+from services.adventure_service import AdventureService
+
+
+GRAPH_DATA = {
+    "nodes": [
+        {"id": "start", "type": "start", "data": {}},
+        {"id": "a", "type": "problem", "data": {"label": "A"}},
+        {"id": "b", "type": "problem", "data": {"label": "B"}},
+        {"id": "end", "type": "end", "data": {}},
+    ],
+    "edges": [
+        {"id": "e1", "source": "start", "target": "a"},
+        {"id": "e2", "source": "start", "target": "b"},
+        {"id": "e3", "source": "a", "target": "end"},
+        {"id": "e4", "source": "b", "target": "end"},
+        {"id": "e5", "source": "b", "target": "missing"},
+    ],
+}
+
+
+def make_adventure(adventure_id=1, revision=1, graph_data=GRAPH_DATA):
+    return SimpleNamespace(id=adventure_id, graph_revision=revision, graph_data=graph_data)
+
+
+def test_compile_graph_indexes_nodes_and_adjacency():
+    """Nodes are found by ID with their original entry, and edges to unknown nodes are dropped"""
+    graph = compile_graph(GRAPH_DATA)
+
+    assert len(graph) == 4
+    assert "missing" not in graph
+    assert graph.get("a").entry is GRAPH_DATA["nodes"][1]
+    assert graph.get("a").data == {"label": "A"}
+    assert graph.successors("start") == ("a", "b")
+    assert graph.successors("b") == ("end",)
+    assert graph.predecessors("end") == ("a", "b")
+    assert graph.edge_count == 4
+
+
+def test_cache_reuses_graph_until_revision_changes():
+    """The same revision is compiled once, and a new revision replaces the old entry"""
+    cache = AdventureGraphCache(max_entries=8)
+
+    first = cache.get(make_adventure())
+    assert cache.get(make_adventure()) is first
+
+    edited = {"nodes": GRAPH_DATA["nodes"][:2], "edges": []}
+    second = cache.get(make_adventure(revision=2, graph_data=edited))
+    assert second is not first
+    assert "b" not in second
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 1)
+
+
+def test_cache_evicts_least_recently_used():
+    """Past max_entries the graph used longest ago is dropped"""
+    cache = AdventureGraphCache(max_entries=2)
+
+    one = cache.get(make_adventure(1))
+    cache.get(make_adventure(2))
+    assert cache.get(make_adventure(1)) is one
+    cache.get(make_adventure(3))
+
+    assert cache.get(make_adventure(1)) is one
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["entries"] == 2
+
+
+def checks(graph_data):
+    with pytest.raises(GraphValidationError) as raised:
+        validate_graph(graph_data)
+    return {problem["check"]: problem for problem in raised.value.problems}
+
+
+def edge(source, target, condition="correct"):
+    return {"id": f"{source}-{target}", "source": source, "target": target, "data": {"condition": condition}}
+
+
+def test_validate_graph_returns_start_and_end():
+    """A valid graph gives its start and end, and incorrect edges may lead back to earlier problems"""
+    graph_data = {
+        "nodes": [{"id": node_id} for node_id in ("start", "a", "b", "end")],
+        "edges": [edge("start", "a"), edge("a", "b"), edge("b", "a", "incorrect"), edge("b", "end")],
+    }
+
+    assert validate_graph(graph_data) == ("start", "end")
+
+
+def test_validate_graph_allows_incorrect_edges_back_to_the_start():
+    """A wrong answer may send the solver back to the first problem, which stays the start"""
+    graph_data = {
+        "nodes": [{"id": node_id} for node_id in ("start", "a", "end")],
+        "edges": [edge("start", "a"), edge("a", "start", "incorrect"), edge("a", "end")],
+    }
+
+    assert validate_graph(graph_data) == ("start", "end")
+
+
+def test_validate_graph_reports_every_problem():
+    """Dangling edges, extra starts and ends, unreachable nodes and correct-answer cycles are all reported"""
+    graph_data = {
+        "nodes": [{"id": node_id} for node_id in ("start", "other", "end", "x", "y", "after")],
+        "edges": [
+            edge("start", "end"),
+            edge("start", "ghost"),
+            edge("x", "y"),
+            edge("y", "x"),
+            edge("y", "after"),
+        ],
+    }
+    found = checks(graph_data)
+
+    assert found["dangling_edge"]["ids"] == ["start-ghost"]
+    assert found["multiple_starts"]["ids"] == ["start", "other"]
+    assert found["multiple_ends"]["ids"] == ["other", "end", "after"]
+    assert found["unreachable"]["ids"] == ["x", "y", "after"]
+    assert found["cycle"]["ids"] == ["x", "y"]
+
+
+def test_graph_edits_take_the_next_revision_from_the_database(db_session, test_user):
+    """An edit increments the stored revision, even when this session's copy of it is stale"""
+    adventure = Adventure(
+        name="Revisions", graph_data=GRAPH_DATA, creator_id=test_user.id, start_node_id="start", end_node_id="end"
+    )
+    db_session.add(adventure)
+    db_session.commit()
+
+    # another worker's edit, which this session has not seen
+    db_session.execute(
+        update(Adventure).where(Adventure.id == adventure.id).values(graph_revision=Adventure.graph_revision + 1),
+        execution_options={"synchronize_session": False}
+    )
+    assert adventure.graph_revision == 1
+
+    start, end = str(uuid.uuid4()), str(uuid.uuid4())
+    problem = {"title": "P", "description": "D", "code_snippet": "", "expected_output": "", "language": "python"}
+    graph = GraphData(
+        nodes=[{"id": node_id, "position": {"x": 0, "y": 0}, "data": problem} for node_id in (start, end)],
+        edges=[{"id": "e1", "source": start, "target": end}]
+    )
+    updated = AdventureService(db_session).update_adventure(adventure.id, AdventureUpdate(graph_data=graph), test_user)
+
+    assert updated.graph_revision == 3
+
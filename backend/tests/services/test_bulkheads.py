@@ -0,0 +1,73 @@
+"""This file contains tests for the per-language executor pools in services/bulkheads.py"""
+
+
+import asyncio
+
+import pytest
+
+from exceptions import ServiceUnavailableError
+from services.bulkheads import LanguageBulkheads
+
+
+def make_bulkheads(max_queue=1, queue_timeout=1.0):
+    return LanguageBulkheads(
+        default_limit=4,
+        limits={"java": 1},
+        max_queue=max_queue,
+        default_queue_timeout=queue_timeout,
+        queue_timeouts={}
+    )
+
+
+@pytest.mark.asyncio
+async def test_slow_language_is_confined_to_its_pool():
+    """A full Java pool rejects extra Java runs while Python keeps running"""
+    bulkheads = make_bulkheads()
+    release = asyncio.Event()
+
+    async def run(language):
+        async with bulkheads.slot(language):
+            await release.wait()
+
+    running = asyncio.create_task(run("java"))
+    queued = asyncio.create_task(run("java"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(ServiceUnavailableError):
+        await run("java")
+
+    async with bulkheads.slot("python"):
+        pass
+
+    java = bulkheads.stats()["java"]
+    assert (java["active"], java["queued"], java["rejected"]) == (1, 1, 1)
+    assert java["saturation"] == 1.0
+    assert bulkheads.stats()["python"]["limit"] == 4
+
+    release.set()
+    await asyncio.gather(running, queued)
+    assert bulkheads.stats()["java"]["active"] == 0
+    assert bulkheads.stats()["java"]["admitted"] == 2
+
+
+@pytest.mark.asyncio
+async def test_queued_runs_time_out():
+    """A run that cannot get a slot within the queue timeout fails with 503"""
+    bulkheads = make_bulkheads(queue_timeout=0.05)
+    release = asyncio.Event()
+
+    async def hold():
+        async with bulkheads.slot("java"):
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+
+    with pytest.raises(ServiceUnavailableError):
+        async with bulkheads.slot("java"):
+            pass
+
+    release.set()
+    await holder
+    stats = bulkheads.stats()["java"]
+    assert (stats["timed_out"], stats["queued"], stats["active"]) == (1, 0, 0)
@@ -0,0 +1,418 @@
+"""This file contains tests for services/code_execution_service.py"""
+
+
+import asyncio
+import json
+import time
+import pytest
+import httpx
+from unittest.mock import patch
+
+from services.code_execution_service import CodeExecutionService
+from services.deadlines import Deadline, with_deadline
+from services.http_client import ExecutorHttpClient
+from services.judge import ExpectedOutput
+from services.execution_cache import ExecutionCache
+from services.executors import ExecutorBackend, PistonExecutor
+from services.piston_endpoints import PistonEndpointPool
+from services.preflight import Preflight
+from services.single_flight import SingleFlight
+from exceptions import ValidationError, PreflightError, ServiceUnavailableError, DeadlineExceededError
+
+
+def make_http_client(handler):
+    """Build an ExecutorHttpClient whose pooled client talks to a mock transport"""
+    http_client = ExecutorHttpClient()
+    http_client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return http_client
+
+
+def make_cache(enabled=True):
+    """Build a memory-only execution cache so tests never touch the database tier"""
+    return ExecutionCache(enabled=enabled, db_enabled=False)
+
+
+@pytest.mark.asyncio
+async def test_execute_code_reuses_shared_client():
+    """Every execution should go through the one pooled client"""
+    payloads = []
+
+    def handler(request):
+        payloads.append(request.read())
+        return httpx.Response(200, json={"run": {"stdout": "hi\n", "stderr": "", "output": "hi\n", "code": 0}})
+
+    http_client = make_http_client(handler)
+    service = CodeExecutionService(http_client, make_cache(enabled=False))
+
+    for _ in range(3):
+        run = await service.execute_code("print('hi')", "Python")
+        assert run["output"] == "hi\n"
+
+    assert len(payloads) == 3
+    stats = http_client.stats()
+    assert stats["requests_total"] == 3
+    assert stats["in_flight_requests"] == 0
+    await http_client.close()
+
+
+@pytest.mark.asyncio
+async def test_execute_code_non_200_raises_validation_error():
+    """A failed executor response should surface as a ValidationError"""
+    http_client = make_http_client(lambda request: httpx.Response(500, text="boom"))
+    service = CodeExecutionService(http_client, make_cache())
+
+    with pytest.raises(ValidationError):
+        await service.execute_code("print('hi')", "python")
+    await http_client.close()
+
+
+@pytest.mark.asyncio
+async def test_execute_code_serves_repeats_from_cache():
+    """Resubmitting unchanged code should not reach the executor again"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"run": {"stdout": "2\n", "stderr": "", "output": "2\n", "code": 0, "signal": None}})
+
+    http_client = make_http_client(handler)
+    cache = make_cache()
+    service = CodeExecutionService(http_client, cache)
+
+    first = await service.execute_code("print(1+1)", "python")
+    second = await service.execute_code("print(1+1)", "python")
+
+    assert first == second
+    assert len(calls) == 1
+    assert cache.stats()["memory_hits"] == 1
+    assert cache.stats()["misses"] == 1
+    await http_client.close()
+
+
+@pytest.mark.asyncio
+async def test_cache_skips_killed_runs_and_drops_outdated_versions():
+    """Timed out runs are not cached and a runtime upgrade invalidates old entries"""
+    cache = make_cache()
+
+    await cache.set("python", "3.10.0", "while True: pass", {"output": "", "signal": "SIGKILL"})
+    assert await cache.get("python", "3.10.0", "while True: pass") is None
+
+    await cache.set("python", "3.10.0", "print(1)", {"output": "1\n", "signal": None})
+    assert cache.sync_runtime_versions({"python": "3.12.0"}) == 1
+    assert await cache.get("python", "3.10.0", "print(1)") is None
+
+
+def make_piston_service(handler, urls, **pool_options):
+    """Build a service whose Piston backend balances over its own endpoint pool"""
+    http_client = make_http_client(handler)
+    pool = PistonEndpointPool(urls, retry_backoff_seconds=0, **pool_options)
+    backend = PistonExecutor(http_client, pool)
+    return CodeExecutionService(http_client, make_cache(enabled=False), backend), pool, http_client
+
+
+@pytest.mark.asyncio
+async def test_execute_code_retries_on_another_endpoint():
+    """A 5xx from one endpoint is retried on a healthy one"""
+    def handler(request):
+        if request.url.host == "bad":
+            return httpx.Response(503, text="overloaded")
+        return httpx.Response(200, json={"run": {"output": "ok\n", "code": 0}})
+
+    service, pool, http_client = make_piston_service(handler, ["http://bad/execute", "http://good/execute"])
+
+    for _ in range(5):
+        assert (await service.execute_code("print('ok')", "python"))["output"] == "ok\n"
+
+    bad, good = pool.endpoints
+    assert good.requests == 5
+    assert bad.failures == bad.requests
+    await http_client.close()
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_after_repeated_failures():
+    """Once every endpoint's circuit is open requests fail fast instead of queueing"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ConnectError("refused")
+
+    service, pool, http_client = make_piston_service(
+        handler, ["http://down/execute"], failure_threshold=3, retry_attempts=2
+    )
+
+    with pytest.raises(ValidationError):
+        await service.execute_code("print(1)", "python")
+    assert pool.endpoints[0].state == "open"
+
+    with pytest.raises(ServiceUnavailableError):
+        await service.execute_code("print(1)", "python")
+    assert len(calls) == 3
+    await http_client.close()
+
+
+@pytest.mark.asyncio
+async def test_slow_requests_are_hedged_to_second_endpoint():
+    """A request slower than the p95 is raced against another endpoint"""
+    async def handler(request):
+        if request.url.host == "slow":
+            await asyncio.sleep(1)
+        return httpx.Response(200, json={"run": {"output": request.url.host, "code": 0}})
+
+    service, pool, http_client = make_piston_service(
+        handler, ["http://slow/execute", "http://fast/execute"], hedge_min_samples=1
+    )
+    pool.latency.record(10)
+    slow, fast = pool.endpoints
+    # make the slow endpoint the least busy so it is picked first
+    fast.outstanding = 1
+
+    run = await service.execute_code("print(1)", "python")
+    fast.outstanding -= 1
+
+    assert run["output"] == "fast"
+    assert pool.hedged == 1
+    assert pool.hedge_wins == 1
+    assert slow.outstanding == 0
+    await http_client.close()
+
+
+
+@pytest.mark.asyncio
+async def test_endpoint_slots_are_released_however_a_request_ends():
+    """Cancelled hedged requests and malformed responses do not leave endpoints looking busy"""
+    async def handler(request):
+        if request.url.host == "broken":
+            return httpx.Response(200, text="not json")
+        await asyncio.sleep(1)
+        return httpx.Response(200, json={"run": {"output": "late\n", "code": 0}})
+
+    service, pool, http_client = make_piston_service(
+        handler, ["http://slow/execute", "http://slower/execute"], hedge_min_samples=1
+    )
+    pool.latency.record(10)
+
+    run = asyncio.create_task(service.execute_code("print(1)", "python"))
+    await asyncio.sleep(0.1)
+    assert sum(endpoint.outstanding for endpoint in pool.endpoints) == 2
+    run.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await run
+    # the shared run behind the caller is cancelled without being awaited
+    await asyncio.sleep(0.05)
+    assert [endpoint.outstanding for endpoint in pool.endpoints] == [0, 0]
+
+    service, pool, http_client_broken = make_piston_service(handler, ["http://broken/execute"])
+    with pytest.raises(ValueError):
+        await service.execute_code("print(1)", "python")
+    assert pool.endpoints[0].outstanding == 0
+
+    await http_client.close()
+    await http_client_broken.close()
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_runs_are_coalesced():
+    """Identical executions in flight at the same time share one executor call"""
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"run": {"output": "1\n", "code": 0}})
+
+    http_client = make_http_client(handler)
+    single_flight = SingleFlight()
+    service = CodeExecutionService(http_client, make_cache(enabled=False), single_flight=single_flight)
+
+    runs = await asyncio.gather(*(service.execute_code("print(1)", "python") for _ in range(10)))
+    other = await service.execute_code("print(2)", "python")
+
+    assert all(run["output"] == "1\n" for run in runs)
+    assert runs[0] is not runs[1]
+    assert other["output"] == "1\n"
+    assert len(calls) == 2
+    assert single_flight.stats()["coalesced"] == 9
+    assert single_flight.stats()["in_flight"] == 0
+    await http_client.close()
+
+
+
+@pytest.mark.asyncio
+async def test_runs_are_only_shared_on_the_same_terms():
+    """A different priority or a later deadline gets its own run, an earlier deadline joins"""
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"run": {"output": "1\n", "code": 0}})
+
+    http_client = make_http_client(handler)
+    single_flight = SingleFlight()
+    service = CodeExecutionService(http_client, make_cache(enabled=False), single_flight=single_flight)
+
+    async def under(seconds, priority):
+        with patch("services.deadlines.deadline_for", return_value=Deadline(seconds)):
+            return await with_deadline("test")(service.execute_code)("print(1)", "python", priority=priority)
+
+    await asyncio.gather(
+        under(5, "guest"),
+        under(5, "attempt"),
+        under(2, "attempt"),
+        under(10, "attempt"),
+    )
+
+    # guest, attempt (5s, joined by 2s), attempt (10s)
+    assert len(calls) == 3
+    assert single_flight.stats()["coalesced"] == 1
+    await http_client.close()
+
+@pytest.mark.asyncio
+async def test_deadline_caps_piston_timeouts_and_cuts_off_slow_runs():
+    """The remaining deadline is sent as Piston's run/compile timeouts and enforced on the call"""
+    payloads = []
+
+    async def handler(request):
+        payload = json.loads(request.content)
+        payloads.append(payload)
+        if payload["files"][0]["content"] == "slow":
+            await asyncio.sleep(1)
+        return httpx.Response(200, json={"run": {"output": "ok\n", "code": 0}})
+
+    service, _, http_client = make_piston_service(handler, ["http://only/execute"], hedge_enabled=False)
+
+    await service.execute_code("fast", "javascript")
+    assert (payloads[0]["run_timeout"], payloads[0]["compile_timeout"]) == (3000, 10000)
+
+    @with_deadline("test")
+    async def under_deadline(code):
+        return await service.execute_code(code, "javascript")
+
+    with patch("services.deadlines.deadline_for", return_value=Deadline(0.3)):
+        await under_deadline("fast again")
+        assert payloads[1]["run_timeout"] <= 300
+        assert payloads[1]["compile_timeout"] <= 300
+
+        with pytest.raises(DeadlineExceededError):
+            await under_deadline("slow")
+
+    with patch("services.deadlines.deadline_for", return_value=Deadline(1, persist_reserve=2)):
+        with pytest.raises(DeadlineExceededError):
+            await under_deadline("no time to run")
+    assert len(payloads) == 3
+    await http_client.close()
+
+
+@pytest.mark.asyncio
+async def test_preflight_rejects_broken_code_without_a_remote_run():
+    """Python syntax errors, oversized and badly encoded code never reach the executor"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"run": {"stdout": "", "stderr": "", "output": "", "code": 0}})
+
+    http_client = make_http_client(handler)
+    preflight = Preflight(max_code_bytes=64)
+    service = CodeExecutionService(http_client, make_cache(enabled=False), preflight=preflight)
+
+    with pytest.raises(PreflightError) as error:
+        await service.execute_code("def f(:\n    pass\n", "python")
+    assert error.value.to_dict()["check"] == "syntax"
+    assert error.value.line == 1
+
+    with pytest.raises(PreflightError) as error:
+        await service.execute_code("x" * 65, "javascript")
+    assert error.value.check == "size"
+
+    with pytest.raises(PreflightError) as error:
+        await service.execute_code("puts 1\x00", "ruby")
+    assert error.value.check == "encoding"
+
+    # only the local interpreter's syntax is checked, and valid code still runs remotely
+    await service.execute_code("print(1 is 1)", "python")
+    await service.execute_code("int main( {", "c")
+
+    assert len(calls) == 2
+    assert preflight.stats()["executions_saved"] == 3
+    assert preflight.stats()["rejected"] == {"syntax": 1, "size": 1, "encoding": 1}
+    await http_client.close()
+
+
+class ChattyBackend(ExecutorBackend):
+    """Streams `chunks` of output, then sleeps `linger` seconds before the run ends"""
+
+    name = "chatty"
+
+    def __init__(self, chunks, linger=0.0):
+        self.chunks = chunks
+        self.linger = linger
+        self.timeouts = []
+        self.cancelled = False
+
+    async def run(self, language, version, extension, code, stdin="", timeout=None):
+        raise AssertionError("stream_code should stream")
+
+    async def stream(self, language, version, extension, code, stdin="", timeout=None):
+        self.timeouts.append(timeout)
+        for chunk in self.chunks:
+            yield {"stream": "stdout", "data": chunk}
+        try:
+            await asyncio.sleep(self.linger)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        output = "".join(self.chunks)
+        yield {"result": {"stdout": output, "stderr": "", "output": output, "code": 0, "signal": None}}
+
+
+@pytest.mark.asyncio
+async def test_stream_code_caps_events_but_keeps_full_output():
+    """Streamed events stop at the limit, live or replayed from the cache, while the run keeps all its output"""
+    chunks = ["a" * 40000, "b" * 40000]
+    service = CodeExecutionService(result_cache=make_cache(), backend=ChattyBackend(chunks))
+
+    for _ in range(2):
+        events = [event async for event in service.stream_code("print('ab')", "python", deadline=Deadline(5))]
+        streamed = "".join(event["data"] for event in events[:-1])
+        assert len(streamed) == service.settings.STREAM_OUTPUT_MAX_BYTES
+        assert events[-1]["result"]["output"] == "".join(chunks)
+        assert events[-1]["result"]["truncated"] is True
+    assert len(service.backend.timeouts) == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_code_enforces_the_deadline():
+    """A streamed run that outlives the deadline is cancelled and raises DeadlineExceededError"""
+    backend = ChattyBackend(["partial\n"], linger=5)
+    service = CodeExecutionService(result_cache=make_cache(enabled=False), backend=backend)
+
+    received = []
+    with pytest.raises(DeadlineExceededError):
+        async for event in service.stream_code("print(1)", "python", deadline=Deadline(0.2)):
+            received.append(event)
+
+    assert received == [{"stream": "stdout", "data": "partial\n"}]
+    assert backend.cancelled
+    assert backend.timeouts[0] <= 0.2
+
+
+@pytest.mark.asyncio
+async def test_stream_code_stops_once_the_verdict_is_settled():
+    """With a comparator the run ends at the first wrong line, and the partial run is not cached"""
+    backend = ChattyBackend(["right\n", "wrong\n", "never judged\n"], linger=5)
+    service = CodeExecutionService(result_cache=make_cache(), backend=backend)
+
+    for _ in range(2):
+        comparator = ExpectedOutput("right\nright").comparator(max_chars=1000, diff_chars=50)
+        started = time.monotonic()
+        events = [event async for event in service.stream_code("print(1)", "python", comparator=comparator)]
+
+        assert time.monotonic() - started < 1
+        assert [event.get("data") for event in events[:-1]] == ["right\n", "wrong\n"]
+        assert events[-1]["result"]["stopped_early"] is True
+        assert events[-1]["result"]["output"] == "right\nwrong\n"
+        assert comparator.finish().diff["actual"] == "wrong"
+    assert len(backend.timeouts) == 2
+
@@ -0,0 +1,71 @@
+"""This file contains tests for the metrics registry and the execution instrumentation"""
+
+
+import pytest
+import httpx
+
+from services.code_execution_service import CodeExecutionService
+from services.execution_cache import ExecutionCache
+from services.execution_metrics import get_execution_metrics, instrument_submission
+from services.http_client import ExecutorHttpClient
+from utils.metrics import MetricsRegistry
+
+
+def test_registry_renders_prometheus_text():
+    """Counters, gauges and histograms render in the text exposition format"""
+    registry = MetricsRegistry()
+    errors = registry.counter("errors_total", "Errors.", ["status"])
+    latency = registry.histogram("latency_seconds", "Latency.", ["language"], buckets=(0.1, 1.0))
+
+    errors.inc(status="500")
+    errors.inc(status="500")
+    latency.observe(0.05, language="python")
+    latency.observe(0.5, language="python")
+
+    text = registry.render()
+    assert "# TYPE errors_total counter" in text
+    assert 'errors_total{status="500"} 2' in text
+    assert 'latency_seconds_bucket{language="python",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{language="python",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{language="python"} 2' in text
+
+
+@pytest.mark.asyncio
+async def test_execute_code_records_latency_and_errors():
+    """Executions are timed by outcome and executor failures counted by status"""
+    responses = iter([
+        httpx.Response(200, json={"run": {"output": "", "code": 1, "signal": None}}),
+        httpx.Response(400, text="bad request"),
+    ])
+    http_client = ExecutorHttpClient()
+    http_client.client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: next(responses)))
+    service = CodeExecutionService(http_client, ExecutionCache(enabled=False, db_enabled=False))
+    metrics = get_execution_metrics()
+    before_exit = metrics.execution_duration.count(language="ruby", outcome="nonzero_exit")
+    before_error = metrics.execution_duration.count(language="ruby", outcome="error")
+
+    await service.execute_code("exit 1", "ruby")
+    with pytest.raises(Exception):
+        await service.execute_code("exit 2", "ruby")
+
+    assert metrics.execution_duration.count(language="ruby", outcome="nonzero_exit") == before_exit + 1
+    assert metrics.execution_duration.count(language="ruby", outcome="error") == before_error + 1
+    assert metrics.executions_in_flight.value(language="ruby") == 0
+    url = service.backend.endpoint_pool.endpoints[0].url
+    assert metrics.executor_errors.value(endpoint=url, status="400") >= 1
+    await http_client.close()
+
+
+@pytest.mark.asyncio
+async def test_instrument_submission_records_sizes():
+    """The handler decorator records code size, output size and duration"""
+    @instrument_submission("test_handler")
+    async def handler(code: str):
+        return {"output": "x" * 100}
+
+    metrics = get_execution_metrics()
+    await handler(code="print('x' * 100)")
+
+    assert metrics.submission_code_bytes.count(handler="test_handler") == 1
+    assert metrics.submission_output_bytes.count(handler="test_handler") == 1
+    assert metrics.submission_duration.count(handler="test_handler", status="200") == 1
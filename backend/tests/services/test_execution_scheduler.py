@@ -0,0 +1,74 @@
+"""This file contains tests for the priority scheduler in services/execution_scheduler.py"""
+
+
+import asyncio
+
+import pytest
+
+from services.execution_scheduler import ExecutionScheduler
+
+
+def make_scheduler(concurrency=1):
+    return ExecutionScheduler(concurrency, {"attempt": 6, "problem": 3, "guest": 1})
+
+
+async def hold_slot(scheduler, release):
+    """Take the only slot and keep it until `release` is set"""
+    async with scheduler.slot("problem"):
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_waiting_runs_are_shared_by_weight():
+    """Attempts go first, but a queue of attempts does not starve guests"""
+    scheduler = make_scheduler()
+    release = asyncio.Event()
+    holder = asyncio.create_task(hold_slot(scheduler, release))
+    await asyncio.sleep(0)
+
+    order = []
+
+    async def run(priority):
+        async with scheduler.slot(priority):
+            order.append(priority)
+
+    waiters = [asyncio.create_task(run("guest")) for _ in range(3)]
+    waiters += [asyncio.create_task(run("attempt")) for _ in range(12)]
+    await asyncio.sleep(0)
+    assert scheduler.stats()["classes"]["guest"]["queued"] == 3
+
+    release.set()
+    await asyncio.gather(holder, *waiters)
+
+    assert order[0] == "attempt"
+    # guests get about one slot in seven while attempts are waiting
+    assert "guest" in order[:8]
+    assert order.count("guest") == 3
+    stats = scheduler.stats()
+    assert stats["running"] == 0
+    assert stats["classes"]["attempt"]["admitted"] == 12
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiters_give_up_their_place():
+    """A caller that goes away while queued is skipped and the slot is not lost"""
+    scheduler = make_scheduler()
+    release = asyncio.Event()
+    holder = asyncio.create_task(hold_slot(scheduler, release))
+    await asyncio.sleep(0)
+
+    async def run():
+        async with scheduler.slot("guest"):
+            return True
+
+    abandoned = asyncio.create_task(run())
+    await asyncio.sleep(0)
+    abandoned.cancel()
+    await asyncio.gather(abandoned, return_exceptions=True)
+    assert scheduler.stats()["classes"]["guest"]["queued"] == 0
+
+    waiting = asyncio.create_task(run())
+    release.set()
+    assert await asyncio.wait_for(waiting, 1) is True
+    await holder
+    assert scheduler.running == 0
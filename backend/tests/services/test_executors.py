@@ -0,0 +1,367 @@
+"""This file contains tests for the local executor backend in services/executors.py"""
+
+
+import asyncio
+import os
+import shutil
+import sys
+import time
+import pytest
+
+from config import Settings
+from services import executors, python_worker_pool
+from services.artifact_cache import CompiledArtifactCache, create_artifact_cache
+from services.executors import LOCAL_TOOLCHAINS, LocalExecutor, Toolchain, create_executor_backend
+
+SLEEPER = "import time\nwhile True:\n    time.sleep(0.05)"
+
+
+def process_alive(pid):
+    """True while the process exists and is not a zombie waiting to be reaped"""
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            return stat.read().rsplit(")", 1)[1].split()[0] not in ("Z", "X")
+    except FileNotFoundError:
+        return False
+
+
+async def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.02)
+    return True
+
+
+async def running_child(pool):
+    """The pid of the submission a pooled worker is running, once the worker has reported it"""
+    busy = lambda: next((w.child_pid for w in pool._workers if w.child_pid is not None), None)
+    assert await wait_until(lambda: busy() is not None)
+    return busy()
+
+
+def make_executor(**overrides):
+    """Build a local executor with tight limits so runaway programs end quickly"""
+    options = {
+        "LOCAL_EXECUTOR_CPU_SECONDS": 1,
+        "LOCAL_EXECUTOR_WALL_SECONDS": 2.0,
+        "LOCAL_EXECUTOR_OUTPUT_BYTES": 1024,
+    }
+    options.update(overrides)
+    settings = Settings(**options)
+    return LocalExecutor(settings)
+
+
+@pytest.mark.asyncio
+async def test_local_executor_returns_piston_shaped_result():
+    """A local run should return the same keys the routes read from Piston"""
+    executor = make_executor()
+    run = await executor.run("python", "3.10.0", "py", "import sys\nprint('hi')\nprint('oops', file=sys.stderr)")
+
+    assert run["stdout"] == "hi\n"
+    assert run["stderr"] == "oops\n"
+    assert "hi" in run["output"] and "oops" in run["output"]
+    assert run["code"] == 0
+    assert run["signal"] is None
+
+
+@pytest.mark.asyncio
+async def test_local_executor_kills_runaway_programs():
+    """Infinite loops are stopped by the CPU or wall clock limit"""
+    executor = make_executor()
+    run = await executor.run("python", "3.10.0", "py", "while True:\n    pass")
+
+    assert run["signal"] in ("SIGKILL", "SIGXCPU")
+    assert run["code"] is None
+
+
+@pytest.mark.asyncio
+async def test_local_executor_caps_output():
+    """Output past the configured cap is cut off and flagged"""
+    executor = make_executor()
+    run = await executor.run("python", "3.10.0", "py", "while True:\n    print('x' * 100)")
+
+    assert len(run["output"]) <= 1024
+    assert run["truncated"] is True
+
+
+@pytest.mark.asyncio
+async def test_python_worker_pool_runs_and_recycles_workers():
+    """Pooled runs keep the run dict shape and workers are replaced after max uses"""
+    executor = make_executor(PYTHON_WORKER_POOL_SIZE=1, PYTHON_WORKER_MAX_USES=2)
+    await executor.start()
+    try:
+        for i in range(3):
+            run = await executor.run("python", "3.10.0", "py", f"print({i})")
+            assert run["stdout"] == f"{i}\n"
+            assert run["code"] == 0
+
+        stats = executor.python_pool.stats()
+        assert stats["runs"] == 3
+        assert stats["recycled"] >= 1
+    finally:
+        await executor.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="needs /proc to inspect processes")
+async def test_cancelled_pooled_run_kills_the_submission():
+    """Cancelling a pooled run kills the forked submission, not just the worker interpreter"""
+    executor = make_executor(PYTHON_WORKER_POOL_SIZE=1, LOCAL_EXECUTOR_WALL_SECONDS=30.0)
+    await executor.start()
+    try:
+        task = asyncio.create_task(executor.run("python", "3.10.0", "py", SLEEPER))
+        pid = await running_child(executor.python_pool)
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert await wait_until(lambda: not process_alive(pid))
+        assert executor.python_pool.stats()["cancelled"] == 1
+        # the worker is replaced and the pool keeps serving
+        assert (await executor.run("python", "3.10.0", "py", "print(1)"))["stdout"] == "1\n"
+    finally:
+        await executor.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="needs /proc to inspect processes")
+async def test_closing_the_pool_kills_running_submissions():
+    """Closing the pool stops submissions that are still running on busy workers"""
+    executor = make_executor(PYTHON_WORKER_POOL_SIZE=1, LOCAL_EXECUTOR_WALL_SECONDS=30.0)
+    await executor.start()
+    task = asyncio.create_task(executor.python_pool.run(SLEEPER))
+    pid = await running_child(executor.python_pool)
+
+    await executor.close()
+    with pytest.raises(RuntimeError):
+        await task
+    assert await wait_until(lambda: not process_alive(pid))
+
+
+@pytest.mark.asyncio
+async def test_runs_fall_back_when_workers_cannot_be_respawned(monkeypatch):
+    """A pool that has lost its workers keeps retrying the respawn, and runs use the per-call path meanwhile"""
+    monkeypatch.setattr(python_worker_pool, "RESPAWN_BACKOFF_SECONDS", 0.01)
+    executor = make_executor(PYTHON_WORKER_POOL_SIZE=1, PYTHON_WORKER_MAX_USES=1, LOCAL_EXECUTOR_WALL_SECONDS=0.5)
+    await executor.start()
+    pool = executor.python_pool
+    try:
+        pool.python_bin = "/nonexistent/python"
+        assert (await executor.run("python", "3.10.0", "py", "print(1)"))["stdout"] == "1\n"
+
+        assert await wait_until(lambda: pool.respawn_failures >= 2)
+        assert (await executor.run("python", "3.10.0", "py", "print(2)"))["stdout"] == "2\n"
+        assert pool.stats()["unavailable"] == 1
+    finally:
+        await executor.close()
+
+
+@pytest.mark.asyncio
+async def test_waiting_for_a_worker_uses_up_the_run_budget():
+    """A run that spent its wall time waiting for a busy pool times out instead of starting a fresh per-call run"""
+    executor = make_executor(PYTHON_WORKER_POOL_SIZE=1, LOCAL_EXECUTOR_WALL_SECONDS=0.3)
+    await executor.start()
+    busy = asyncio.create_task(executor.python_pool.run(SLEEPER, wall_seconds=30.0))
+    try:
+        await running_child(executor.python_pool)
+        started = time.monotonic()
+        run = await executor.run("python", "3.10.0", "py", "print(1)")
+
+        assert run["status"] == "TO"
+        assert run["stdout"] == ""
+        assert time.monotonic() - started < 1.0
+        assert executor.timeouts == 1
+    finally:
+        busy.cancel()
+        await asyncio.gather(busy, return_exceptions=True)
+        await executor.close()
+
+
+@pytest.mark.asyncio
+async def test_stdin_reaches_per_call_and_pooled_runs():
+    """Test case input is readable on stdin, and runs without input see an empty stdin"""
+    code = "import sys\nprint(sum(int(x) for x in sys.stdin.read().split()))"
+    executor = make_executor(PYTHON_WORKER_POOL_SIZE=1)
+
+    assert (await executor.run("python", "3.10.0", "py", code, "1 2 3\n"))["stdout"] == "6\n"
+    assert (await executor.run("python", "3.10.0", "py", code))["stdout"] == "0\n"
+
+    await executor.start()
+    try:
+        assert (await executor.run("python", "3.10.0", "py", code, "4\n5\n"))["stdout"] == "9\n"
+    finally:
+        await executor.close()
+
+
+@pytest.mark.asyncio
+async def test_runs_cannot_see_the_server_environment(monkeypatch):
+    """Neither per-call nor pooled runs inherit the server's secrets"""
+    monkeypatch.setenv("SECRET_KEY", "server-only")
+    code = "import os\nprint(os.environ.get('SECRET_KEY'))"
+    executor = make_executor(PYTHON_WORKER_POOL_SIZE=1)
+
+    assert (await executor.run("python", "3.10.0", "py", code))["stdout"] == "None\n"
+    await executor.start()
+    try:
+        assert executor.python_pool.started
+        assert (await executor.run("python", "3.10.0", "py", code))["stdout"] == "None\n"
+        assert executor.python_pool.runs == 1
+    finally:
+        await executor.close()
+
+
+def test_local_backend_needs_a_run_as_user_or_an_unsafe_opt_in():
+    """Without an unprivileged user to run as, the local backend is refused unless explicitly allowed"""
+    with pytest.raises(ValueError):
+        create_executor_backend(Settings(EXECUTOR_BACKEND="local"), None)
+    with pytest.raises(ValueError):
+        make_executor(LOCAL_EXECUTOR_RUN_AS="no-such-user-here")
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not hasattr(os, "geteuid") or os.geteuid() != 0, reason="switching users needs root")
+async def test_runs_switch_to_the_run_as_user():
+    """Per-call and pooled runs execute as LOCAL_EXECUTOR_RUN_AS and cannot read the server's environment"""
+    import pwd
+    nobody = pwd.getpwnam("nobody")
+    code = (
+        "import os\n"
+        "try:\n"
+        "    open(f'/proc/{os.getppid()}/environ').read()\n"
+        "    print(os.getuid(), 'read')\n"
+        "except OSError:\n"
+        "    print(os.getuid(), 'denied')"
+    )
+    executor = make_executor(PYTHON_WORKER_POOL_SIZE=1, LOCAL_EXECUTOR_RUN_AS="nobody")
+    expected = f"{nobody.pw_uid} denied\n"
+
+    assert (await executor.run("python", "3.10.0", "py", code))["stdout"] == expected
+    await executor.start()
+    try:
+        assert (await executor.run("python", "3.10.0", "py", code))["stdout"] == expected
+        assert executor.python_pool.runs == 1
+    finally:
+        await executor.close()
+
+
+@pytest.mark.asyncio
+async def test_local_executor_streams_output_before_exit():
+    """Chunks arrive while the program is still running, and the run comes last"""
+    executor = make_executor()
+    code = "import time\nprint('first', flush=True)\ntime.sleep(0.5)\nprint('second')"
+    events = executor.stream("python", "3.10.0", "py", code)
+
+    first = await events.__anext__()
+    assert first == {"stream": "stdout", "data": "first\n"}
+
+    rest = [event async for event in events]
+    assert rest[-1]["result"]["stdout"] == "first\nsecond\n"
+    assert "".join(e["data"] for e in rest[:-1]) == "second\n"
+
+
+@pytest.mark.asyncio
+async def test_runtime_versions_are_resolved_at_start(monkeypatch):
+    """Toolchain versions are probed once in start, and runs never shell out for them"""
+    executor = make_executor(PYTHON_WORKER_POOL_ENABLED=False)
+    await executor.start()
+    assert executor.runtime_version("python", "3.10.0").startswith("local:Python 3")
+
+    def no_probe(*args, **kwargs):
+        raise AssertionError("runtime_version probed a toolchain")
+
+    monkeypatch.setattr(executors.subprocess, "run", no_probe)
+    assert (await executor.run("python", "3.10.0", "py", "print(1)"))["stdout"] == "1\n"
+    assert executor.runtime_version("python", "3.10.0").startswith("local:Python 3")
+
+
+@pytest.mark.asyncio
+async def test_compiling_stops_at_the_run_timeout():
+    """A slow compile step ends with the caller's timeout, not the executor's own compile limit"""
+    slow = Toolchain(compile=[sys.executable, "-c", "import time; time.sleep(10)"], run=[sys.executable, "{file}"])
+    executor = LocalExecutor(Settings(LOCAL_EXECUTOR_COMPILE_WALL_SECONDS=30.0), toolchains={**LOCAL_TOOLCHAINS, "slow": slow})
+
+    started = time.monotonic()
+    run = await executor.run("slow", "1", "py", "print(1)", timeout=0.5)
+
+    assert run["status"] == "TO"
+    assert time.monotonic() - started < 2.0
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(shutil.which("gcc") is None, reason="gcc is not installed")
+async def test_compiled_artifacts_are_reused(tmp_path):
+    """Resubmitting unchanged C code skips the compile step and reports the saving"""
+    executor = make_executor(COMPILE_CACHE_DIR=str(tmp_path), PYTHON_WORKER_POOL_ENABLED=False)
+    code = '#include <stdio.h>\nint main(void) { printf("42\\n"); return 0; }\n'
+
+    first = await executor.run("c", "10.2.0", "c", code)
+    second = await executor.run("c", "10.2.0", "c", code)
+
+    assert first["stdout"] == second["stdout"] == "42\n"
+    stats = executor.stats()["compile_cache"]
+    assert stats["stores"] == 1
+    assert stats["hits"] == 1
+    assert stats["compile_ms_saved"] > 0
+
+    # a fresh process picks the entry up from disk
+    reloaded = CompiledArtifactCache(str(tmp_path), 1024 * 1024 * 1024)
+    assert reloaded.stats()["entries"] == 1
+
+
+def test_artifact_cache_evicts_least_recently_used(tmp_path):
+    """The store stays under its size bound by dropping the oldest entries"""
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    (workdir / "main").write_bytes(b"x" * 400)
+    cache = CompiledArtifactCache(str(tmp_path / "cache"), max_bytes=1000)
+
+    cache.store("a", str(workdir), ["main"], 10)
+    cache.store("b", str(workdir), ["main"], 10)
+    restored = tmp_path / "restored"
+    restored.mkdir()
+    assert cache.restore("a", str(restored), ["main"])
+    cache.store("c", str(workdir), ["main"], 10)
+
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] <= 1000
+    assert not cache.restore("b", str(restored), ["main"])
+
+
+def test_artifact_cache_drops_entries_rewritten_after_store(tmp_path):
+    """A cached binary changed on disk is not restored, the source is compiled again instead"""
+    workdir = tmp_path / "work"
+    (workdir / "classes").mkdir(parents=True)
+    (workdir / "classes" / "Main.class").write_bytes(b"honest")
+    cache = CompiledArtifactCache(str(tmp_path / "cache"), max_bytes=1000)
+    cache.store("a", str(workdir), ["classes"], 10)
+
+    (tmp_path / "cache" / "a" / "classes" / "Main.class").write_bytes(b"forged")
+    restored = tmp_path / "restored"
+    restored.mkdir()
+
+    assert not cache.restore("a", str(restored), ["classes"])
+    assert not (restored / "classes").exists()
+    assert not (tmp_path / "cache" / "a").exists()
+    assert (cache.stats()["rejected"], cache.stats()["entries"]) == (1, 0)
+
+
+def test_artifact_cache_refuses_directories_others_can_plant_in(tmp_path):
+    """The cache directory is created private, and a shared or foreign one disables the cache"""
+    CompiledArtifactCache(str(tmp_path / "private"), max_bytes=1000)
+    assert os.stat(tmp_path / "private").st_mode & 0o777 == 0o700
+
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    os.chmod(shared, 0o777)
+    with pytest.raises(PermissionError):
+        CompiledArtifactCache(str(shared), max_bytes=1000)
+    assert create_artifact_cache(str(shared), 1000) is None
+
+    if os.geteuid() == 0:
+        foreign = tmp_path / "foreign"
+        foreign.mkdir(mode=0o700)
+        os.chown(foreign, 12345, 12345)
+        assert create_artifact_cache(str(foreign), 1000) is None
@@ -0,0 +1,80 @@
+"""This file contains tests for the fake Piston server in tools/fake_piston.py"""
+
+
+import pytest
+import httpx
+
+from services.code_execution_service import CodeExecutionService
+from services.execution_cache import ExecutionCache
+from services.executors import PistonExecutor
+from services.http_client import ExecutorHttpClient
+from services.piston_endpoints import PistonEndpointPool
+from tools.fake_piston import FakePistonProfile, create_app
+from exceptions import ValidationError
+
+FAKE_URL = "http://fake-piston/api/v2/piston/execute"
+
+
+def make_service(profile, retry_attempts=0):
+    """Build a service whose executor requests are answered in-process by the fake server"""
+    app = create_app(profile)
+    http_client = ExecutorHttpClient()
+    http_client.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+    pool = PistonEndpointPool([FAKE_URL], retry_attempts=retry_attempts, retry_backoff_seconds=0)
+    service = CodeExecutionService(
+        http_client,
+        ExecutionCache(enabled=False, db_enabled=False),
+        PistonExecutor(http_client, pool)
+    )
+    return service, app.state.fake_piston, http_client
+
+
+@pytest.mark.asyncio
+async def test_fake_piston_speaks_the_execute_contract():
+    """Print-only programs get their literals back and other code a deterministic output"""
+    service, fake, http_client = make_service(FakePistonProfile(latency_ms=0, output_bytes=32))
+
+    run = await service.execute_code("print('hello')\nprint(\"world\")", "python")
+    assert run["output"] == "hello\nworld\n"
+    assert run["code"] == 0
+
+    first = await service.execute_code("x = 1", "python")
+    second = await service.execute_code("x = 1", "python")
+    assert first["output"] == second["output"]
+    assert len(first["output"]) == 32
+    await http_client.close()
+
+
+@pytest.mark.asyncio
+async def test_fake_piston_injects_429_bursts_and_errors():
+    """Bursts of 429s arrive on schedule and injected errors surface as executor failures"""
+    service, fake, http_client = make_service(FakePistonProfile(latency_ms=0, burst_every=3, burst_length=2))
+
+    outcomes = []
+    for _ in range(6):
+        try:
+            await service.execute_code("print('x')", "python")
+            outcomes.append("ok")
+        except ValidationError:
+            outcomes.append("429")
+
+    assert outcomes == ["ok", "ok", "429", "429", "ok", "429"]
+    assert fake.stats()["rate_limited"] == 3
+
+    fake.configure(FakePistonProfile(latency_ms=0, error_rate=1.0))
+    with pytest.raises(ValidationError):
+        await service.execute_code("print('x')", "python")
+    await http_client.close()
+
+
+def test_latency_profiles_are_reproducible():
+    """The same seed gives the same latency samples, and heavy tails exceed the base latency"""
+    from tools.fake_piston import FakePiston
+
+    lognormal = [FakePiston(FakePistonProfile(latency="lognormal", latency_ms=100, seed=7)).latency_seconds() for _ in range(2)]
+    assert lognormal[0] == lognormal[1]
+
+    heavy = FakePiston(FakePistonProfile(latency="heavy_tail", latency_ms=100, tail_alpha=1.2))
+    samples = [heavy.latency_seconds() for _ in range(1000)]
+    assert min(samples) >= 0.1
+    assert max(samples) > 1.0
@@ -0,0 +1,85 @@
+"""This file contains tests for the Idempotency-Key store in services/idempotency.py"""
+
+
+import asyncio
+
+import pytest
+from fastapi.responses import JSONResponse, Response
+
+from exceptions import IdempotencyKeyMismatchError
+from services.idempotency import IdempotencyStore
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicate_waits_for_the_first_request():
+    """A duplicate arriving mid-run waits and gets the same response, a later one is replayed"""
+    store = IdempotencyStore(ttl_seconds=60, max_entries=10)
+    release = asyncio.Event()
+    runs = []
+
+    async def handler():
+        runs.append(1)
+        await release.wait()
+        return {"is_correct": True}
+
+    first = asyncio.create_task(store.run("key", "body", handler))
+    await asyncio.sleep(0)
+    duplicate = asyncio.create_task(store.run("key", "body", handler))
+    await asyncio.sleep(0)
+    assert store.stats()["in_flight"] == 1
+
+    release.set()
+    assert await first == {"is_correct": True}
+    replayed = await duplicate
+    assert replayed.body == b'{"is_correct":true}'
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+
+    again = await store.run("key", "body", handler)
+    assert again.status_code == 200
+    assert len(runs) == 1
+    stats = store.stats()
+    assert (stats["executions"], stats["waited"], stats["replayed"]) == (1, 1, 1)
+
+    with pytest.raises(IdempotencyKeyMismatchError):
+        await store.run("key", "different body", handler)
+
+
+@pytest.mark.asyncio
+async def test_server_errors_and_expired_entries_run_again():
+    """5xx responses are not kept, and entries are dropped after the TTL"""
+    store = IdempotencyStore(ttl_seconds=0.05, max_entries=10)
+    runs = []
+
+    async def unavailable():
+        runs.append("unavailable")
+        return JSONResponse(status_code=503, content={"error": "busy"})
+
+    async def handler():
+        runs.append("ok")
+        return {"ok": True}
+
+    assert (await store.run("key", "body", unavailable)).status_code == 503
+    assert await store.run("key", "body", handler) == {"ok": True}
+    await asyncio.sleep(0.06)
+    assert await store.run("key", "body", handler) == {"ok": True}
+    assert runs == ["unavailable", "ok", "ok"]
+
+
+@pytest.mark.asyncio
+async def test_replays_keep_server_timing():
+    """Server-Timing is stored from the injected response, and will_replay tells a live key apart"""
+    store = IdempotencyStore(ttl_seconds=60, max_entries=10)
+    injected = Response()
+
+    async def handler():
+        injected.headers["Server-Timing"] = "judge;dur=12.5"
+        injected.headers["X-Other"] = "dropped"
+        return {"ok": True}
+
+    assert store.will_replay("key") is False
+    assert await store.run("key", "body", handler, injected) == {"ok": True}
+    assert store.will_replay("key") is True
+
+    replayed = await store.run("key", "body", handler)
+    assert replayed.headers["Server-Timing"] == "judge;dur=12.5"
+    assert "X-Other" not in replayed.headers
@@ -0,0 +1,136 @@
+"""This file contains tests for the output comparison engine in services/judge.py"""
+
+
+import asyncio
+
+import pytest
+
+from services.judge import ExpectedOutput, ExpectedOutputCache, JudgeCase, OutputJudge, ResourceLimits
+from exceptions import ValidationError
+
+
+def judge(expected, output, mode="strip", tolerance=None, max_chars=10_000):
+    """Judge one complete output with a small diff window"""
+    return ExpectedOutput(expected, mode, tolerance).judge(output, max_chars, diff_chars=20)
+
+
+def test_strip_mode_matches_previous_behaviour():
+    """Leading and trailing whitespace around the whole output is ignored, nothing else is"""
+    assert judge("hello\nworld", "  \nhello\nworld  \n\n").is_correct
+    assert not judge("hello\nworld", "hello \nworld").is_correct
+    assert judge("", "   \n").is_correct
+    assert not judge("", "x").is_correct
+
+
+def test_exact_and_trim_lines_modes():
+    """Exact cares about every byte, trim_lines forgives trailing whitespace per line"""
+    assert judge("a\nb\n", "a\nb\n", mode="exact").is_correct
+    assert not judge("a\nb\n", "a\nb", mode="exact").is_correct
+    assert judge("a\nb", "a   \nb\t\n\n", mode="trim_lines").is_correct
+    assert not judge("a\nb", " a\nb", mode="trim_lines").is_correct
+
+
+def test_float_mode_uses_tolerance():
+    """Numeric tokens only need to agree within the tolerance"""
+    assert judge("3.14159 2", "3.1416 2.0", mode="float", tolerance=1e-4).is_correct
+    assert not judge("3.14159 2", "3.2 2", mode="float", tolerance=1e-4).is_correct
+    assert not judge("pi", "3.14", mode="float").is_correct
+
+
+def test_mismatch_produces_bounded_diff():
+    """The diff names the first differing line and never echoes whole outputs"""
+    verdict = judge("1\n2\n3", "1\n" + "x" * 500 + "\n3")
+
+    assert not verdict.is_correct
+    assert verdict.diff["line"] == 2
+    assert verdict.diff["expected"] == "2"
+    assert len(verdict.diff["actual"]) < 100
+    assert "Incorrect" in verdict.message()
+
+    missing = judge("1\n2", "1")
+    assert missing.diff["reason"] == "missing_output"
+
+
+def test_comparator_stops_at_first_mismatch_and_output_cap():
+    """Streaming comparison settles as soon as the answer is known"""
+    expected = ExpectedOutput("a\nb")
+
+    comparator = expected.comparator(max_chars=1000, diff_chars=20)
+    assert comparator.feed("a\n")
+    assert not comparator.feed("c\nmore output")
+    assert comparator.finish().diff["actual"] == "c"
+
+    capped = expected.comparator(max_chars=5, diff_chars=20)
+    capped.feed("a\nb")
+    assert not capped.feed("\n\n\n\n")
+    assert capped.finish().output_limit_exceeded
+
+
+def test_expected_output_cache_reuses_until_edited():
+    """Normalized expected output is reused per source and rebuilt after an edit"""
+    cache = ExpectedOutputCache()
+
+    first = cache.get("problem:1", "hello\n")
+    assert cache.get("problem:1", "hello\n") is first
+    assert cache.get("problem:1", "hello again\n") is not first
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 2}
+
+    with pytest.raises(ValidationError):
+        cache.get("problem:2", "x", mode="fuzzy")
+
+
+@pytest.mark.asyncio
+async def test_run_cases_is_bounded_and_stops_on_first_failure():
+    """Cases run at most case_concurrency at a time and fail-fast skips what has not finished"""
+    output_judge = OutputJudge(10_000, 20, 10_000, 16, case_concurrency=2)
+    cases = [JudgeCase(str(n), ExpectedOutput(str(n * n))) for n in range(6)]
+    running = 0
+    peak = 0
+
+    async def execute(stdin):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01 * int(stdin))
+        running -= 1
+        # wrong answer for case 1
+        return {"output": "wrong" if stdin == "1" else str(int(stdin) ** 2)}
+
+    report = await output_judge.run_cases(cases, execute, fail_fast=True)
+    statuses = [case["status"] for case in report.cases()]
+    assert peak == 2
+    assert not report.is_correct
+    assert report.failed.index == 1
+    assert statuses[:2] == ["passed", "failed"]
+    assert "skipped" in statuses
+
+    report = await output_judge.run_cases(cases, execute, fail_fast=False)
+    assert [case["status"] for case in report.cases()] == ["passed", "failed"] + ["passed"] * 4
+
+
+@pytest.mark.asyncio
+async def test_resource_limits_take_precedence_over_output():
+    """A correct answer over the time or memory limit is judged as TLE / MLE and reports its runtime"""
+    output_judge = OutputJudge(10_000, 20, 10_000, 16)
+    limits = ResourceLimits(time_limit_ms=100, memory_limit_mb=64)
+    runs = {
+        "fast": {"output": "ok", "cpu_time": 20, "wall_time": 35, "memory": 8 * 1024 * 1024},
+        "slow": {"output": "ok", "cpu_time": 250, "wall_time": 260, "memory": 8 * 1024 * 1024},
+        "hungry": {"output": "ok", "cpu_time": 20, "wall_time": 30, "memory": 128 * 1024 * 1024},
+        "killed": {"output": "", "status": "TO", "signal": "SIGKILL"},
+    }
+
+    async def execute(stdin):
+        return runs[stdin]
+
+    report = await output_judge.run_cases([JudgeCase("fast", ExpectedOutput("ok"), limits)], execute)
+    assert report.status == "correct"
+    assert report.runtime() == {"cpu_time_ms": 20, "wall_time_ms": 35, "memory_bytes": 8 * 1024 * 1024}
+
+    for stdin, status in (("slow", "time_limit_exceeded"), ("hungry", "memory_limit_exceeded"), ("killed", "time_limit_exceeded")):
+        cases = [JudgeCase("fast", ExpectedOutput("ok"), limits), JudgeCase(stdin, ExpectedOutput("ok"), limits)]
+        report = await output_judge.run_cases(cases, execute)
+        assert not report.is_correct
+        assert report.status == status
+        assert report.cases()[1]["verdict"] == status
+        assert report.message().startswith(("Time limit exceeded", "Memory limit exceeded"))
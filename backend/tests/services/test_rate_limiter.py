@@ -0,0 +1,72 @@
+"""This file contains tests for services/rate_limiter.py"""
+
+
+import pytest
+from fastapi import FastAPI, Depends, Form
+from fastapi.testclient import TestClient
+
+from services.rate_limiter import RateLimiter, execution_cost
+from exceptions import RateLimitError
+
+
+def test_bucket_rejects_after_burst_with_retry_after():
+    """Once the burst is spent further calls are rejected until tokens refill"""
+    limiter = RateLimiter({"guest": (0.5, 2)})
+
+    limiter.check("guest", "10.0.0.1")
+    limiter.check("guest", "10.0.0.1")
+    with pytest.raises(RateLimitError) as exc_info:
+        limiter.check("guest", "10.0.0.1")
+
+    assert exc_info.value.status_code == 429
+    assert int(exc_info.value.headers["Retry-After"]) >= 1
+    assert limiter.stats()["tiers"]["guest"]["rejected"] == 1
+
+    # a different client has its own bucket
+    limiter.check("guest", "10.0.0.2")
+
+
+def test_expensive_executions_are_shed_first():
+    """A compiled, large submission needs more tokens than a small script"""
+    limiter = RateLimiter({"user": (0.01, 3)})
+    expensive = execution_cost("rust", "x" * 9000)
+    assert expensive == 3
+
+    limiter.check("user", "1", 1)
+    with pytest.raises(RateLimitError):
+        limiter.check("user", "1", expensive)
+    limiter.check("user", "1", 1)
+
+    assert limiter.stats()["tiers"]["user"]["rejected_expensive"] == 1
+
+
+def test_costs_above_the_burst_are_refused_not_clipped():
+    """A request costing more than a full bucket is rejected without spending anything"""
+    limiter = RateLimiter({"user": (0.01, 20)})
+
+    with pytest.raises(RateLimitError):
+        limiter.check("user", "1", 100)
+    limiter.check("user", "1", 20)
+
+    assert limiter.stats()["tiers"]["user"]["rejected_expensive"] == 1
+
+
+def test_guest_dependency_returns_429(monkeypatch):
+    """The guest dependency keys on the client address and answers 429 when exhausted"""
+    import dependencies
+    limiter = RateLimiter({"user": (1, 1), "guest": (0.01, 1)})
+    monkeypatch.setattr(dependencies, "get_rate_limiter", lambda: limiter)
+
+    app = FastAPI()
+
+    @app.post("/run", dependencies=[Depends(dependencies.limit_guest_execution)])
+    async def run(code: str = Form(...), language: str = Form(...)):
+        return {"ok": True}
+
+    with TestClient(app) as client:
+        form = {"code": "print(1)", "language": "python"}
+        assert client.post("/run", data=form).status_code == 200
+        # a made-up X-Forwarded-For does not buy a fresh bucket
+        response = client.post("/run", data=form, headers={"X-Forwarded-For": "203.0.113.9"})
+        assert response.status_code == 429
+        assert "retry-after" in response.headers
@@ -0,0 +1,119 @@
+"""This file contains tests for the dry-run sessions in services/run_sessions.py"""
+
+
+import asyncio
+import os
+import time
+
+import pytest
+
+from config import Settings
+from exceptions import RunCancelledError
+from services.code_execution_service import CodeExecutionService
+from services.execution_cache import ExecutionCache
+from services.executors import LocalExecutor
+from services.run_sessions import RunSessions
+from services.single_flight import SingleFlight
+
+
+def process_alive(pid):
+    """True while the process exists and is not a zombie waiting to be reaped"""
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            return stat.read().rsplit(")", 1)[1].split()[0] not in ("Z", "X")
+    except FileNotFoundError:
+        return False
+
+
+async def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.02)
+    return True
+
+
+@pytest.mark.asyncio
+async def test_new_run_cancels_the_previous_one_for_the_session():
+    """Only the latest run of a session finishes, other sessions are untouched"""
+    sessions = RunSessions()
+    cancelled = []
+
+    async def slow(name):
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(name)
+            raise
+        return name
+
+    async def fast():
+        return "latest"
+
+    first = asyncio.create_task(sessions.run("1:node:7:a", lambda: slow("first")))
+    other = asyncio.create_task(sessions.run("1:node:7:b", lambda: asyncio.sleep(0.05, "other")))
+    await asyncio.sleep(0.01)
+
+    assert await sessions.run("1:node:7:a", fast) == "latest"
+    with pytest.raises(RunCancelledError) as error:
+        await first
+    assert error.value.reason == "superseded"
+    assert cancelled == ["first"]
+    assert await other == "other"
+
+    stats = sessions.stats()
+    assert (stats["started"], stats["completed"], stats["superseded"], stats["in_flight"]) == (3, 2, 1, 0)
+
+
+@pytest.mark.asyncio
+async def test_run_is_cancelled_when_the_client_disconnects():
+    """The disconnect check cancels the execution instead of letting it run to the end"""
+    sessions = RunSessions(disconnect_poll_seconds=0.01)
+    gone = False
+    finished = []
+
+    async def is_disconnected():
+        return gone
+
+    async def work():
+        await asyncio.sleep(1)
+        finished.append(True)
+
+    run = asyncio.create_task(sessions.run("1:scratch", work, is_disconnected))
+    await asyncio.sleep(0.02)
+    gone = True
+
+    with pytest.raises(RunCancelledError) as error:
+        await asyncio.wait_for(run, 0.5)
+    assert error.value.reason == "disconnected"
+    assert not finished
+    assert sessions.stats()["disconnected"] == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="needs /proc to inspect processes")
+async def test_superseded_local_run_stops_the_process():
+    """Superseding a dry run on the local backend kills the submission's process, not just the task"""
+    backend = LocalExecutor(Settings(EXECUTOR_BACKEND="local", PYTHON_WORKER_POOL_SIZE=1, LOCAL_EXECUTOR_WALL_SECONDS=30.0))
+    await backend.start()
+    service = CodeExecutionService(
+        result_cache=ExecutionCache(enabled=False, db_enabled=False),
+        backend=backend,
+        single_flight=SingleFlight()
+    )
+    sessions = RunSessions()
+    pool = backend.python_pool
+    try:
+        sleeper = "import time\nwhile True:\n    time.sleep(0.05)"
+        first = asyncio.create_task(sessions.run("1:scratch", lambda: service.execute_code(sleeper, "python", priority="guest")))
+        assert await wait_until(lambda: any(worker.child_pid for worker in pool._workers))
+        pid = next(worker.child_pid for worker in pool._workers if worker.child_pid)
+
+        latest = await sessions.run("1:scratch", lambda: service.execute_code("print('latest')", "python", priority="guest"))
+        assert latest["stdout"] == "latest\n"
+        with pytest.raises(RunCancelledError):
+            await first
+        assert await wait_until(lambda: not process_alive(pid))
+    finally:
+        await backend.close()
@@ -0,0 +1,45 @@
+"""This file contains tests for the staged submission pipeline in services/submission_pipeline.py"""
+
+
+import asyncio
+import json
+
+import pytest
+
+from exceptions import AuthorisationError, RunCancelledError
+from services.submission_pipeline import SubmissionContext, SubmissionPipeline, submission_error_response
+
+
+@pytest.mark.asyncio
+async def test_time_a_stage_splits_out_is_reported_under_its_own_name():
+    """Judging done inside the execute stage is timed as "judge" and not counted under "execute" """
+
+    async def execute(context):
+        await asyncio.sleep(0.05)
+        return {"judge": 30.0}
+
+    async def respond(context):
+        context.response = {"ok": True}
+
+    context = SubmissionContext(code="print(1)", language="python", node_id="a")
+    await SubmissionPipeline("test", [("execute", execute), ("respond", respond)]).run(context)
+
+    assert list(context.timings) == ["execute", "judge", "respond"]
+    assert context.timings["judge"] == 30.0
+    assert 15 <= context.timings["execute"] < 50
+
+
+def test_error_response_keeps_the_status_of_app_errors():
+    """Authorisation and other app errors keep their own status instead of becoming a 500"""
+
+    context = SubmissionContext(code="print(1)", language="python", node_id="a")
+
+    forbidden = submission_error_response(AuthorisationError(), context, "test")
+    assert forbidden.status_code == 403
+    assert json.loads(forbidden.body) == {"error": "insufficient permissions"}
+
+    conflict = submission_error_response(RunCancelledError("superseded"), context, "test")
+    assert conflict.status_code == 409
+
+    crash = submission_error_response(RuntimeError("boom"), context, "test")
+    assert crash.status_code == 500
@@ -0,0 +1,187 @@
+"""Stand-in for the Piston execute API with configurable latency and failure profiles.
+
+Nothing is executed. Each request gets a deterministic answer derived from
+the submitted code: programs that only print string literals get those
+literals back, anything else gets `--output-bytes` of text seeded from a
+hash of the code. Point the backend at it with
+
+    PISTON_URL=http://127.0.0.1:2000/api/v2/piston/execute
+
+Run from the backend directory:
+
+    python -m tools.fake_piston --port 2000 --latency lognormal --latency-ms 120 --sigma 0.6
+    python -m tools.fake_piston --latency heavy_tail --tail-alpha 1.5 --error-rate 0.02 --burst-every 500 --burst-length 20
+
+The active profile can be read and changed at runtime through GET/PUT /admin/profile.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import math
+import random
+import re
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from services.code_execution_service import CodeExecutionService
+
+LATENCY_MODELS = ("fixed", "lognormal", "heavy_tail")
+
+# print("..."), console.log('...'), puts "...", echo "...", System.out.println("..."), fmt.Println("...")
+PRINT_LITERAL = re.compile(
+    r"""(?:print|println|puts|echo|console\.log|System\.out\.println|fmt\.Println)\s*\(?\s*(["'])(.*?)(?<!\\)\1"""
+)
+
+
+@dataclass
+class FakePistonProfile:
+    latency: str = "fixed"
+    latency_ms: float = 50.0
+    # lognormal: standard deviation of the underlying normal
+    sigma: float = 0.5
+    # heavy_tail: Pareto shape, smaller means a fatter tail
+    tail_alpha: float = 2.0
+    max_latency_ms: float = 30000.0
+    error_rate: float = 0.0
+    error_status: int = 500
+    # every `burst_every` requests the next `burst_length` get 429 Too Many Requests
+    burst_every: int = 0
+    burst_length: int = 0
+    output_bytes: int = 64
+    seed: Optional[int] = 0
+
+    def validate(self) -> None:
+        if self.latency not in LATENCY_MODELS:
+            raise ValueError(f"latency must be one of {', '.join(LATENCY_MODELS)}")
+        if not 0 <= self.error_rate <= 1:
+            raise ValueError("error_rate must be between 0 and 1")
+
+
+class FakePiston:
+    def __init__(self, profile: FakePistonProfile):
+        self.configure(profile)
+
+    def configure(self, profile: FakePistonProfile) -> None:
+        profile.validate()
+        self.profile = profile
+        self.random = random.Random(profile.seed)
+        self.requests = 0
+        self.rate_limited = 0
+        self.errors = 0
+
+    def latency_seconds(self) -> float:
+        profile = self.profile
+        if profile.latency == "lognormal":
+            milliseconds = self.random.lognormvariate(math.log(profile.latency_ms), profile.sigma)
+        elif profile.latency == "heavy_tail":
+            milliseconds = profile.latency_ms * self.random.paretovariate(profile.tail_alpha)
+        else:
+            milliseconds = profile.latency_ms
+        return min(milliseconds, profile.max_latency_ms) / 1000
+
+    def in_burst(self) -> bool:
+        profile = self.profile
+        if profile.burst_every <= 0 or profile.burst_length <= 0:
+            return False
+        return self.requests % profile.burst_every < profile.burst_length and self.requests >= profile.burst_every
+
+    def output_for(self, code: str) -> str:
+        literals = PRINT_LITERAL.findall(code)
+        if literals:
+            return "".join(text.replace("\\n", "\n").replace("\\t", "\t") + "\n" for _, text in literals)
+
+        # same code, same output: repeat the code's hash until the requested size
+        digest = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        size = self.profile.output_bytes
+        text = (digest * (size // len(digest) + 1))[:max(size - 1, 0)]
+        return text + "\n" if size else ""
+
+    async def execute(self, payload: Dict[str, Any]) -> JSONResponse:
+        self.requests += 1
+        await asyncio.sleep(self.latency_seconds())
+
+        if self.in_burst():
+            self.rate_limited += 1
+            return JSONResponse(status_code=429, content={"message": "Requests are being rate limited"})
+        if self.random.random() < self.profile.error_rate:
+            self.errors += 1
+            return JSONResponse(status_code=self.profile.error_status, content={"message": "Injected failure"})
+
+        files: List[Dict[str, str]] = payload.get("files") or []
+        language = payload.get("language")
+        if not files or language not in CodeExecutionService.version_map:
+            return JSONResponse(status_code=400, content={"message": f"{language}-{payload.get('version')} runtime is unknown"})
+
+        output = self.output_for(files[0].get("content", ""))
+        return JSONResponse(content={
+            "language": language,
+            "version": payload.get("version"),
+            "run": {"stdout": output, "stderr": "", "output": output, "code": 0, "signal": None},
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "profile": asdict(self.profile),
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "errors": self.errors,
+        }
+
+
+def create_app(profile: Optional[FakePistonProfile] = None) -> FastAPI:
+    app = FastAPI(title="Fake Piston")
+    fake = FakePiston(profile or FakePistonProfile())
+    app.state.fake_piston = fake
+
+    @app.post("/api/v2/piston/execute")
+    async def execute(request: Request):
+        return await fake.execute(await request.json())
+
+    @app.get("/api/v2/piston/runtimes")
+    async def runtimes():
+        return [
+            {"language": language, "version": version, "aliases": []}
+            for language, version in CodeExecutionService.version_map.items()
+        ]
+
+    @app.get("/admin/profile")
+    async def get_profile():
+        return fake.stats()
+
+    @app.put("/admin/profile")
+    async def set_profile(request: Request):
+        try:
+            fake.configure(FakePistonProfile(**{**asdict(fake.profile), **await request.json()}))
+        except (TypeError, ValueError) as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+        return fake.stats()
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2000)
+    parser.add_argument("--latency", choices=LATENCY_MODELS, default="fixed")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--sigma", type=float, default=0.5)
+    parser.add_argument("--tail-alpha", type=float, default=2.0)
+    parser.add_argument("--max-latency-ms", type=float, default=30000.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--burst-every", type=int, default=0)
+    parser.add_argument("--burst-length", type=int, default=0)
+    parser.add_argument("--output-bytes", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    options = vars(args)
+    host, port = options.pop("host"), options.pop("port")
+    uvicorn.run(create_app(FakePistonProfile(**options)), host=host, port=port, log_level="warning")
@@ -0,0 +1,30 @@
+from collections import deque
+from typing import Dict, Optional
+
+
+class LatencyRecorder:
+    """Keeps the most recent samples (in milliseconds) and reports percentiles over them."""
+
+    def __init__(self, window: int = 1000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, milliseconds: float) -> None:
+        self.samples.append(milliseconds)
+        self.count += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        p50 = self.percentile(50)
+        p99 = self.percentile(99)
+        return {
+            "count": self.count,
+            "p50_ms": round(p50, 2) if p50 is not None else None,
+            "p99_ms": round(p99, 2) if p99 is not None else None,
+        }